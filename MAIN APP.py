@@ -1,32 +1,25 @@
 import streamlit as st
-import swisseph as se
-import pytz
 import os 
 from dotenv import load_dotenv
 import traceback
 import time
 from datetime import datetime
-from notion_client import Client
+from notion_rate_limiter import get_stats as get_notion_stats
+from content_bundle import get_bundle
 from geopy.geocoders import Nominatim
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 
 load_dotenv()
 import certifi
 import ssl
-import numpy as np
 from indesign_generator import generate_indesign_covers
-
-# Define paths
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Define font paths - use system fonts if custom fonts not available
-try:
-    FONT_REGULAR = os.path.join(current_dir, "INDESIGN FILES", "Document fonts", "ArsenicaTrial-Regular.ttf")
-    if not os.path.exists(FONT_REGULAR):
-        FONT_REGULAR = None  # Will use default system font
-except:
-    FONT_REGULAR = None
+from chart_rendering import ensure_print_tier, local_path
+from book_builder import get_content
+from book_manifest import generate_book
+from book_stream import get_download_server
+from inside_pages import generate_inside_pages
+from book_bundle import export_bundle
+from png_optimize import get_png_stats
+from artifact_store import get_artifact_store
 
 # ==========================================================
 # 1. PAGE CONFIG & CUSTOM STYLING
@@ -200,51 +193,9 @@ st.markdown("""
 # ==========================================================
 # 2. SETUP & CONSTANTS
 # ==========================================================
-script_folder = os.path.dirname(os.path.abspath(__file__))
-ephe_path = os.path.join(script_folder, 'ephe') + os.path.sep
-se.set_ephe_path(ephe_path)
-
-assets_dir = os.path.join(script_folder, "assets", "pie_charts")
-os.makedirs(assets_dir, exist_ok=True)
-
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-
 ctx = ssl.create_default_context(cafile=certifi.where())
 geolocator = Nominatim(user_agent="astro_book_bot_v2", ssl_context=ctx)
 
-PLANET_POINTS = {
-    "Sun": 4, "Moon": 4, "Ascendant": 4, "Midheaven": 1,
-    "Mercury": 2, "Venus": 2, "Mars": 2,
-    "Jupiter": 1, "Saturn": 1, "Uranus": 1, "Neptune": 1, "Pluto": 1,
-    "North Node": 0, "Lilith": 0, "Chiron": 0, "Part of Fortune": 0
-}
-
-PLANETS = {
-    se.SUN: "Sun", se.MOON: "Moon", se.MERCURY: "Mercury", se.VENUS: "Venus",
-    se.MARS: "Mars", se.JUPITER: "Jupiter", se.SATURN: "Saturn", se.URANUS: "Uranus",
-    se.NEPTUNE: "Neptune", se.PLUTO: "Pluto", 
-    se.TRUE_NODE: "North Node", # <--- Changed to TRUE NODE (Standard)
-    se.MEAN_APOG: "Lilith", se.CHIRON: "Chiron"
-}
-
-ZODIAC_SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
-
-SIGN_DATA = {
-    "Aries":       ("Hot", "Dry", "Choleric", "Fire", "Cardinal", "Yang"),
-    "Taurus":      ("Cold", "Dry", "Melancholic", "Earth", "Fixed", "Yin"),
-    "Gemini":      ("Hot", "Wet", "Sanguine", "Air", "Mutable", "Yang"),
-    "Cancer":      ("Cold", "Wet", "Phlegmatic", "Water", "Cardinal", "Yin"),
-    "Leo":         ("Hot", "Dry", "Choleric", "Fire", "Fixed", "Yang"),
-    "Virgo":       ("Cold", "Dry", "Melancholic", "Earth", "Mutable", "Yin"),
-    "Libra":       ("Hot", "Wet", "Sanguine", "Air", "Cardinal", "Yang"),
-    "Scorpio":     ("Cold", "Wet", "Phlegmatic", "Water", "Fixed", "Yin"),
-    "Sagittarius": ("Hot", "Dry", "Choleric", "Fire", "Mutable", "Yang"),
-    "Capricorn":   ("Cold", "Dry", "Melancholic", "Earth", "Cardinal", "Yin"),
-    "Aquarius":    ("Hot", "Wet", "Sanguine", "Air", "Fixed", "Yang"),
-    "Pisces":      ("Cold", "Wet", "Phlegmatic", "Water", "Mutable", "Yin")
-}
-
 COUNTRIES = [
     "Afghanistan","Albania","Algeria","Andorra","Angola","Antigua and Barbuda","Argentina","Armenia",
     "Australia","Austria","Azerbaijan","Bahamas","Bahrain","Bangladesh","Barbados","Belarus","Belgium",
@@ -273,636 +224,8 @@ COUNTRIES = [
 # ==========================================================
 # 3. HELPERS & LOGIC
 # ==========================================================
-def get_sign_name(lon): return ZODIAC_SIGNS[int(lon // 30)]
-def normalize_degree(degree): return degree % 360
-def get_ordinal(n):
-    if 11 <= (n % 100) <= 13: suffix = 'th'
-    else: suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
-    return f"{n}{suffix}"
-
-def get_5_degree_note(chart_data):
-    """Compares Geometric vs Effective houses to generate the explanatory footnote."""
-    moved_list = []
-    
-    geom = chart_data["house_positions_geom"]
-    eff = chart_data["house_positions_eff"]
-    
-    for body, h_val in geom.items():
-        # Skip angles or empty data
-        if body in ["Ascendant", "Midheaven", "Part of Fortune"] or h_val == 0.0: continue
-        
-        # Compare integers (e.g. Geom=6 vs Eff=7)
-        if int(geom[body]) != int(eff[body]):
-            # Get the ORIGINAL (Geometric) house for the explanation
-            h_str = get_ordinal(int(geom[body]))
-            moved_list.append(f"{body} is in the {h_str} House")
-            
-    if not moved_list:
-        return ""
-        
-    # Grammar: Join with commas and 'and'
-    if len(moved_list) > 1:
-        joined_str = ", ".join(moved_list[:-1]) + " and " + moved_list[-1]
-    else:
-        joined_str = moved_list[0]
-        
-    return f"*{joined_str}, but because they are at less than 5º from the next house, they are considered to have their major influence and effects in the house that follows."
-
-def get_5_degree_note(chart_data):
-    """Compares Geometric vs Effective houses to generate the explanatory footnote."""
-    moved_list = []
-    
-    geom = chart_data["house_positions_geom"]
-    eff = chart_data["house_positions_eff"]
-    
-    for body, h_val in geom.items():
-        # Skip angles or empty data
-        if body in ["Ascendant", "Midheaven", "Part of Fortune"] or h_val == 0.0: continue
-        
-        # Compare integers (e.g. Geom=6 vs Eff=7)
-        if int(geom[body]) != int(eff[body]):
-            # Get the ORIGINAL (Geometric) house for the explanation
-            h_str = get_ordinal(int(geom[body]))
-            moved_list.append(f"{body} is in the {h_str} House")
-            
-    if not moved_list:
-        return ""
-        
-    # Grammar: Join with commas and 'and'
-    if len(moved_list) > 1:
-        joined_str = ", ".join(moved_list[:-1]) + " and " + moved_list[-1]
-    else:
-        joined_str = moved_list[0]
-        
-    return f"*{joined_str}, but because they are at less than 5º from the next house, they are considered to have their major influence and effects in the house that follows."
-
-def get_aspect(lon1, lon2):
-    diff = abs(lon1 - lon2)
-    if diff > 180: diff = 360 - diff 
-    if diff <= 8: return "Conjunction"
-    elif 172 <= diff <= 180: return "Opposition"
-    elif 82 <= diff <= 98: return "Square"
-    elif 112 <= diff <= 128: return "Trine"
-    elif 54 <= diff <= 66: return "Sextile"
-    return None
-
-def calculate_houses_safe(jd_utc, lat, lon):
-    for hsys in [b'P', 'P', 80]: 
-        try: return se.houses(float(jd_utc), float(lat), float(lon), hsys)
-        except: continue 
-    return None, None
-
-def get_house_number(planet_lon, cusps, apply_rule=False):
-    planet_lon = normalize_degree(planet_lon)
-    start_idx = 1 if len(cusps) == 13 else 0
-    for i in range(12):
-        curr_ptr, next_ptr = start_idx + i, start_idx + i + 1
-        if next_ptr >= len(cusps): next_ptr = start_idx
-        cusp_curr, cusp_next = normalize_degree(cusps[curr_ptr]), normalize_degree(cusps[next_ptr])
-        in_house = False
-        if cusp_next < cusp_curr:
-            if planet_lon >= cusp_curr or planet_lon < cusp_next: in_house = True
-        else:
-            if cusp_curr <= planet_lon < cusp_next: in_house = True   
-        if in_house:
-            if not apply_rule: return float(i + 1)
-            if normalize_degree(cusp_next - planet_lon) <= 5.0:
-                return float(1 if (i + 1) == 12 else (i + 2))
-            return float(i + 1)
-    return 0.0
-
-def get_moon_phase(sun_lon, moon_lon):
-    diff = normalize_degree(moon_lon - sun_lon)
-    if diff >= 345 or diff < 15: return "New Moon"
-    elif 165 <= diff < 195: return "Full Moon"
-    elif 15 <= diff < 165: return "Waxing Moon"
-    else: return "Waning Moon"
-
-def get_astrology_data(client_data):
-    data = { 
-        "placements": {}, 
-        "degrees": {}, 
-        "house_positions_geom": {}, 
-        "house_positions_eff": {}, 
-        "cusps": [], 
-        "moon_phase": "",
-        "retrograde": {} 
-    }
-    
-    # --- 1. TIMEZONE FIX ---
-    try:
-        # We use the timezonefinder library to get the exact timezone name from coordinates
-        from timezonefinder import TimezoneFinder
-        tf = TimezoneFinder()
-        
-        # Get timezone string (e.g., 'Europe/Lisbon' or 'America/New_York')
-        tz_str = tf.timezone_at(lng=client_data["longitude"], lat=client_data["latitude"])
-        if not tz_str: tz_str = "UTC"
-        
-        # Create the timezone object
-        local_tz = pytz.timezone(tz_str)
-        
-        # Combine Date and Time into a "Naive" Datetime (No timezone info yet)
-        naive_dt = datetime.combine(client_data["date"], client_data["time"])
-        
-        # Localize it (Stamp it with the detected timezone)
-        local_dt = local_tz.localize(naive_dt)
-        
-        # Convert to UTC (Universal Time) for the Swiss Ephemeris
-        # Correct: convert the localized datetime to UTC (call astimezone on the datetime)
-        try:
-            dt_utc = local_dt.astimezone(pytz.utc)
-        except Exception:
-            # Fallback: if conversion fails for any reason, fall back to treating local_dt as UTC-ish
-            dt_utc = local_dt
-        
-        # Calculate Julian Day using the UTC time
-        jd_utc = se.julday(dt_utc.year, dt_utc.month, dt_utc.day, 
-                           dt_utc.hour + dt_utc.minute/60.0 + dt_utc.second/3600.0)
-        
-        # Debug print to terminal to verify
-        print(f"DEBUG: Location: {client_data['latitude']}, {client_data['longitude']}")
-        print(f"DEBUG: Detected Timezone: {tz_str}")
-        print(f"DEBUG: Local Time: {local_dt} -> UTC Time: {dt_utc}")
-        
-    except Exception as e:
-        print(f"Timezone Error: {e}")
-        # Fallback to naive calculation if library fails
-        jd_utc = se.julday(client_data["date"].year, client_data["date"].month, client_data["date"].day, 
-                           client_data["time"].hour + client_data["time"].minute/60.0)
-
-    # --- 2. CALCULATE CHART ---
-    cusps, ascmc = calculate_houses_safe(jd_utc, client_data["latitude"], client_data["longitude"])
-    data["cusps"] = cusps
-    
-    # Angles
-    data["placements"]["Ascendant"] = get_sign_name(ascmc[0])
-    data["degrees"]["Ascendant"] = ascmc[0]
-    data["placements"]["Midheaven"] = get_sign_name(ascmc[1])
-    data["degrees"]["Midheaven"] = ascmc[1]
-    data["house_positions_eff"]["Midheaven"] = get_house_number(ascmc[1], cusps, apply_rule=True)
-    data["house_positions_geom"]["Midheaven"] = get_house_number(ascmc[1], cusps, apply_rule=False)
-    
-    sun_lon, moon_lon = 0, 0
-
-    # Planets
-    for planet_id, name in PLANETS.items():
-        try:
-            result = se.calc_ut(jd_utc, planet_id)
-            lon_val = result[0][0]
-            # Check for retrograde motion (negative speed)
-            speed = result[0][3]  # Index 3 contains the speed
-            data["retrograde"][name] = speed < 0
-            
-            data["degrees"][name] = lon_val
-            data["placements"][name] = get_sign_name(lon_val)
-            
-            # Calculate BOTH Geometric and Effective
-            data["house_positions_geom"][name] = get_house_number(lon_val, cusps, apply_rule=False)
-            data["house_positions_eff"][name] = get_house_number(lon_val, cusps, apply_rule=True)
-            
-            if name == "Sun": sun_lon = lon_val
-            if name == "Moon": moon_lon = lon_val
-        except: pass
-
-    data["moon_phase"] = get_moon_phase(sun_lon, moon_lon)
-    
-    # South Node
-    if "North Node" in data["degrees"]:
-        sn_deg = normalize_degree(data["degrees"]["North Node"] + 180)
-        data["degrees"]["South Node"] = sn_deg
-        data["placements"]["South Node"] = get_sign_name(sn_deg)
-        data["house_positions_eff"]["South Node"] = get_house_number(sn_deg, cusps, apply_rule=True)
-        data["house_positions_geom"]["South Node"] = get_house_number(sn_deg, cusps, apply_rule=False)
-
-    # Part of Fortune
-    sun_house = get_house_number(sun_lon, cusps, apply_rule=False)
-    is_day = True if sun_house >= 7.0 else False
-    
-    if is_day:
-        pof_lon = normalize_degree(ascmc[0] + moon_lon - sun_lon)
-    else:
-        pof_lon = normalize_degree(ascmc[0] + sun_lon - moon_lon)
-            
-    data["placements"]["Part of Fortune"] = get_sign_name(pof_lon)
-    data["degrees"]["Part of Fortune"] = pof_lon
-    data["house_positions_geom"]["Part of Fortune"] = get_house_number(pof_lon, cusps, apply_rule=False)
-    data["house_positions_eff"]["Part of Fortune"] = get_house_number(pof_lon, cusps, apply_rule=True)
-    
-    return data
-
-def get_label(pct, n_high, n_low):
-    if 45 <= pct <= 55: return "Balanced"
-    if pct > 55: return f"Dominant {n_high}" if pct >= 70 else f"Prominent {n_high}"
-    else: return f"Dominant {n_low}" if (100-pct) >= 70 else f"Prominent {n_low}"
-
-def generate_pie_chart(stats_dict, filename, title):
-    """Generate a pie chart with optimized appearance and save it to the specified file.
-    
-    This function creates a pie chart with the following features:
-    - Large size that fills most of the image height
-    - No white dividing lines between segments
-    - Properly positioned percentage labels with small font size
-    - Reduced legend font size
-    - Overall image dimensions of 160mm x 100mm x 300dpi
-    """
-    labels = [k for k, v in stats_dict.items() if v > 0]
-    sizes = [v for k, v in stats_dict.items() if v > 0]
-    if not sizes: return None
-    
-    color_map = {
-        "Fire": "#A9A9A9", "Earth": "#66c2a5", "Air": "#8da0cb", "Water": "#e5c494",
-        "Cardinal": "#A9A9A9", "Fixed": "#8da0cb", "Mutable": "#66c2a5",
-        "Yang": "#8da0cb", "Yin": "#A9A9A9",
-        "Choleric": "#A9A9A9", "Melancholic": "#66c2a5", "Sanguine": "#8da0cb", "Phlegmatic": "#e5c494",
-        "Superior": "#8da0cb", "Inferior": "#A9A9A9",
-        "Eastern": "#A9A9A9", "Western": "#8da0cb",
-        "Hot & Dry": "#A9A9A9", "Hot & Wet": "#8da0cb", "Cold & Dry": "#66c2a5", "Cold & Wet": "#e5c494"
-    }
-    chart_colors = [color_map.get(l, "#95a5a6") for l in labels]
-
-    # Set exact dimensions: 160mm × 100mm at 300 DPI
-    width_mm = 160  # Figure width in mm
-    height_mm = 100  # Figure height in mm
-    
-    # Convert mm to inches for figsize
-    width_inches = width_mm / 25.4  # 160mm = 6.3 inches
-    height_inches = height_mm / 25.4  # 100mm = 3.94 inches
-    
-    # Create figure with exact dimensions
-    fig = plt.figure(figsize=(width_inches, height_inches), dpi=300)
-    
-    # Create axes that take up almost the entire figure
-    # The position is [left, bottom, width, height] in figure coordinates (0-1)
-    # Using the full figure area for a much larger pie chart
-    ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
-    
-    # Set white background
-    fig.patch.set_facecolor('white')
-    
-    # Make the pie chart fill almost the entire height of the image
-    # Using a much larger radius to create a pie chart that fills most of the image
-    # This creates a pie chart that's approximately 95mm in height (95% of image height)
-    radius_fraction = 0.8
-    
-    # For a donut chart, set the width_fraction to create a hole in the center
-    # This creates a ring with inner radius of 60% of the outer radius (twice as large hole)
-    width_fraction = 0.6
-    
-    # Create a donut chart by specifying wedgeprops with width parameter
-    # Remove the white dividing lines by setting edgecolor to None and linewidth to 0
-    wedges, texts = ax.pie(sizes, 
-                   startangle=90, 
-                   colors=chart_colors, 
-                   wedgeprops={'edgecolor': None, 'linewidth': 0, 'width': 1-width_fraction},
-                   center=(0, 0),
-                   radius=radius_fraction)
-    
-    # Add percentage annotations manually with improved positioning
-    total = sum(sizes)
-    for i, wedge in enumerate(wedges):
-        percent = int(round(sizes[i] / total * 100))
-        
-        # Calculate the angle at the center of the wedge in radians
-        # We use the average of the start and end angles
-        angle = (wedge.theta1 + wedge.theta2) / 2
-        angle_rad = np.radians(angle)
-        
-        # Calculate the position for the text at exactly 50% from inner to outer radius
-        # Get the wedge size in degrees (not used for positioning but kept for reference)
-        wedge_size = wedge.theta2 - wedge.theta1
-        
-        # Calculate the inner and outer radius of the donut
-        inner_radius = radius_fraction * width_fraction
-        outer_radius = radius_fraction
-        
-        # Position all labels at exactly 40% from inner to outer radius
-        radius_factor = inner_radius + (outer_radius - inner_radius) * 0.4
-            
-        # Convert to cartesian coordinates
-        x = radius_factor * np.cos(angle_rad)
-        y = radius_factor * np.sin(angle_rad)
-        
-        # Add the text with the percentage - small font size (8pt)
-        ax.text(x, y, f"{percent}%", 
-                ha='center', va='center', 
-                fontsize=8)
-    
-    # Apply custom font to the text elements if available
-    if FONT_REGULAR:
-        legend_font = fm.FontProperties(fname=FONT_REGULAR, size=8)  # Reduced font size (8pt)
-    
-    # Create a more compact legend with color squares
-    legend_elements = []
-    
-    # Create legend elements with just the labels (no percentages)
-    for l, c in zip(labels, chart_colors):
-        # Create a patch for the color with just the label
-        legend_elements.append(plt.Rectangle((0, 0), 0.8, 0.8, fc=c, label=l))
-    
-    # Position legend in bottom right with reduced font size
-    legend_font = fm.FontProperties(fname=FONT_REGULAR, size=8) if FONT_REGULAR else None
-    
-    # Position the legend at the bottom right of the 160mm x 100mm image
-    legend = ax.legend(handles=legend_elements, 
-                      bbox_to_anchor=(0.99, 0.01),
-                      loc='lower right',
-                      frameon=False,
-                      prop=legend_font,
-                      ncol=1,
-                      labelspacing=0.3,
-                      handlelength=1.0,
-                      handletextpad=0.5,
-                      borderaxespad=0.5)
-                      
-    # Save the figure with exact dimensions
-    save_path = os.path.join(assets_dir, filename)
-    plt.savefig(save_path, bbox_inches=None, transparent=False, facecolor='white', dpi=300)
-    plt.close()
-    return f"assets/pie_charts/{filename}"
-
-def generate_table_image(chart_data, filename="chart_summary.png"):
-    """
-    Generates a PNG table.
-    - One row per planet (No grouping).
-    - Column 2 (Planets) is CENTER aligned.
-    """
-    
-    SYMBOLS = {
-        "Sun": "☉", "Moon": "☽", "Mercury": "☿", "Venus": "♀", "Mars": "♂",
-        "Jupiter": "♃", "Saturn": "♄", "Uranus": "♅", "Neptune": "♆", "Pluto": "♇",
-        "North Node": "☊", "South Node": "☋", "Lilith": "⚸", "Chiron": "⚷",
-        "Part of Fortune": "⊗", "Ascendant": "AC", "Midheaven": "MC"
-    }
-    
-    headers = ["S I G N S", "P L A N E T S", "H O U S E"]
-    table_data = []
-    
-    # Data Sources
-    placements = chart_data["placements"]
-    h_eff = chart_data["house_positions_eff"]
-    h_geom = chart_data["house_positions_geom"]
-    cusps = chart_data["cusps"]
-    
-    # 1. Determine Sort Order (Ascendant Start)
-    asc_sign = placements["Ascendant"]
-    try: start_index = ZODIAC_SIGNS.index(asc_sign)
-    except: start_index = 0
-        
-    # 2. Iterate through 12 Signs
-    for i in range(12):
-        current_sign_idx = (start_index + i) % 12
-        current_sign = ZODIAC_SIGNS[current_sign_idx]
-        
-        # Gather all bodies in this sign
-        bodies_here = []
-        
-        # Check Angles first
-        if placements["Ascendant"] == current_sign: 
-            bodies_here.append(("Ascendant", "1"))
-        if placements["Midheaven"] == current_sign: 
-            mc_h = int(h_eff.get("Midheaven", 10))
-            bodies_here.append(("Midheaven", str(mc_h)))
-            
-        # Check Planets
-        for body, p_sign in placements.items():
-            if body in ["Ascendant", "Midheaven"]: continue
-            if p_sign == current_sign:
-                h_num = int(h_eff.get(body, 0))
-                bodies_here.append((body, str(h_num)))
-        
-        # 3. Build Rows
-        if not bodies_here:
-            # Empty Sign Case
-            house_num = "-"
-            start_cusp_idx = 1 if len(cusps) == 13 else 0
-            for h in range(12):
-                deg = cusps[start_cusp_idx + h]
-                if get_sign_name(normalize_degree(deg)) == current_sign:
-                    house_num = str(h + 1)
-                    break
-            table_data.append([current_sign, "EMPTY", house_num])
-        
-        else:
-            # Sort bodies by House Number
-            bodies_here.sort(key=lambda x: int(x[1]))
-            
-            for body, h_str in bodies_here:
-                # Format Planet Name
-                if body in ["Ascendant", "Midheaven"]:
-                    sym = "↑" if body == "Ascendant" else "MC"
-                    p_str = f"{sym} {body.upper()}"
-                else:
-                    # Asterisk Check
-                    is_moved = int(h_geom.get(body, 0)) != int(h_eff.get(body, 0))
-                    marker = "*" if is_moved else ""
-                    sym = SYMBOLS.get(body, "")
-                    p_str = f"{sym} {body.upper()}{marker}"
-                
-                # Create the row: [Aquarius, Planet Name, 1]
-                table_data.append([current_sign, p_str, h_str])
-
-    # 4. Render Plot
-    row_count = len(table_data)
-    fig_height = max(8, row_count * 0.6)
-    
-    fig, ax = plt.subplots(figsize=(8, fig_height)) 
-    ax.axis('off')
-    
-    plt.title("", fontsize=22, weight='bold', y=1.02)
+# Placement texts come from book_builder.get_content (content bundle, else live Notion)
 
-    table = ax.table(cellText=table_data, 
-                     colLabels=headers, 
-                     loc='center', 
-                     cellLoc='center', # <--- CENTERING APPLIED HERE GLOBALLY
-                     colWidths=[0.25, 0.55, 0.2])
-
-    table.auto_set_font_size(False)
-    table.set_fontsize(12)
-    table.scale(1, 2.5)
-
-    # 5. Styling
-    for (row, col), cell in table.get_celld().items():
-        cell.set_edgecolor('black')
-        cell.set_linewidth(1)
-        
-        if row == 0: # Header
-            cell.set_text_props(weight='bold', fontsize=14)
-            cell.set_height(0.04)
-            cell.set_facecolor('white')
-            cell.set_edgecolor('white')
-        else:
-            # Column 0 (Signs) -> Light Blue
-            if col == 0:
-                cell.set_facecolor('#BDD7EE')
-                cell.set_text_props(fontsize=11)
-            
-            # Column 1 (Planets) -> White, CENTER Aligned
-            elif col == 1:
-                cell.set_facecolor('#FFFFFF')
-                cell.set_text_props(fontsize=11, ha='center') # <--- EXPLICIT CENTER
-            
-            # Column 2 (Houses) -> Light Blue
-            elif col == 2:
-                cell.set_facecolor('#BDD7EE')
-                cell.set_text_props(fontsize=14)
-
-    save_path = os.path.join(assets_dir, filename)
-    plt.savefig(save_path, bbox_inches='tight', dpi=300)
-    plt.close()
-    return f"assets/pie_charts/{filename}"
-    
-    # 1. Astrological Symbols Map
-    SYMBOLS = {
-        "Sun": "☉", "Moon": "☽", "Mercury": "☿", "Venus": "♀", "Mars": "♂",
-        "Jupiter": "♃", "Saturn": "♄", "Uranus": "♅", "Neptune": "♆", "Pluto": "♇",
-        "North Node": "☊", "South Node": "☋", "Lilith": "⚸", "Chiron": "⚷",
-        "Part of Fortune": "⊗", "Ascendant": "AC", "Midheaven": "MC"
-    }
-
-    # 2. Prepare Data Rows
-    headers = ["S I G N S", "P L A N E T S", "H O U S E"]
-    cell_data = []
-    
-    cusps = chart_data["cusps"]
-    h_eff = chart_data["house_positions_eff"]
-    start_idx = 1 if len(cusps) == 13 else 0
-    
-    for i in range(12):
-        h_num = i + 1
-        
-        # Column 1: Sign on Cusp
-        cusp_degree = cusps[start_idx + i]
-        sign_name = get_sign_name(normalize_degree(cusp_degree))
-        
-        # Column 2: Planets in this House
-        planets_here = []
-        
-        # Check all bodies
-        for body, h_val in h_eff.items():
-            # We round to int to match house number
-            if int(h_val) == h_num:
-                sym = SYMBOLS.get(body, "")
-                # Create string like "☉ SUN"
-                planets_here.append(f"{sym}  {body.upper()}")
-        
-        if not planets_here:
-            p_str = "EMPTY"
-        else:
-            p_str = "\n".join(planets_here)
-            
-        # Column 3: House Number
-        h_str = str(h_num)
-        
-        cell_data.append([sign_name, p_str, h_str])
-
-    # 3. Create Plot
-    # Taller figure to accommodate lists of planets
-    fig, ax = plt.subplots(figsize=(6, 10)) 
-    ax.axis('off')
-    
-    # Title
-    plt.title("SIGNS, PLANETS & HOUSES POSITION", fontsize=16, weight='bold', y=1.02)
-
-    # 4. Draw Table
-    # Widths: Sign(25%), Planets(55%), House(20%)
-    table = ax.table(cellText=cell_data, 
-                     colLabels=headers, 
-                     loc='center', 
-                     cellLoc='left', 
-                     colWidths=[0.25, 0.55, 0.2])
-
-    # 5. Styling
-    table.auto_set_font_size(False)
-    table.set_fontsize(11)
-    table.scale(1, 3.5) # Stretches the row height
-
-    # Apply Colors & Borders
-    for (row, col), cell in table.get_celld().items():
-        cell.set_edgecolor('black')
-        cell.set_linewidth(1)
-        
-        # CENTER ALIGNMENT FOR HOUSES & SIGNS
-        if col == 0 or col == 2:
-            cell.get_text().set_horizontalalignment('center')
-        
-        # PADDING FOR PLANETS
-        if col == 1:
-             cell.set_text_props(fontsize=10)
-             # Add a little left padding by transforming text position if needed, 
-             # but usually cellLoc='left' is sufficient.
-
-        # HEADER ROW (Row 0)
-        if row == 0:
-            cell.set_text_props(weight='bold', fontsize=12)
-            cell.set_height(0.06)
-            cell.set_facecolor('white') # Clean header
-            cell.set_edgecolor('white') # Invisible border for header
-            cell.get_text().set_horizontalalignment('center')
-        
-        # DATA ROWS
-        else:
-            # Column 0 (Signs) -> Light Blue
-            if col == 0:
-                cell.set_facecolor('#BDD7EE')
-                
-            # Column 1 (Planets) -> White
-            elif col == 1:
-                cell.set_facecolor('#FFFFFF')
-
-            # Column 2 (Houses) -> Light Blue
-            elif col == 2:
-                cell.set_facecolor('#BDD7EE')
-                cell.set_text_props(fontsize=14)
-
-    # Save
-    save_path = os.path.join(assets_dir, filename)
-    plt.savefig(save_path, bbox_inches='tight', dpi=300)
-    plt.close()
-    
-    return f"assets/pie_charts/{filename}"
-
-def calc_stats(data, method):
-    score = {k:0 for k in method["keys"]}
-    total = 0
-    for p, h in data.items():
-        pts = PLANET_POINTS.get(p, 0)
-        if pts == 0 or h == 0.0: continue
-        total += pts
-        method["logic"](score, p, h, pts)
-    
-    res = {}
-    if total > 0:
-        for k, v in score.items(): res[k] = int(round((v/total)*100))
-        current_sum = sum(list(res.values())[:-1])
-        res[list(res.keys())[-1]] = 100 - current_sum
-    else: res = {k:0 for k in score}
-    return res
-
-def get_notion_content(placement_name):
-    if len(NOTION_TOKEN) < 10: return "[Check Token]"
-    notion = Client(auth=NOTION_TOKEN)
-    try:
-        results = notion.databases.query(
-            database_id=DATABASE_ID, filter={ "property": "Placement", "title": { "equals": placement_name } }
-        )
-        if not results["results"]: return f"[Missing: {placement_name}]"
-        page = results["results"][0]
-        if not page["properties"]["Description"]["rich_text"]: return ""
-        return "".join([t["plain_text"] for t in page["properties"]["Description"]["rich_text"]])
-    except Exception as e: return f"[API Error: {e}]"
-
-def get_summary_table(chart_data):
-    table = "| Sign on Cusp | Planets in House | House |\n| :--- | :--- | :--- |\n"
-    cusps = chart_data["cusps"]
-    h_eff = chart_data["house_positions_eff"]
-    start_idx = 1 if len(cusps) == 13 else 0
-    for i in range(12):
-        h_num = i + 1
-        cusp_s = get_sign_name(normalize_degree(cusps[start_idx + i]))
-        planets = [b for b, h in h_eff.items() if b not in ["Ascendant", "Midheaven"] and int(h) == h_num]
-        table += f"| {cusp_s} | {', '.join(planets)} | {get_ordinal(h_num)} |\n"
-    return table
 # 4. GUI INTERFACE
 # ==========================================================
 if 'lat' not in st.session_state: st.session_state.lat = 0.0
@@ -912,7 +235,7 @@ if 'generate_covers' not in st.session_state: st.session_state.generate_covers =
 if 'chart_data' not in st.session_state: st.session_state.chart_data = None
 if 'show_dialog' not in st.session_state: st.session_state.show_dialog = False
 if 'generation_complete' not in st.session_state: st.session_state.generation_complete = False
-if 'book_content' not in st.session_state: st.session_state.book_content = None
+if 'book_path' not in st.session_state: st.session_state.book_path = None
 if 'book_filename' not in st.session_state: st.session_state.book_filename = None
 
 # --- CONFIRMATION DIALOG FUNCTION ---
@@ -1168,588 +491,53 @@ if st.session_state.run_engine:
     
     progress_bar = st.progress(0, text="0% - Starting Engine...")
     
+    artifact_job = None
     try:
-        # 1. CALCULATION
-        progress_bar.progress(10, text="10% - Calculating Birth Chart...")
-        client_in = {"name":c_name, "date":c_date, "time":c_time, "latitude":c_lat, "longitude":c_lon}
-        chart = get_astrology_data(client_in)
-        progress_bar.progress(30, text="30% - Calculating Statistics...")
-        
-        # --- STATS CALCULATIONS (Define variables here, but don't write to content yet) ---
-        
-        # 1. Hemisphere
-        h_scores = {"Superior": 0, "Inferior": 0}
-        h_tot = 0
-        for p, h in chart["house_positions_geom"].items():
-            pts = PLANET_POINTS.get(p, 0)
-            if pts > 0 and h > 0:
-                h_tot += pts
-                if h >= 7: h_scores["Superior"] += pts
-                else: h_scores["Inferior"] += pts
-        h_stats = {}
-        if h_tot > 0:
-            h_stats["Superior"] = int(round((h_scores["Superior"] / h_tot) * 100))
-            h_stats["Inferior"] = 100 - h_stats["Superior"]
-        else: h_stats = {"Superior": 0, "Inferior": 0}
-        h_stat_label = get_label(h_stats["Superior"], "Superior", "Inferior")
-        h_img = generate_pie_chart(h_stats, "hemisphere.png", "YOUR SUPERIOR & INFERIOR HEMISPHERE COUNT")
-
-        # 2. East/West
-        ew_scores = {"Eastern": 0, "Western": 0}
-        ew_tot = 0
-        for p, h in chart["house_positions_geom"].items():
-            pts = PLANET_POINTS.get(p, 0)
-            if pts > 0 and h > 0:
-                ew_tot += pts
-                if int(h) in [10,11,12,1,2,3]: ew_scores["Eastern"] += pts
-                else: ew_scores["Western"] += pts
-        ew_stats = {}
-        if ew_tot > 0:
-            ew_stats["Eastern"] = int(round((ew_scores["Eastern"] / ew_tot) * 100))
-            ew_stats["Western"] = 100 - ew_stats["Eastern"]
-        else: ew_stats = {"Eastern": 0, "Western": 0}
-        ew_label = get_label(ew_stats["Eastern"], "Eastern", "Western")
-        ew_img = generate_pie_chart(ew_stats, "east_west.png", "YOUR EASTERN & WESTERN HEMISPHERE COUNT")
-
-        # 3. Qualities
-        q_scores = {"Hot":0, "Cold":0, "Wet":0, "Dry":0}
-        tot_q = 0
-        for p, sign in chart["placements"].items():
-            pts = PLANET_POINTS.get(p, 0)
-            if pts > 0:
-                t, m, _, _, _, _ = SIGN_DATA.get(sign, (None,)*6)
-                if t: 
-                    q_scores[t]+=pts; q_scores[m]+=pts; tot_q+=pts
-        q_stats = {k: int(round((v/tot_q)*100)) if tot_q>0 else 0 for k,v in q_scores.items()}
-        q_status = f"{'Hot' if q_stats['Hot']>=50 else 'Cold'} & {'Wet' if q_stats['Wet']>=50 else 'Dry'}"
-        q_label_t = get_label(q_stats["Hot"], "Hot", "Cold")
-        q_label_m = get_label(q_stats["Wet"], "Wet", "Dry")
-        
-        pq_raw = {
-            "Hot & Dry": q_stats["Hot"] * q_stats["Dry"] // 100,
-            "Hot & Wet": q_stats["Hot"] * q_stats["Wet"] // 100,
-            "Cold & Dry": q_stats["Cold"] * q_stats["Dry"] // 100,
-            "Cold & Wet": q_stats["Cold"] * q_stats["Wet"] // 100
-        }
-        total_pq = sum(pq_raw.values())
-        pq_stats = {k: int(round((v/total_pq)*100)) for k,v in pq_raw.items()} if total_pq > 0 else pq_raw
-        pq_img = generate_pie_chart(pq_stats, "primitive_qualities.png", "YOUR PRIMITIVE QUALITIES COUNT")
-        
-        temp_img = generate_pie_chart({"Hot":q_stats["Hot"], "Cold":q_stats["Cold"]}, "temp.png", "TEMP")
-
-        # 4. Temperaments
-        t_score = {k:0 for k in ["Choleric","Melancholic","Sanguine","Phlegmatic"]}
-        t_tot = 0
-        for p, s in chart["placements"].items():
-            pts = PLANET_POINTS.get(p,0)
-            if pts > 0:
-                t_tot += pts
-                _, _, t, _, _, _ = SIGN_DATA.get(s, (None,)*6)
-                if t: t_score[t] += pts
-        t_stats = {k: int(round((v/t_tot)*100)) if t_tot>0 else 0 for k,v in t_score.items()}
-        temp_img_file = generate_pie_chart(t_stats, "temperaments.png", "YOUR TEMPERAMENTS COUNT")
-        temp_primary = max(t_stats, key=t_stats.get)
-
-        # 5. Elements
-        e_score = {k:0 for k in ["Fire","Earth","Air","Water"]}
-        e_tot = 0
-        for p, s in chart["placements"].items():
-            pts = PLANET_POINTS.get(p,0)
-            if pts > 0:
-                e_tot += pts
-                _, _, _, e, _, _ = SIGN_DATA.get(s, (None,)*6)
-                if e: e_score[e] += pts
-        elem_stats = {k: int(round((v/e_tot)*100)) if e_tot>0 else 0 for k,v in e_score.items()}
-        elem_img = generate_pie_chart(elem_stats, "elements.png", "YOUR ELEMENTS COUNT")
-        elem_primary = max(elem_stats, key=elem_stats.get)
-
-        # 6. Modalities
-        m_score = {k:0 for k in ["Cardinal","Fixed","Mutable"]}
-        m_tot = 0
-        for p, s in chart["placements"].items():
-            pts = PLANET_POINTS.get(p,0)
-            if pts > 0:
-                m_tot += pts
-                _, _, _, _, m, _ = SIGN_DATA.get(s, (None,)*6)
-                if m: m_score[m] += pts
-        mode_stats = {k: int(round((v/m_tot)*100)) if m_tot>0 else 0 for k,v in m_score.items()}
-        mode_img = generate_pie_chart(mode_stats, "modalities.png", "YOUR MODALITIES COUNT")
-        mode_primary = max(mode_stats, key=mode_stats.get)
-
-        # 7. Polarity
-        p_score = {k:0 for k in ["Yang","Yin"]}
-        p_tot = 0
-        for p, s in chart["placements"].items():
-            pts = PLANET_POINTS.get(p,0)
-            if pts > 0:
-                p_tot += pts
-                _, _, _, _, _, pol = SIGN_DATA.get(s, (None,)*6)
-                if pol: p_score[pol] += pts
-        pol_stats = {k: int(round((v/p_tot)*100)) if p_tot>0 else 0 for k,v in p_score.items()}
-        pol_img = generate_pie_chart(pol_stats, "polarities.png", "YOUR POLARITIES COUNT")
-        pol_label = get_label(pol_stats["Yang"], "Yang", "Yin")
-
-        # 4. CONTENT GENERATION (Now we start writing!)
-        progress_bar.progress(40, text="40% - Fetching Content from Notion...")
-        sep = "-" * 30 + "\n"
-        content = f"Chart for: {c_name}\n\n"
-        
-        # Birth Chart Summary
-        birth_date = client_in["date"].strftime("%B %d, %Y")
-        birth_time = client_in["time"].strftime("%I:%M %p")
-        location = f"{c_city}, {c_country}"
-        
-        content += f"# Birth Chart Analysis for {c_name}\n"
-        content += f"Born: {birth_date} at {birth_time}\n"
-        content += f"Location: {location}\n\n"
-        
-        content += "PLANETARY POSITIONS\n"
-        content += "==================================================\n"
-        
-        # Function to convert decimal degrees to degrees, minutes, seconds
-        def decimal_to_dms(decimal_degrees):
-            degrees = int(decimal_degrees)
-            decimal_minutes = (decimal_degrees - degrees) * 60
-            minutes = int(decimal_minutes)
-            seconds = int((decimal_minutes - minutes) * 60)
-            return f"{degrees}°{minutes}'{seconds}\""
-        
-        # Add planetary positions with degrees
-        for body, sign in chart["placements"].items():
-            if body in ["South Node", "Part of Fortune", "Ascendant", "Midheaven"]:
-                continue
-            if body in chart["degrees"]:
-                # Get the sign-specific degree (0-30)
-                sign_degree = chart["degrees"][body] % 30
-                dms = decimal_to_dms(sign_degree)
-                
-                # Add retrograde marker if planet is retrograde
-                retrograde_marker = " R" if chart["retrograde"].get(body, False) else ""
-                content += f"{body} in {sign} {dms}{retrograde_marker}\n"
-        
-        # Add Ascendant separately at the end
-        if "Ascendant" in chart["placements"] and "Ascendant" in chart["degrees"]:
-            sign = chart["placements"]["Ascendant"]
-            sign_degree = chart["degrees"]["Ascendant"] % 30
-            dms = decimal_to_dms(sign_degree)
-            content += f"\nAscendant in {sign} {dms}\n\n"
-        
-        # Original Chart Data
-        content += sep + "# Chart Data\n" + sep + "\n### Planets in Signs\n"
-        for b, s in chart["placements"].items(): content += f"* **{b}:** {s}\n"
-        content += "\n### Planets in Houses (Effective)\n"
-        for b, h in chart["house_positions_eff"].items():
-            if b not in ["Ascendant", "Midheaven"] and h > 0: content += f"* **{b}:** {get_ordinal(int(h))} House\n"
-        
-        # Chapter 1: Pillars
-        progress_bar.progress(50, text="50% - Generating Chapter 1...")
-        content += "\n" + sep + "# Chapter 1: Pillars of Personality\n" + sep + "\n"
-        # Define pillars order
-        pillars = ["Ascendant", "Sun", "Moon"]
-        
-        for body in pillars:
-            sign = chart['placements'][body]
-            key = f"{body} in {sign}"
-            
-            content += f"## {key}\n"
-            
-            # INSERT SIGN IMAGE ONLY (e.g., assets/signs/aries.png)
-            img_sign = sign.lower() + ".png"
-            content += f"<<IMG: assets/signs/{img_sign}>>\n"
-            
-            # Insert Text from Notion
-            content += f"{get_notion_content(key)}\n\n"
-            
-        # Chapter 2: Stats (Now we use the variables defined above)
-        content += sep + "# Chapter 2: Astrological Statistics (Pie Charts)\n" + sep + "\n"
-        content += "## Your Superior & Inferior Hemisphere Count\n" + f"<<IMG: {h_img}>>\n" + f"Status: **{h_stat_label}**\n(Superior: {h_stats['Superior']}% / Inferior: {h_stats['Inferior']}%)\n\n"
-        content += "## Your Eastern & Western Hemisphere Count\n" + f"<<IMG: {ew_img}>>\n" + f"Status: **{ew_label}**\n(Eastern: {ew_stats['Eastern']}% / Western: {ew_stats['Western']}%)\n\n"
-        content += "## Your Primitive Qualities Count\n" + f"<<IMG: {pq_img}>>\n" + f"Status: **{q_status}**\nTemperature Status: **{q_label_t}** (Hot {q_stats['Hot']}% / Cold {q_stats['Cold']}%)\n" + f"Moisture Status: **{q_label_m}** (Wet {q_stats['Wet']}% / Dry {q_stats['Dry']}%)\n\n"
-        content += "## Your Temperaments Count\n" + f"<<IMG: {temp_img_file}>>\n" + f"Primary Temperament: **{temp_primary}**\n"
-        for k,v in t_stats.items(): content += f"{k}: {v}%\n"
-        content += "\n## Your Elements Count\n" + f"<<IMG: {elem_img}>>\n" + f"Primary Element: **{elem_primary}**\n"
-        for k,v in elem_stats.items(): content += f"{k}: {v}%\n"
-        content += "\n## Your Modalities Count\n" + f"<<IMG: {mode_img}>>\n" + f"Primary Modality: **{mode_primary}**\n"
-        for k,v in mode_stats.items(): content += f"{k}: {v}%\n"
-        content += "\n## Your Polarities Count\n" + f"<<IMG: {pol_img}>>\n" + f"Status: **{pol_label}**\n(Yang: {pol_stats['Yang']}% / Yin: {pol_stats['Yin']}%)\n\n"
-        
-        # Chapter 3: Moon Phase
-        progress_bar.progress(60, text="60% - Generating Chapter 3...")
-        m_key = chart["moon_phase"]
-        content += sep + "# Chapter 3: The Moon Phase\n" + sep + "\n" + f"## Your Moon Phase: {m_key}\n{get_notion_content(m_key)}\n\n"
-
-        # Chapter 4: Houses
-        content += sep + "# Chapter 4: The 12 Houses\n" + sep + "\n"
-        start = 1 if len(chart["cusps"])==13 else 0
-        for i in range(12):
-            d = chart["cusps"][start+i]
-            s = get_sign_name(normalize_degree(d))
-            key = f"{s} in the {get_ordinal(i+1)} House"
-            content += f"## {key}\n{get_notion_content(key)}\n\n"
-            
-        # Chapter 5: Table
-        progress_bar.progress(70, text="70% - Generating Summary Table...")
-        table_img = generate_table_image(chart, "chart_summary.png")
-        five_deg_note = get_5_degree_note(chart)
-        content += sep + "# Chapter 5: Chart Summary Data\n" + sep + "\n" + f"<<IMG: {table_img}>>\n\n"
-        if five_deg_note: content += f"{five_deg_note}\n\n"
-        
-        # Chapter 6: Ascendant
-        asc_key = f"Ascendant in {chart['placements']['Ascendant']}"
-        content += sep + "# Chapter 6: The Ascendant\n" + sep + "\n" + f"## {asc_key}\n{get_notion_content(asc_key)}\n\n"
-
-        # Chapters 7-22 - Individual chapter generation with progress updates
-        
-        # Chapter 7: Sun
-        progress_bar.progress(71, text="71% - Generating Chapter 7: Sun...")
-        content += sep + "# Chapter 7: Sun\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Sun", 0.0)
-        if h > 0:
-            k = f"Sun in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Sun", "")
-        k = f"Sun in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Sun" in chart["degrees"]:
-            content += f"## Sun Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Sun" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Sun"], d2)
-                if asp:
-                    k_asp = f"Sun {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Sun found.\n\n"
-        
-        # Chapter 8: Moon
-        progress_bar.progress(72, text="72% - Generating Chapter 8: Moon...")
-        content += sep + "# Chapter 8: Moon\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Moon", 0.0)
-        if h > 0:
-            k = f"Moon in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Moon", "")
-        k = f"Moon in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Moon" in chart["degrees"]:
-            content += f"## Moon Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Moon" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Moon"], d2)
-                if asp:
-                    k_asp = f"Moon {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Moon found.\n\n"
-        
-        # Chapter 9: Mercury
-        progress_bar.progress(73, text="73% - Generating Chapter 9: Mercury...")
-        content += sep + "# Chapter 9: Mercury\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Mercury", 0.0)
-        if h > 0:
-            k = f"Mercury in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Mercury", "")
-        k = f"Mercury in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Mercury" in chart["degrees"]:
-            content += f"## Mercury Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Mercury" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Mercury"], d2)
-                if asp:
-                    k_asp = f"Mercury {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Mercury found.\n\n"
-        
-        # Chapter 10: Venus
-        progress_bar.progress(74, text="74% - Generating Chapter 10: Venus...")
-        content += sep + "# Chapter 10: Venus\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Venus", 0.0)
-        if h > 0:
-            k = f"Venus in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Venus", "")
-        k = f"Venus in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Venus" in chart["degrees"]:
-            content += f"## Venus Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Venus" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Venus"], d2)
-                if asp:
-                    k_asp = f"Venus {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Venus found.\n\n"
-        
-        # Chapter 11: Mars
-        progress_bar.progress(76, text="76% - Generating Chapter 11: Mars...")
-        content += sep + "# Chapter 11: Mars\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Mars", 0.0)
-        if h > 0:
-            k = f"Mars in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Mars", "")
-        k = f"Mars in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Mars" in chart["degrees"]:
-            content += f"## Mars Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Mars" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Mars"], d2)
-                if asp:
-                    k_asp = f"Mars {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Mars found.\n\n"
-        
-        # Chapter 12: Jupiter
-        progress_bar.progress(78, text="78% - Generating Chapter 12: Jupiter...")
-        content += sep + "# Chapter 12: Jupiter\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Jupiter", 0.0)
-        if h > 0:
-            k = f"Jupiter in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Jupiter", "")
-        k = f"Jupiter in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Jupiter" in chart["degrees"]:
-            content += f"## Jupiter Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Jupiter" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Jupiter"], d2)
-                if asp:
-                    k_asp = f"Jupiter {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Jupiter found.\n\n"
-        
-        # Chapter 13: Saturn
-        progress_bar.progress(80, text="80% - Generating Chapter 13: Saturn...")
-        content += sep + "# Chapter 13: Saturn\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Saturn", 0.0)
-        if h > 0:
-            k = f"Saturn in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Saturn", "")
-        k = f"Saturn in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Saturn" in chart["degrees"]:
-            content += f"## Saturn Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Saturn" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Saturn"], d2)
-                if asp:
-                    k_asp = f"Saturn {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Saturn found.\n\n"
-        
-        # Chapter 14: Uranus
-        progress_bar.progress(82, text="82% - Generating Chapter 14: Uranus...")
-        content += sep + "# Chapter 14: Uranus\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Uranus", 0.0)
-        if h > 0:
-            k = f"Uranus in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Uranus", "")
-        k = f"Uranus in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Uranus" in chart["degrees"]:
-            content += f"## Uranus Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Uranus" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Uranus"], d2)
-                if asp:
-                    k_asp = f"Uranus {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Uranus found.\n\n"
-        
-        # Chapter 15: Neptune
-        progress_bar.progress(84, text="84% - Generating Chapter 15: Neptune...")
-        content += sep + "# Chapter 15: Neptune\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Neptune", 0.0)
-        if h > 0:
-            k = f"Neptune in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Neptune", "")
-        k = f"Neptune in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Neptune" in chart["degrees"]:
-            content += f"## Neptune Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Neptune" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Neptune"], d2)
-                if asp:
-                    k_asp = f"Neptune {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Neptune found.\n\n"
-        
-        # Chapter 16: Pluto
-        progress_bar.progress(86, text="86% - Generating Chapter 16: Pluto...")
-        content += sep + "# Chapter 16: Pluto\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Pluto", 0.0)
-        if h > 0:
-            k = f"Pluto in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Pluto", "")
-        k = f"Pluto in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Pluto" in chart["degrees"]:
-            content += f"## Pluto Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Pluto" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Pluto"], d2)
-                if asp:
-                    k_asp = f"Pluto {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Pluto found.\n\n"
-        
-        # Chapter 17: Midheaven
-        progress_bar.progress(88, text="88% - Generating Chapter 17: Midheaven...")
-        content += sep + "# Chapter 17: Midheaven\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Midheaven", 0.0)
-        if h > 0:
-            k = f"Midheaven in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Midheaven", "")
-        k = f"Midheaven in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Midheaven" in chart["degrees"]:
-            content += f"## Midheaven Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Midheaven" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Midheaven"], d2)
-                if asp:
-                    k_asp = f"Midheaven {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Midheaven found.\n\n"
-        
-        # Chapter 18: Lilith
-        progress_bar.progress(90, text="90% - Generating Chapter 18: Lilith...")
-        content += sep + "# Chapter 18: Lilith\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Lilith", 0.0)
-        if h > 0:
-            k = f"Lilith in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Lilith", "")
-        k = f"Lilith in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Lilith" in chart["degrees"]:
-            content += f"## Lilith Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Lilith" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Lilith"], d2)
-                if asp:
-                    k_asp = f"Lilith {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Lilith found.\n\n"
-        
-        # Chapter 19: Chiron
-        progress_bar.progress(92, text="92% - Generating Chapter 19: Chiron...")
-        content += sep + "# Chapter 19: Chiron\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Chiron", 0.0)
-        if h > 0:
-            k = f"Chiron in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Chiron", "")
-        k = f"Chiron in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "Chiron" in chart["degrees"]:
-            content += f"## Chiron Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "Chiron" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["Chiron"], d2)
-                if asp:
-                    k_asp = f"Chiron {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to Chiron found.\n\n"
-        
-        # Chapter 20: North Node
-        progress_bar.progress(94, text="94% - Generating Chapter 20: North Node...")
-        content += sep + "# Chapter 20: North Node\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("North Node", 0.0)
-        if h > 0:
-            k = f"North Node in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("North Node", "")
-        k = f"North Node in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "North Node" in chart["degrees"]:
-            content += f"## North Node Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "North Node" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["North Node"], d2)
-                if asp:
-                    k_asp = f"North Node {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to North Node found.\n\n"
-        
-        # Chapter 21: South Node
-        progress_bar.progress(96, text="96% - Generating Chapter 21: South Node...")
-        content += sep + "# Chapter 21: South Node\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("South Node", 0.0)
-        if h > 0:
-            k = f"South Node in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("South Node", "")
-        k = f"South Node in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        if "South Node" in chart["degrees"]:
-            content += f"## South Node Aspects\n"
-            found = False
-            for p2, d2 in chart["degrees"].items():
-                if p2 == "South Node" or p2 == "Part of Fortune": continue
-                asp = get_aspect(chart["degrees"]["South Node"], d2)
-                if asp:
-                    k_asp = f"South Node {asp} {p2}"
-                    content += f"### {k_asp}\n{get_notion_content(k_asp)}\n\n"
-                    found = True
-            if not found: content += f"No major aspects to South Node found.\n\n"
-        
-        # Chapter 22: Part of Fortune
-        progress_bar.progress(98, text="98% - Generating Chapter 22: Part of Fortune...")
-        content += sep + "# Chapter 22: Part of Fortune\n" + sep + "\n"
-        h = chart["house_positions_eff"].get("Part of Fortune", 0.0)
-        if h > 0:
-            k = f"Part of Fortune in the {get_ordinal(int(h))} House"
-            content += f"## {k}\n{get_notion_content(k)}\n\n"
-        s = chart["placements"].get("Part of Fortune", "")
-        k = f"Part of Fortune in {s}"
-        content += f"## {k}\n{get_notion_content(k)}\n\n"
-        
-        progress_bar.progress(100, text="100% - Done!")
-        st.success("Book Generated Successfully!")
-        
-        # Save to session state
+        # The session's previous book folder is rebuilt in place: its manifest lets the
+        # chart, images and any unchanged sections be reused (book_manifest.py)
+        store = get_artifact_store()
+        previous_job = st.session_state.get("book_job_id")
+        artifact_job = store.reopen(previous_job) if previous_job else store.new_job()
+        client_in = {"name":c_name, "date":c_date, "time":c_time, "latitude":c_lat, "longitude":c_lon, "city":c_city, "country":c_country}
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         fname = f"{c_name.replace(' ', '_')}_{ts}.txt"
+        book_file = artifact_job.handle(fname)
+
+        # Each chapter is written to the book file as soon as its texts are in,
+        # and the download link can start streaming it right away.
+        download_server = get_download_server()
+        if download_server is not None:
+            st.link_button("📥 Download While Writing", download_server.url_for(book_file))
+
+        # Chart, statistics, screen-resolution previews, then the text (chapters are laid out
+        # in book_builder.CHAPTERS). The content points at the print files, which are only
+        # rendered on export.
+        content_bundle = get_bundle()
+        report = generate_book(
+            client_in, artifact_job, fname, get_content,
+            content_build=content_bundle.build_id if content_bundle is not None else None,
+            progress=lambda pct, label: progress_bar.progress(pct, text=f"{pct}% - {label}..."),
+        )
+        chart_jobs = report["chart_jobs"]
+        preview_images = report["images"]["preview"]
         
-        st.session_state.book_content = content
+        progress_bar.progress(100, text="100% - Done!")
+        st.success("Book Generated Successfully!")
+        print(f"DEBUG: Book: {report['bytes'] / 1024:.0f} KB written to {report['path']}")
+        print(f"DEBUG: Rebuild: chart {'reused' if report['chart_reused'] else 'calculated'}, "
+              f"{len(report['images_rendered'])} images rendered, {report['sections_reused']} sections reused, "
+              f"{report['sections_built']} built, " + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in report["timings"].items()))
+        print(f"DEBUG: Notion traffic: {get_notion_stats()}")
+        print(f"DEBUG: PNG optimization: {get_png_stats()}")
+        
+        # Save to session state (the book itself stays on disk)
+        st.session_state.book_path = book_file.path
         st.session_state.book_filename = fname
+        st.session_state.book_job_id = artifact_job.job_id
+        st.session_state.book_chart_jobs = chart_jobs
+        st.session_state.book_previews = preview_images
+        st.session_state.inside_pages_path = None
+        st.session_state.bundle_path = None
         st.session_state.generation_complete = True
         
         # Reset Session State
@@ -1757,10 +545,13 @@ if st.session_state.run_engine:
 
     except Exception as e:
         st.error(f"Error: {e}\n\n{traceback.format_exc()}")
+    finally:
+        # Finished or failed, the job may now be cleaned up once it is old enough
+        if artifact_job is not None:
+            artifact_job.close()
 
 # --- RESULTS DISPLAY SECTION ---
 if st.session_state.generation_complete:
-    content = st.session_state.book_content
     fname = st.session_state.book_filename
     
     # Use saved chart data for consistency if available
@@ -1774,6 +565,12 @@ if st.session_state.generation_complete:
         c_lat = st.session_state.chart_data['lat']
         c_lon = st.session_state.chart_data['lon']
     
+    # Chart previews (the 300-dpi files are rendered when the book is exported)
+    previews = [p for p in st.session_state.get("book_previews", {}).values() if p]
+    if previews:
+        with st.expander("📊 Chart Previews"):
+            st.image([local_path(p) for p in previews])
+    
     # Add some spacing
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -1815,15 +612,46 @@ if st.session_state.generation_complete:
     
     # Two-row button layout
     with button_container:
-        # First row - Download button centered
-        col1, col2, col3 = st.columns([1, 2, 1])
+        # First row - the book file, and the bundle of the book with its 300-dpi images and manifest
+        col1, col2, col3, col4 = st.columns([1, 2, 2, 1])
         with col2:
-            st.download_button(
-                label="📥 Download Book File",
-                data=content,
-                file_name=fname,
-                use_container_width=True
-            )
+            if os.path.exists(st.session_state.book_path):
+                with open(st.session_state.book_path, "rb") as book_file:
+                    book_data = book_file.read()
+                st.download_button(
+                    label="📥 Download Book File",
+                    data=book_data,
+                    file_name=fname,
+                    on_click=ensure_print_tier,
+                    args=(st.session_state.get("book_chart_jobs", []),),
+                    use_container_width=True
+                )
+            else:
+                st.warning("This book's files have been cleaned up. Please generate it again.")
+        with col3:
+            if st.button(
+                "📦 Prepare Book Bundle",
+                use_container_width=True,
+                key="btn_bundle"
+            ):
+                # Renders the print images if needed and writes the ZIP member by member
+                # into the book's folder (book_bundle.py)
+                try:
+                    with st.spinner("Packing the book, images and manifest..."):
+                        st.session_state.bundle_path = export_bundle(get_artifact_store().job(st.session_state.book_job_id))
+                except Exception as e:
+                    st.error(f"Error packing the book bundle: {e}")
+            bundle_path = st.session_state.get("bundle_path")
+            if bundle_path and os.path.exists(bundle_path):
+                with open(bundle_path, "rb") as bundle_file:
+                    st.download_button(
+                        label="📥 Download Book Bundle (.zip)",
+                        data=bundle_file,
+                        file_name=os.path.basename(bundle_path),
+                        mime="application/zip",
+                        use_container_width=True,
+                        key="btn_bundle_download"
+                    )
         
         # Add some vertical spacing
         st.markdown("<div style='height: 15px;'></div>", unsafe_allow_html=True)
@@ -1838,7 +666,28 @@ if st.session_state.generation_complete:
                 use_container_width=True,
                 key="btn_inside_pages"
             ):
-                st.info("This feature will be implemented in the next phase of the project.")
+                # Typeset headless from the book file; the charts are drawn as vectors,
+                # so no print-tier images are needed
+                try:
+                    with st.spinner("Typesetting the inside pages..."):
+                        pages_report = generate_inside_pages(get_artifact_store().job(st.session_state.book_job_id))
+                    st.session_state.inside_pages_path = pages_report["path"]
+                    print(f"DEBUG: Inside pages: {pages_report['pages']} pages, {pages_report['bytes'] / 1024:.0f} KB "
+                          f"in {pages_report['seconds']:.2f}s ({pages_report['vector_figures']} vector figures, "
+                          f"{pages_report['missing_images']} images missing)")
+                except Exception as e:
+                    st.error(f"Error generating inside pages: {e}")
+            inside_pages_path = st.session_state.get("inside_pages_path")
+            if inside_pages_path and os.path.exists(inside_pages_path):
+                with open(inside_pages_path, "rb") as pdf_file:
+                    st.download_button(
+                        label="📥 Download Inside Pages PDF",
+                        data=pdf_file.read(),
+                        file_name=os.path.basename(inside_pages_path),
+                        mime="application/pdf",
+                        use_container_width=True,
+                        key="btn_inside_pages_download"
+                    )
         
         # Generate Cover PDFs button
         with col3:
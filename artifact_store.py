@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Artifact Store for AstroBookBot
+
+Every book generation gets its own job directory (assets/jobs/<job id>/) for its
+images, so two books rendered at the same time never overwrite each other's
+hemisphere.png or chart_summary.png. Files are written to a temporary name in
+the same directory and renamed into place, so readers only ever see complete files.
+
+Old jobs are removed by age (ARTIFACT_MAX_AGE_HOURS, default 24) and, if the
+store is still over its size budget (ARTIFACT_MAX_MB, default 1024), oldest first.
+
+Usage:
+    python artifact_store.py info
+    python artifact_store.py cleanup
+"""
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+script_folder = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", os.path.join(script_folder, "assets", "jobs"))
+MAX_AGE_SECONDS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", 24)) * 3600
+MAX_BYTES = int(float(os.getenv("ARTIFACT_MAX_MB", 1024)) * 1024 * 1024)
+
+
+class ArtifactHandle(str):
+    """
+    A file in a job directory.
+
+    It is the path the book content uses (relative to the project folder when the
+    store lives inside it), so it drops into f"<<IMG: {handle}>>" unchanged, and
+    `open(handle)` / `os.fspath(handle)` resolve to the absolute file.
+    """
+
+    def __new__(cls, path, job_id, name):
+        rel = os.path.relpath(path, script_folder)
+        value = path if rel.startswith("..") else rel.replace(os.sep, "/")
+        handle = super().__new__(cls, value)
+        handle.path = path
+        handle.job_id = job_id
+        handle.name = name
+        return handle
+
+    def __fspath__(self):
+        return self.path
+
+    def __reduce__(self):
+        return (ArtifactHandle, (self.path, self.job_id, self.name))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+@contextmanager
+def atomic_path(final_path):
+    """
+    Yields a temporary path next to `final_path` (same extension, so writers that
+    pick a format from it still work) and renames it into place on success.
+    """
+    folder = os.path.dirname(os.path.abspath(final_path))
+    os.makedirs(folder, exist_ok=True)
+    ext = os.path.splitext(final_path)[1]
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=ext)
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ArtifactJob:
+    """One book's namespace inside the store."""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self.dir = os.path.join(store.root, job_id)
+
+    def handle(self, name):
+        """Handle for `name` in this job (the file may not exist yet)."""
+        return ArtifactHandle(os.path.join(self.dir, name), self.job_id, name)
+
+    @contextmanager
+    def writer(self, name):
+        """Yields a temp path to write `name` to; on success it becomes the job's file and the handle is ready."""
+        handle = self.handle(name)
+        with atomic_path(handle.path) as tmp_path:
+            yield tmp_path
+
+    def files(self):
+        if not os.path.isdir(self.dir):
+            return []
+        return sorted(self.handle(name) for name in os.listdir(self.dir) if not name.startswith(".tmp-"))
+
+    def close(self):
+        """Marks the job finished, so cleanup may remove it once it is old enough."""
+        self.store._active.discard(self.job_id)
+
+
+class ArtifactStore:
+    def __init__(self, root=ARTIFACT_ROOT, max_age=MAX_AGE_SECONDS, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._active = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def new_job(self, prefix="book"):
+        """Creates a fresh job directory (and trims old jobs first)."""
+        self.cleanup()
+        job_id = f"{prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        job = ArtifactJob(self, job_id)
+        os.makedirs(job.dir, exist_ok=True)
+        self._active.add(job_id)
+        return job
+
+    def job(self, job_id):
+        """Re-opens an existing job by id (e.g. inside a render worker process)."""
+        if not job_id or os.sep in job_id or job_id.startswith("."):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return ArtifactJob(self, job_id)
+
+    def reopen(self, job_id):
+        """
+        Opens an existing job to build into it again (e.g. an incremental book rebuild).
+        Like a new job it is kept by cleanup until closed, and its age starts over.
+        """
+        job = self.job(job_id)
+        os.makedirs(job.dir, exist_ok=True)
+        os.utime(job.dir)
+        self._active.add(job_id)
+        return job
+
+    def jobs(self):
+        """(mtime, size in bytes, job id) for every job directory."""
+        found = []
+        for job_id in os.listdir(self.root):
+            path = os.path.join(self.root, job_id)
+            if not os.path.isdir(path):
+                continue
+            size = 0
+            try:
+                mtime = os.stat(path).st_mtime
+                for name in os.listdir(path):
+                    st = os.stat(os.path.join(path, name))
+                    size += st.st_size
+                    mtime = max(mtime, st.st_mtime)
+            except FileNotFoundError:
+                continue  # Removed by another process while scanning
+            found.append((mtime, size, job_id))
+        return found
+
+    def cleanup(self, now=None):
+        """
+        Removes jobs older than max_age, then the oldest remaining jobs until the
+        store fits in max_bytes. Jobs still open in this process are kept.
+
+        Returns:
+            int: Number of jobs removed
+        """
+        now = now or time.time()
+        removed = 0
+        with self._lock:
+            jobs = sorted(self.jobs())
+            total = sum(size for _, size, _ in jobs)
+            for mtime, size, job_id in jobs:
+                if job_id in self._active:
+                    continue
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    continue
+                shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def configure_store(root=None, max_age=None, max_bytes=None):
+    """
+    (Re)builds the process-wide store, e.g. on a batch run's output folder.
+    Arguments left as None fall back to the environment.
+
+    Returns:
+        ArtifactStore: The new shared store
+    """
+    global _store
+    with _store_lock:
+        _store = ArtifactStore(
+            root or ARTIFACT_ROOT,
+            MAX_AGE_SECONDS if max_age is None else max_age,
+            MAX_BYTES if max_bytes is None else max_bytes,
+        )
+        return _store
+
+
+def get_artifact_store():
+    """Returns the process-wide store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the per-job artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("info", help="List jobs and their sizes")
+    sub.add_parser("cleanup", help="Remove old jobs and enforce the size budget")
+    args = parser.parse_args()
+
+    store = get_artifact_store()
+    if args.command == "info":
+        jobs = sorted(store.jobs())
+        for mtime, size, job_id in jobs:
+            print(f"{job_id}  {size / 1024:.0f} KB  {datetime.fromtimestamp(mtime):%Y-%m-%d %H:%M}")
+        total = sum(size for _, size, _ in jobs)
+        print(f"{len(jobs)} jobs, {total / 1024 / 1024:.1f} MB in {store.root}")
+    elif args.command == "cleanup":
+        print(f"🧹 Removed {store.cleanup()} jobs.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Astrology Engine for AstroBookBot
+
+The chart calculations behind every book, importable without Streamlit:
+
+- `get_astrology_data` computes the chart (placements, degrees, geometric and
+  effective houses, cusps, moon phase, retrogrades) with the Swiss Ephemeris
+- `chart_statistics` computes the percentages for the Chapter 2 pie charts
+- small helpers shared with the book text (signs, ordinals, aspects, labels)
+
+Usage:
+    python astro_engine.py 1968-05-21 07:30 50.5603 15.5066 > chart.json
+    (the JSON is the chart data dict, e.g. for chart_wheel.py)
+"""
+
+import os
+import sys
+import json
+import contextlib
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+import swisseph as se
+
+# ==========================================================
+# SETUP & CONSTANTS
+# ==========================================================
+script_folder = os.path.dirname(os.path.abspath(__file__))
+ephe_path = os.path.join(script_folder, 'ephe') + os.path.sep
+se.set_ephe_path(ephe_path)
+
+PLANET_POINTS = {
+    "Sun": 4, "Moon": 4, "Ascendant": 4, "Midheaven": 1,
+    "Mercury": 2, "Venus": 2, "Mars": 2,
+    "Jupiter": 1, "Saturn": 1, "Uranus": 1, "Neptune": 1, "Pluto": 1,
+    "North Node": 0, "Lilith": 0, "Chiron": 0, "Part of Fortune": 0
+}
+
+PLANETS = {
+    se.SUN: "Sun", se.MOON: "Moon", se.MERCURY: "Mercury", se.VENUS: "Venus",
+    se.MARS: "Mars", se.JUPITER: "Jupiter", se.SATURN: "Saturn", se.URANUS: "Uranus",
+    se.NEPTUNE: "Neptune", se.PLUTO: "Pluto",
+    se.TRUE_NODE: "North Node", # <--- Changed to TRUE NODE (Standard)
+    se.MEAN_APOG: "Lilith", se.CHIRON: "Chiron"
+}
+
+ZODIAC_SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+
+SIGN_DATA = {
+    "Aries":       ("Hot", "Dry", "Choleric", "Fire", "Cardinal", "Yang"),
+    "Taurus":      ("Cold", "Dry", "Melancholic", "Earth", "Fixed", "Yin"),
+    "Gemini":      ("Hot", "Wet", "Sanguine", "Air", "Mutable", "Yang"),
+    "Cancer":      ("Cold", "Wet", "Phlegmatic", "Water", "Cardinal", "Yin"),
+    "Leo":         ("Hot", "Dry", "Choleric", "Fire", "Fixed", "Yang"),
+    "Virgo":       ("Cold", "Dry", "Melancholic", "Earth", "Mutable", "Yin"),
+    "Libra":       ("Hot", "Wet", "Sanguine", "Air", "Cardinal", "Yang"),
+    "Scorpio":     ("Cold", "Wet", "Phlegmatic", "Water", "Fixed", "Yin"),
+    "Sagittarius": ("Hot", "Dry", "Choleric", "Fire", "Mutable", "Yang"),
+    "Capricorn":   ("Cold", "Dry", "Melancholic", "Earth", "Cardinal", "Yin"),
+    "Aquarius":    ("Hot", "Wet", "Sanguine", "Air", "Fixed", "Yang"),
+    "Pisces":      ("Cold", "Wet", "Phlegmatic", "Water", "Mutable", "Yin")
+}
+
+# ==========================================================
+# HELPERS
+# ==========================================================
+def get_sign_name(lon): return ZODIAC_SIGNS[int(lon // 30)]
+def normalize_degree(degree): return degree % 360
+def get_ordinal(n):
+    if 11 <= (n % 100) <= 13: suffix = 'th'
+    else: suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+def get_5_degree_note(chart_data):
+    """Compares Geometric vs Effective houses to generate the explanatory footnote."""
+    moved_list = []
+
+    geom = chart_data["house_positions_geom"]
+    eff = chart_data["house_positions_eff"]
+
+    for body, h_val in geom.items():
+        # Skip angles or empty data
+        if body in ["Ascendant", "Midheaven", "Part of Fortune"] or h_val == 0.0: continue
+
+        # Compare integers (e.g. Geom=6 vs Eff=7)
+        if int(geom[body]) != int(eff[body]):
+            # Get the ORIGINAL (Geometric) house for the explanation
+            h_str = get_ordinal(int(geom[body]))
+            moved_list.append(f"{body} is in the {h_str} House")
+
+    if not moved_list:
+        return ""
+
+    # Grammar: Join with commas and 'and'
+    if len(moved_list) > 1:
+        joined_str = ", ".join(moved_list[:-1]) + " and " + moved_list[-1]
+    else:
+        joined_str = moved_list[0]
+
+    return f"*{joined_str}, but because they are at less than 5º from the next house, they are considered to have their major influence and effects in the house that follows."
+
+def get_aspect(lon1, lon2):
+    diff = abs(lon1 - lon2)
+    if diff > 180: diff = 360 - diff
+    if diff <= 8: return "Conjunction"
+    elif 172 <= diff <= 180: return "Opposition"
+    elif 82 <= diff <= 98: return "Square"
+    elif 112 <= diff <= 128: return "Trine"
+    elif 54 <= diff <= 66: return "Sextile"
+    return None
+
+def calculate_houses_safe(jd_utc, lat, lon):
+    for hsys in [b'P', 'P', 80]:
+        try: return se.houses(float(jd_utc), float(lat), float(lon), hsys)
+        except: continue
+    return None, None
+
+def get_house_number(planet_lon, cusps, apply_rule=False):
+    planet_lon = normalize_degree(planet_lon)
+    start_idx = 1 if len(cusps) == 13 else 0
+    for i in range(12):
+        curr_ptr, next_ptr = start_idx + i, start_idx + i + 1
+        if next_ptr >= len(cusps): next_ptr = start_idx
+        cusp_curr, cusp_next = normalize_degree(cusps[curr_ptr]), normalize_degree(cusps[next_ptr])
+        in_house = False
+        if cusp_next < cusp_curr:
+            if planet_lon >= cusp_curr or planet_lon < cusp_next: in_house = True
+        else:
+            if cusp_curr <= planet_lon < cusp_next: in_house = True
+        if in_house:
+            if not apply_rule: return float(i + 1)
+            if normalize_degree(cusp_next - planet_lon) <= 5.0:
+                return float(1 if (i + 1) == 12 else (i + 2))
+            return float(i + 1)
+    return 0.0
+
+def get_moon_phase(sun_lon, moon_lon):
+    diff = normalize_degree(moon_lon - sun_lon)
+    if diff >= 345 or diff < 15: return "New Moon"
+    elif 165 <= diff < 195: return "Full Moon"
+    elif 15 <= diff < 165: return "Waxing Moon"
+    else: return "Waning Moon"
+
+# ==========================================================
+# CHART
+# ==========================================================
+@lru_cache(maxsize=1)
+def get_timezone_finder():
+    """One TimezoneFinder per process (building it loads its polygon data)."""
+    from timezonefinder import TimezoneFinder
+    return TimezoneFinder()
+
+
+def get_astrology_data(client_data):
+    data = {
+        "placements": {},
+        "degrees": {},
+        "house_positions_geom": {},
+        "house_positions_eff": {},
+        "cusps": [],
+        "moon_phase": "",
+        "retrograde": {}
+    }
+
+    # --- 1. TIMEZONE FIX ---
+    try:
+        # We use the timezonefinder library to get the exact timezone name from coordinates
+        tf = get_timezone_finder()
+
+        # Get timezone string (e.g., 'Europe/Lisbon' or 'America/New_York')
+        tz_str = tf.timezone_at(lng=client_data["longitude"], lat=client_data["latitude"])
+        if not tz_str: tz_str = "UTC"
+
+        # Create the timezone object
+        local_tz = pytz.timezone(tz_str)
+
+        # Combine Date and Time into a "Naive" Datetime (No timezone info yet)
+        naive_dt = datetime.combine(client_data["date"], client_data["time"])
+
+        # Localize it (Stamp it with the detected timezone)
+        local_dt = local_tz.localize(naive_dt)
+
+        # Convert to UTC (Universal Time) for the Swiss Ephemeris
+        # Correct: convert the localized datetime to UTC (call astimezone on the datetime)
+        try:
+            dt_utc = local_dt.astimezone(pytz.utc)
+        except Exception:
+            # Fallback: if conversion fails for any reason, fall back to treating local_dt as UTC-ish
+            dt_utc = local_dt
+
+        # Calculate Julian Day using the UTC time
+        jd_utc = se.julday(dt_utc.year, dt_utc.month, dt_utc.day,
+                           dt_utc.hour + dt_utc.minute/60.0 + dt_utc.second/3600.0)
+
+        # Debug print to terminal to verify
+        print(f"DEBUG: Location: {client_data['latitude']}, {client_data['longitude']}")
+        print(f"DEBUG: Detected Timezone: {tz_str}")
+        print(f"DEBUG: Local Time: {local_dt} -> UTC Time: {dt_utc}")
+
+    except Exception as e:
+        print(f"Timezone Error: {e}")
+        # Fallback to naive calculation if library fails
+        jd_utc = se.julday(client_data["date"].year, client_data["date"].month, client_data["date"].day,
+                           client_data["time"].hour + client_data["time"].minute/60.0)
+
+    # --- 2. CALCULATE CHART ---
+    cusps, ascmc = calculate_houses_safe(jd_utc, client_data["latitude"], client_data["longitude"])
+    data["cusps"] = cusps
+
+    # Angles
+    data["placements"]["Ascendant"] = get_sign_name(ascmc[0])
+    data["degrees"]["Ascendant"] = ascmc[0]
+    data["placements"]["Midheaven"] = get_sign_name(ascmc[1])
+    data["degrees"]["Midheaven"] = ascmc[1]
+    data["house_positions_eff"]["Midheaven"] = get_house_number(ascmc[1], cusps, apply_rule=True)
+    data["house_positions_geom"]["Midheaven"] = get_house_number(ascmc[1], cusps, apply_rule=False)
+
+    sun_lon, moon_lon = 0, 0
+
+    # Planets
+    for planet_id, name in PLANETS.items():
+        try:
+            result = se.calc_ut(jd_utc, planet_id)
+            lon_val = result[0][0]
+            # Check for retrograde motion (negative speed)
+            speed = result[0][3]  # Index 3 contains the speed
+            data["retrograde"][name] = speed < 0
+
+            data["degrees"][name] = lon_val
+            data["placements"][name] = get_sign_name(lon_val)
+
+            # Calculate BOTH Geometric and Effective
+            data["house_positions_geom"][name] = get_house_number(lon_val, cusps, apply_rule=False)
+            data["house_positions_eff"][name] = get_house_number(lon_val, cusps, apply_rule=True)
+
+            if name == "Sun": sun_lon = lon_val
+            if name == "Moon": moon_lon = lon_val
+        except: pass
+
+    data["moon_phase"] = get_moon_phase(sun_lon, moon_lon)
+
+    # South Node
+    if "North Node" in data["degrees"]:
+        sn_deg = normalize_degree(data["degrees"]["North Node"] + 180)
+        data["degrees"]["South Node"] = sn_deg
+        data["placements"]["South Node"] = get_sign_name(sn_deg)
+        data["house_positions_eff"]["South Node"] = get_house_number(sn_deg, cusps, apply_rule=True)
+        data["house_positions_geom"]["South Node"] = get_house_number(sn_deg, cusps, apply_rule=False)
+
+    # Part of Fortune
+    sun_house = get_house_number(sun_lon, cusps, apply_rule=False)
+    is_day = True if sun_house >= 7.0 else False
+
+    if is_day:
+        pof_lon = normalize_degree(ascmc[0] + moon_lon - sun_lon)
+    else:
+        pof_lon = normalize_degree(ascmc[0] + sun_lon - moon_lon)
+
+    data["placements"]["Part of Fortune"] = get_sign_name(pof_lon)
+    data["degrees"]["Part of Fortune"] = pof_lon
+    data["house_positions_geom"]["Part of Fortune"] = get_house_number(pof_lon, cusps, apply_rule=False)
+    data["house_positions_eff"]["Part of Fortune"] = get_house_number(pof_lon, cusps, apply_rule=True)
+
+    return data
+
+# ==========================================================
+# STATISTICS
+# ==========================================================
+def get_label(pct, n_high, n_low):
+    if 45 <= pct <= 55: return "Balanced"
+    if pct > 55: return f"Dominant {n_high}" if pct >= 70 else f"Prominent {n_high}"
+    else: return f"Dominant {n_low}" if (100-pct) >= 70 else f"Prominent {n_low}"
+
+def calc_stats(data, method):
+    score = {k:0 for k in method["keys"]}
+    total = 0
+    for p, h in data.items():
+        pts = PLANET_POINTS.get(p, 0)
+        if pts == 0 or h == 0.0: continue
+        total += pts
+        method["logic"](score, p, h, pts)
+
+    res = {}
+    if total > 0:
+        for k, v in score.items(): res[k] = int(round((v/total)*100))
+        current_sum = sum(list(res.values())[:-1])
+        res[list(res.keys())[-1]] = 100 - current_sum
+    else: res = {k:0 for k in score}
+    return res
+
+def _sign_stats(chart, field, keys):
+    """Percentages of the weighted placements per value of one SIGN_DATA field."""
+    score = {k:0 for k in keys}
+    tot = 0
+    for p, s in chart["placements"].items():
+        pts = PLANET_POINTS.get(p,0)
+        if pts > 0:
+            tot += pts
+            value = SIGN_DATA.get(s, (None,)*6)[field]
+            if value: score[value] += pts
+    return {k: int(round((v/tot)*100)) if tot>0 else 0 for k,v in score.items()}
+
+def chart_statistics(chart):
+    """
+    The Chapter 2 statistics for a chart.
+
+    Returns:
+        dict: Percentages keyed by statistic ("hemisphere", "east_west", "qualities",
+              "primitive_qualities", "temp", "temperaments", "elements", "modalities",
+              "polarities"); every key but "qualities" is also the name of its pie chart
+    """
+    # 1. Hemisphere
+    h_scores = {"Superior": 0, "Inferior": 0}
+    h_tot = 0
+    for p, h in chart["house_positions_geom"].items():
+        pts = PLANET_POINTS.get(p, 0)
+        if pts > 0 and h > 0:
+            h_tot += pts
+            if h >= 7: h_scores["Superior"] += pts
+            else: h_scores["Inferior"] += pts
+    h_stats = {}
+    if h_tot > 0:
+        h_stats["Superior"] = int(round((h_scores["Superior"] / h_tot) * 100))
+        h_stats["Inferior"] = 100 - h_stats["Superior"]
+    else: h_stats = {"Superior": 0, "Inferior": 0}
+
+    # 2. East/West
+    ew_scores = {"Eastern": 0, "Western": 0}
+    ew_tot = 0
+    for p, h in chart["house_positions_geom"].items():
+        pts = PLANET_POINTS.get(p, 0)
+        if pts > 0 and h > 0:
+            ew_tot += pts
+            if int(h) in [10,11,12,1,2,3]: ew_scores["Eastern"] += pts
+            else: ew_scores["Western"] += pts
+    ew_stats = {}
+    if ew_tot > 0:
+        ew_stats["Eastern"] = int(round((ew_scores["Eastern"] / ew_tot) * 100))
+        ew_stats["Western"] = 100 - ew_stats["Eastern"]
+    else: ew_stats = {"Eastern": 0, "Western": 0}
+
+    # 3. Qualities (each sign counts once for temperature and once for moisture)
+    q_scores = {"Hot":0, "Cold":0, "Wet":0, "Dry":0}
+    tot_q = 0
+    for p, sign in chart["placements"].items():
+        pts = PLANET_POINTS.get(p, 0)
+        if pts > 0:
+            t, m, _, _, _, _ = SIGN_DATA.get(sign, (None,)*6)
+            if t:
+                q_scores[t]+=pts; q_scores[m]+=pts; tot_q+=pts
+    q_stats = {k: int(round((v/tot_q)*100)) if tot_q>0 else 0 for k,v in q_scores.items()}
+
+    pq_raw = {
+        "Hot & Dry": q_stats["Hot"] * q_stats["Dry"] // 100,
+        "Hot & Wet": q_stats["Hot"] * q_stats["Wet"] // 100,
+        "Cold & Dry": q_stats["Cold"] * q_stats["Dry"] // 100,
+        "Cold & Wet": q_stats["Cold"] * q_stats["Wet"] // 100
+    }
+    total_pq = sum(pq_raw.values())
+    pq_stats = {k: int(round((v/total_pq)*100)) for k,v in pq_raw.items()} if total_pq > 0 else pq_raw
+
+    return {
+        "hemisphere": h_stats,
+        "east_west": ew_stats,
+        "qualities": q_stats,
+        "primitive_qualities": pq_stats,
+        "temp": {"Hot": q_stats["Hot"], "Cold": q_stats["Cold"]},
+        # 4-7. Temperaments, Elements, Modalities, Polarity
+        "temperaments": _sign_stats(chart, 2, ["Choleric","Melancholic","Sanguine","Phlegmatic"]),
+        "elements": _sign_stats(chart, 3, ["Fire","Earth","Air","Water"]),
+        "modalities": _sign_stats(chart, 4, ["Cardinal","Fixed","Mutable"]),
+        "polarities": _sign_stats(chart, 5, ["Yang","Yin"]),
+    }
+
+def get_summary_table(chart_data):
+    table = "| Sign on Cusp | Planets in House | House |\n| :--- | :--- | :--- |\n"
+    cusps = chart_data["cusps"]
+    h_eff = chart_data["house_positions_eff"]
+    start_idx = 1 if len(cusps) == 13 else 0
+    for i in range(12):
+        h_num = i + 1
+        cusp_s = get_sign_name(normalize_degree(cusps[start_idx + i]))
+        planets = [b for b, h in h_eff.items() if b not in ["Ascendant", "Midheaven"] and int(h) == h_num]
+        table += f"| {cusp_s} | {', '.join(planets)} | {get_ordinal(h_num)} |\n"
+    return table
+
+
+def main():
+    if len(sys.argv) != 5:
+        print("Usage: python astro_engine.py <YYYY-MM-DD> <HH:MM> <latitude> <longitude>")
+        return 1
+    client = {
+        "date": datetime.strptime(sys.argv[1], "%Y-%m-%d").date(),
+        "time": datetime.strptime(sys.argv[2], "%H:%M").time(),
+        "latitude": float(sys.argv[3]),
+        "longitude": float(sys.argv[4]),
+    }
+    # The timezone debug lines go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        chart = get_astrology_data(client)
+    print(json.dumps(chart, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Batch Book Generation for AstroBookBot
+
+Builds a book for every client in a CSV or JSONL file on a pool of worker
+processes. Each worker sets up its state once (ephemeris files, timezone data,
+content bundle, fonts) and keeps it for every book it builds, instead of paying
+for it per book as a fresh process would.
+
+Every client gets its own folder in the output directory (an artifact job named
+after the client) holding the book text, the print-resolution chart images, the
+book manifest and, with --pdf, the inside-pages PDF (with --no-images the print
+images are left out, e.g. when only the PDF is wanted). With --bundle, all of it
+is also packed into one ZIP per client (see book_bundle.py), and with --archive
+every book is kept in the deduplicated book archive (see book_archive.py). A rerun reopens the same
+folder, so a client that was cut off half way only redoes what was missing
+(see book_manifest.py).
+
+Finished and failed clients are appended to a ledger (batch.ledger.jsonl in the
+output directory). Clients the ledger lists as done are skipped on the next run,
+so a crashed or interrupted batch resumes where it stopped; failed clients are
+retried. Rows that can't be read as a client are reported, but they are not
+failures: no rerun fixes them, so they don't make the batch exit with an error.
+
+To rebuild the books an edit in the content library touched, use the output
+folder's content index (see content_index.py) instead of a client file: --stale
+rebuilds every book built with a text that differs from the current content
+bundle, --keys the books containing the given placement keys. Each book is
+rebuilt in its own folder, redoing only the sections that use the changed texts.
+
+Client files have the columns (CSV) or keys (JSONL):
+    name, date (YYYY-MM-DD), time (HH:MM, local), latitude, longitude, city, country
+    and optionally id (else the client is identified by its name and birth data)
+
+Usage:
+    python batch_generate.py clients.csv --output batch_books --workers 4 --pdf --bundle --archive
+    python batch_generate.py --stale --output batch_books
+    python batch_generate.py --keys "Mars in the 8th House" --output batch_books
+"""
+
+import io
+import os
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+import chart_rendering
+from artifact_store import configure_store, get_artifact_store
+from book_archive import ARCHIVE_DIR, BookArchive
+from astro_engine import get_astrology_data, get_timezone_finder
+from book_builder import get_content
+from book_bundle import bundle_filename, export_bundle
+from book_manifest import fingerprint, generate_book
+from content_bundle import get_bundle
+from content_index import ContentIndex
+from donut_renderer import FONT_DEFAULT, FONT_REGULAR, load_font
+from inside_pages import generate_inside_pages, inside_pages_filename
+
+load_dotenv()
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_books")
+LEDGER_NAME = "batch.ledger.jsonl"
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+STAGES = ("chart", "images", "text", "pdf", "bundle", "archive", "total")
+
+
+# ==========================================================
+# CLIENTS
+# ==========================================================
+def read_clients(path):
+    """Rows of a client file as dicts (CSV with a header row, or one JSON object per line)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def parse_client(row):
+    """
+    The client dict generate_book takes, from a client file row.
+
+    Raises:
+        ValueError: A required field is missing or malformed
+    """
+    try:
+        name = str(row["name"]).strip()
+        birth_time = str(row["time"]).strip()
+        client = {
+            "name": name,
+            "date": datetime.strptime(str(row["date"]).strip(), "%Y-%m-%d").date(),
+            "time": datetime.strptime(birth_time, "%H:%M:%S" if birth_time.count(":") == 2 else "%H:%M").time(),
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "city": str(row.get("city") or "").strip(),
+            "country": str(row.get("country") or "").strip(),
+        }
+    except KeyError as e:
+        raise ValueError(f"missing field {e}")
+    if not name:
+        raise ValueError("empty name")
+    return client
+
+
+def client_id(row, client):
+    """Stable id of a client across runs: its own id, else a hash of its name and birth data."""
+    if str(row.get("id") or "").strip():
+        return str(row["id"]).strip()
+    return fingerprint({k: client[k] for k in ("name", "date", "time", "latitude", "longitude")})
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-").lower()[:40] or "client"
+
+
+# ==========================================================
+# LEDGER
+# ==========================================================
+def load_ledger(path):
+    """{client id: its last ledger record}; a line cut off by a crash is ignored."""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["client"]] = record
+    return records
+
+
+def append_ledger(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ==========================================================
+# WORKERS
+# ==========================================================
+def init_worker(output_root):
+    """Runs once per worker process: points the artifact store at the output and warms every cache."""
+    configure_store(output_root, max_age=float("inf"), max_bytes=float("inf"))
+    # This process is already one of the batch's workers; render its charts inline
+    chart_rendering.RENDER_WORKERS = 1
+    get_bundle()
+    get_timezone_finder()
+    for path in (FONT_DEFAULT, FONT_REGULAR):
+        if path: load_font(path)
+    # Loads the ephemeris files (the chart's debug lines would drown the progress output)
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_astrology_data({"date": datetime(2000, 1, 1).date(), "time": datetime(2000, 1, 1, 12).time(),
+                            "latitude": 0.0, "longitude": 0.0})
+
+
+def build_client(task):
+    """
+    Builds one client's book (and PDF) into its artifact job. Runs in a worker.
+
+    Returns:
+        dict: bytes, pages, bundle (file name), sections_reused and per-stage timings in seconds
+    """
+    start = time.perf_counter()
+    job = get_artifact_store().reopen(task["job"])
+    try:
+        bundle = get_bundle()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_book(task["client"], job, task["book"], get_content,
+                                   content_build=bundle.build_id if bundle is not None else None,
+                                   render_tiers=("print",) if task["images"] else (),
+                                   changed_keys=task.get("changed_keys"))
+        timings = dict(report["timings"])
+        pages = None
+        if task["pdf"]:
+            pdf_start = time.perf_counter()
+            pages = generate_inside_pages(job)["pages"]
+            timings["pdf"] = time.perf_counter() - pdf_start
+        bundle = None
+        if task["bundle"]:
+            bundle_start = time.perf_counter()
+            bundle = os.path.basename(export_bundle(job))
+            timings["bundle"] = time.perf_counter() - bundle_start
+        if task["archive"]:
+            archive_start = time.perf_counter()
+            BookArchive(task["archive"]).add_job(job, task["job"])
+            timings["archive"] = time.perf_counter() - archive_start
+    finally:
+        job.close()
+    timings["total"] = time.perf_counter() - start
+    return {"bytes": report["bytes"], "pages": pages, "bundle": bundle, "sections_reused": report["sections_reused"],
+            "timings": timings}
+
+
+# ==========================================================
+# BATCH
+# ==========================================================
+def run_batch(clients_path, output=DEFAULT_OUTPUT, workers=DEFAULT_WORKERS, pdf=False, images=True, bundle=False,
+              archive=None):
+    """
+    Builds every client's book that the ledger does not list as done, archiving
+    each under its job name in the book archive at `archive`, if given.
+
+    Returns:
+        dict: Counts of done, skipped and failed clients and of invalid rows (which
+              no rerun can fix, so they are neither failures nor in the ledger),
+              elapsed seconds, books per minute and the mean seconds per stage
+    """
+    os.makedirs(output, exist_ok=True)
+    ledger = load_ledger(os.path.join(output, LEDGER_NAME))
+
+    tasks, invalid, skipped = [], 0, 0
+    for number, row in enumerate(read_clients(clients_path), 1):
+        try:
+            client = parse_client(row)
+        except ValueError as e:
+            print(f"⚠️ Row {number} skipped: {e}")
+            invalid += 1
+            continue
+        cid = client_id(row, client)
+        if ledger.get(cid, {}).get("status") == "done":
+            skipped += 1
+            continue
+        tasks.append({"id": cid, "client": client, "job": f"client-{_slug(client['name'])}-{_slug(cid)[:16]}",
+                      "book": f"{client['name'].replace(' ', '_')}.txt", "pdf": pdf, "images": images, "bundle": bundle,
+                      "archive": archive})
+    if skipped:
+        print(f"↩️  Resuming: {skipped} clients already done.")
+    print(f"📚 {len(tasks)} books to build with {workers} workers into {output}")
+
+    result = run_tasks(tasks, output, workers)
+    result.update(skipped=skipped, invalid=invalid)
+    return result
+
+
+def regenerate_tasks(output=DEFAULT_OUTPUT, keys=None, pdf=False, images=True, bundle=False, archive=None):
+    """
+    Tasks rebuilding the books in `output` that use edited content, found with its
+    content index: the books containing any of `keys`, or with no keys, every book
+    built with a text that differs from the current content. Each task carries the
+    keys that changed in its book (`changed_keys`), so only their sections are redone.
+    A book whose folder holds an inside-pages PDF or a bundle gets them rebuilt too,
+    so none is left with the old text.
+    """
+    index = ContentIndex(output)
+    found = index.books_using(keys) if keys else index.stale_books(get_content)
+    # The ledger's id of each job, so the rebuilt books are recorded under the same client
+    ids = {record.get("job"): cid for cid, record in load_ledger(os.path.join(output, LEDGER_NAME)).items()}
+
+    tasks = []
+    for job_id, changed in sorted(found.items()):
+        entry = index.books[job_id]
+        client = parse_client(entry["client"])
+        folder = os.path.join(output, job_id)
+        has_pdf = os.path.exists(os.path.join(folder, inside_pages_filename(entry["book"])))
+        has_bundle = os.path.exists(os.path.join(folder, bundle_filename(entry["book"])))
+        tasks.append({"id": ids.get(job_id) or client_id(entry["client"], client), "client": client, "job": job_id,
+                      "book": entry["book"], "pdf": pdf or has_pdf, "images": images, "bundle": bundle or has_bundle,
+                      "archive": archive, "changed_keys": changed})
+    print(f"🔎 {len(tasks)} of {len(index.books)} books in {output} use the edited content")
+    return tasks
+
+
+def run_tasks(tasks, output=DEFAULT_OUTPUT, workers=DEFAULT_WORKERS):
+    """
+    Builds the books of `tasks` on the worker pool, recording each in the ledger.
+
+    Returns:
+        dict: Counts of done and failed books, elapsed seconds, books per
+              minute and the mean seconds per stage
+    """
+    os.makedirs(output, exist_ok=True)
+    ledger_path = os.path.join(output, LEDGER_NAME)
+    done, failed, finished = 0, 0, 0
+    totals = {stage: 0.0 for stage in STAGES}
+    start = time.perf_counter()
+
+    def finish(task, result=None, error=None):
+        nonlocal done, failed, finished
+        finished += 1
+        record = {"client": task["id"], "name": task["client"]["name"], "job": task["job"], "book": task["book"],
+                  "finished": datetime.now().isoformat(timespec="seconds")}
+        if error is None:
+            done += 1
+            for stage, seconds in result["timings"].items():
+                totals[stage] += seconds
+            record.update(status="done", bytes=result["bytes"], pages=result["pages"], bundle=result["bundle"],
+                          timings={k: round(v, 4) for k, v in result["timings"].items()})
+            print(f"✅ [{finished}/{len(tasks)}] {task['client']['name']}: {result['bytes'] / 1024:.0f} KB"
+                  + (f", {result['pages']} pages" if result["pages"] else "") + f" in {result['timings']['total']:.2f}s")
+        else:
+            failed += 1
+            record.update(status="failed", error=str(error))
+            print(f"❌ [{finished}/{len(tasks)}] {task['client']['name']}: {error}")
+        append_ledger(ledger_path, record)
+
+    if workers <= 1:
+        init_worker(output)
+        for task in tasks:
+            try:
+                finish(task, build_client(task))
+            except Exception as e:
+                finish(task, error=e)
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(output,)) as pool:
+            futures = {pool.submit(build_client, task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    finish(futures[future], future.result())
+                except Exception as e:
+                    finish(futures[future], error=e)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "done": done,
+        "skipped": 0,
+        "failed": failed,
+        "invalid": 0,
+        "seconds": elapsed,
+        "books_per_minute": done / elapsed * 60 if elapsed and done else 0.0,
+        "stage_seconds": {stage: totals[stage] / done for stage in STAGES if done and totals[stage]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build books for a file of clients on a worker pool (resumable)")
+    parser.add_argument("clients", nargs="?", help="CSV or JSONL file of clients")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Folder for the books and the ledger")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes (1 builds inline)")
+    parser.add_argument("--pdf", action="store_true", help="Also render each book's inside-pages PDF")
+    parser.add_argument("--no-images", action="store_true", help="Skip the 300-dpi image files (the PDF draws its charts as vectors)")
+    parser.add_argument("--bundle", action="store_true", help="Also pack each book, its images and manifest into one ZIP")
+    parser.add_argument("--archive", nargs="?", const=ARCHIVE_DIR, help="Also keep each book in the book archive (default folder: BOOK_ARCHIVE_DIR)")
+    edited = parser.add_mutually_exclusive_group()
+    edited.add_argument("--stale", action="store_true", help="Instead of a client file: rebuild the books in --output "
+                        "built with texts that have changed since")
+    edited.add_argument("--keys", nargs="+", metavar="KEY", help="Instead of a client file: rebuild the books in "
+                        "--output containing these placement keys")
+    args = parser.parse_args()
+    if (args.clients is None) == (not args.stale and not args.keys):
+        parser.error("give either a client file or --stale / --keys")
+
+    if get_bundle() is None:
+        print("⚠️ No content bundle found; every text is fetched from Notion (python content_bundle.py build)")
+    if args.clients:
+        result = run_batch(args.clients, args.output, args.workers, args.pdf, not args.no_images, args.bundle, args.archive)
+    else:
+        tasks = regenerate_tasks(args.output, args.keys, args.pdf, not args.no_images, args.bundle, args.archive)
+        result = run_tasks(tasks, args.output, args.workers)
+
+    print(f"\n✨ Batch complete: {result['done']} built, {result['skipped']} skipped, {result['failed']} failed "
+          f"in {result['seconds']:.1f}s ({result['books_per_minute']:.1f} books/min)")
+    if result["invalid"]:
+        print(f"⚠️ {result['invalid']} rows could not be read; fix them in the client file to include them.")
+    if result["stage_seconds"]:
+        print("⏱️  Mean per book: " + ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in result["stage_seconds"].items()))
+    if result["failed"]:
+        print("👉 Run the same command again to retry the failed clients.")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Book Archive for AstroBookBot
+
+Keeps every generated book for reprints without storing the same bytes twice.
+Most of a book is placement texts and chart images that other clients' books
+hold as well, so the archive stores:
+
+- blobs/<ab>/<sha256>: every content text (zlib-compressed) and every print
+  image, once, under the SHA-256 of its bytes
+- books/<book id>.json.gz: one record per book: the book's IR (book_ir.py) with
+  each content text replaced by the hash of its blob, and the blob of each image
+- refs.json: how many books point at each blob
+
+`restore` reconstructs a book on demand: its IR is filled in again from the blobs
+(each checked against its hash) and rendered to the same .txt, byte for byte,
+next to its images. Archiving a book again under the same id replaces it; blobs
+no book points at any more are deleted by `gc`. Every change holds a lock on the
+archive (across processes where fcntl is available), so batch workers can
+archive books at the same time.
+
+Configuration:
+    BOOK_ARCHIVE_DIR  Archive folder (default assets/archive)
+
+Usage:
+    python book_archive.py add <job id> [--id <book id>]
+    python book_archive.py restore <book id> <folder>
+    python book_archive.py remove <book id>
+    python book_archive.py gc
+    python book_archive.py recount
+    python book_archive.py report
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import zlib
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from dataclasses import replace
+
+from artifact_store import atomic_path, get_artifact_store
+from astro_engine import chart_statistics
+from book_builder import chart_jobs
+from book_ir import Content, from_data, to_data, to_text
+from book_manifest import load_book_ir, load_manifest
+from chart_rendering import ensure_print_tier, local_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are kept apart
+    fcntl = None
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+script_folder = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.getenv("BOOK_ARCHIVE_DIR", os.path.join(script_folder, "assets", "archive"))
+RECORD_FORMAT = 1
+RECORD_SUFFIX = ".json.gz"
+BOOK_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def blob_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _record_blobs(record):
+    """Every blob a book record points at (each once, however often the book uses it)."""
+    return set(record["texts"]) | {image["blob"] for image in record["images"].values()}
+
+
+# ==========================================================
+# ARCHIVE
+# ==========================================================
+class BookArchive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.book_dir = os.path.join(root, "books")
+        self.refs_path = os.path.join(root, "refs.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.book_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            with open(os.path.join(self.root, "archive.lock"), "a+") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Blobs ---
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _put_blob(self, data, compress=False):
+        """Stores `data` unless a blob with its hash exists; returns the hash."""
+        digest = blob_hash(data)
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            with atomic_path(path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(data, 9) if compress else data)
+        return digest
+
+    def get_blob(self, digest, compressed=False):
+        """
+        The bytes stored under `digest`.
+
+        Raises:
+            FileNotFoundError: There is no such blob
+            ValueError: The blob's bytes no longer match its hash
+        """
+        with open(self._blob_path(digest), "rb") as f:
+            data = f.read()
+        if compressed:
+            data = zlib.decompress(data)
+        if blob_hash(data) != digest:
+            raise ValueError(f"Archive blob {digest} is corrupt")
+        return data
+
+    def _blobs(self):
+        """(hash, size on disk) of every stored blob."""
+        for folder in os.listdir(self.blob_dir):
+            path = os.path.join(self.blob_dir, folder)
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if not name.startswith("."):  # Temporary files of a blob being written
+                    yield name, os.path.getsize(os.path.join(path, name))
+
+    # --- Records and reference counts ---
+    def _record_path(self, book_id):
+        if not BOOK_ID.match(book_id or ""):
+            raise ValueError(f"Invalid book id: {book_id!r}")
+        return os.path.join(self.book_dir, book_id + RECORD_SUFFIX)
+
+    def load_record(self, book_id):
+        """
+        The archive's record of a book.
+
+        Raises:
+            FileNotFoundError: No book is archived under `book_id`
+        """
+        path = self._record_path(book_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No archived book {book_id!r}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_record(self, record):
+        with atomic_path(self._record_path(record["id"])) as tmp_path:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def _load_refs(self):
+        try:
+            with open(self.refs_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_refs(self, refs):
+        with atomic_path(self.refs_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(refs, f, separators=(",", ":"))
+
+    def book_ids(self):
+        return sorted(name[:-len(RECORD_SUFFIX)] for name in os.listdir(self.book_dir) if name.endswith(RECORD_SUFFIX))
+
+    # --- Books ---
+    def add(self, book_id, book, book_filename, images):
+        """
+        Archives a book under `book_id`, replacing any book archived under it before.
+
+        Args:
+            book_id: Name of the book in the archive (letters, digits, ".", "_", "-")
+            book: The book's IR (book_ir.Book)
+            book_filename: Name of the book's .txt
+            images: {chart name: image file} of the book's print images
+
+        Returns:
+            dict: The book's record
+        """
+        flat = len(to_text(book).encode("utf-8"))
+        book = from_data(to_data(book))  # A copy, whose content texts are swapped for their hashes
+        with self._locked():
+            texts = set()
+            for section in book.sections():
+                for i, block in enumerate(section.blocks):
+                    if isinstance(block, Content):
+                        digest = self._put_blob(block.text.encode("utf-8"), compress=True)
+                        section.blocks[i] = replace(block, text=digest)
+                        texts.add(digest)
+            stored_images = {}
+            for name, path in images.items():
+                with open(path, "rb") as f:
+                    data = f.read()
+                flat += len(data)
+                stored_images[name] = {"file": os.path.basename(path), "bytes": len(data), "blob": self._put_blob(data)}
+            record = {
+                "format": RECORD_FORMAT,
+                "id": book_id,
+                "archived": datetime.now().isoformat(timespec="seconds"),
+                "book": book_filename,
+                "flat_bytes": flat,
+                "texts": sorted(texts),
+                "images": stored_images,
+                "ir": to_data(book),
+            }
+            try:
+                previous = self.load_record(book_id)
+            except FileNotFoundError:
+                previous = None
+            self._save_record(record)
+            refs = self._load_refs()
+            for digest in _record_blobs(record):
+                refs[digest] = refs.get(digest, 0) + 1
+            if previous is not None:
+                for digest in _record_blobs(previous):
+                    refs[digest] = refs.get(digest, 0) - 1
+            self._save_refs(refs)
+        return record
+
+    def add_job(self, job, book_id=None):
+        """
+        Archives the book built into artifact job `job` (see book_manifest.generate_book),
+        rendering its print images first if only previews exist.
+
+        Returns:
+            dict: The book's record
+        """
+        manifest = load_manifest(job)
+        book = load_book_ir(job, manifest)
+        if book is None:
+            raise FileNotFoundError(f"No current book IR in {job.dir}")
+        jobs = chart_jobs(book.chart, chart_statistics(book.chart))
+        for chart_job in jobs: chart_job["job_id"] = job.job_id
+        images = {name: local_path(path) for name, path in ensure_print_tier(jobs).items() if path is not None}
+        return self.add(book_id or job.job_id, book, manifest["book"], images)
+
+    def load_book(self, book_id, record=None):
+        """The IR (book_ir.Book) of an archived book, with its content texts filled in again."""
+        record = record or self.load_record(book_id)
+        book = from_data(record["ir"])
+        texts = {}
+        for section in book.sections():
+            for i, block in enumerate(section.blocks):
+                if isinstance(block, Content):
+                    if block.text not in texts:
+                        texts[block.text] = self.get_blob(block.text, compressed=True).decode("utf-8")
+                    section.blocks[i] = replace(block, text=texts[block.text])
+        return book
+
+    def restore(self, book_id, folder):
+        """
+        Writes an archived book's .txt and print images into `folder` (the text keeps
+        the image paths it was built with; the images get their original file names).
+
+        Returns:
+            list: The paths written
+        """
+        record = self.load_record(book_id)
+        book = self.load_book(book_id, record)
+        os.makedirs(folder, exist_ok=True)
+        written = []
+        path = os.path.join(folder, record["book"])
+        with atomic_path(path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                f.write(to_text(book))
+        written.append(path)
+        for image in record["images"].values():
+            path = os.path.join(folder, image["file"])
+            with atomic_path(path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(self.get_blob(image["blob"]))
+            written.append(path)
+        return written
+
+    def remove(self, book_id):
+        """Drops a book from the archive; its blobs are deleted by the next `gc` if unused."""
+        with self._locked():
+            record = self.load_record(book_id)
+            os.remove(self._record_path(book_id))
+            refs = self._load_refs()
+            for digest in _record_blobs(record):
+                refs[digest] = refs.get(digest, 0) - 1
+            self._save_refs(refs)
+
+    # --- Maintenance ---
+    def gc(self):
+        """
+        Deletes every blob no archived book points at.
+
+        Returns:
+            tuple: (blobs deleted, bytes freed)
+        """
+        deleted = freed = 0
+        with self._locked():
+            refs = self._load_refs()
+            for digest, size in list(self._blobs()):
+                if refs.get(digest, 0) <= 0:
+                    os.remove(self._blob_path(digest))
+                    deleted += 1
+                    freed += size
+            self._save_refs({digest: count for digest, count in refs.items() if count > 0})
+        return deleted, freed
+
+    def recount(self):
+        """
+        Rebuilds the reference counts from the book records (e.g. after a crash or
+        records copied in by hand) and lists referenced blobs that are missing.
+
+        Returns:
+            tuple: (counts corrected, missing blob hashes)
+        """
+        with self._locked():
+            counts = {}
+            for book_id in self.book_ids():
+                for digest in _record_blobs(self.load_record(book_id)):
+                    counts[digest] = counts.get(digest, 0) + 1
+            refs = self._load_refs()
+            corrected = sum(1 for digest in set(refs) | set(counts) if refs.get(digest, 0) != counts.get(digest, 0))
+            self._save_refs(counts)
+        stored = {digest for digest, _ in self._blobs()}
+        return corrected, sorted(set(counts) - stored)
+
+    def report(self):
+        """
+        Storage used against keeping every book as its flat .txt plus PNGs.
+
+        Returns:
+            dict: books, flat_bytes, stored_bytes (blobs, records and counts),
+                  ratio (flat / stored), blobs, text_blobs, image_blobs
+        """
+        flat = 0
+        text_blobs, image_blobs = set(), set()
+        book_ids = self.book_ids()
+        for book_id in book_ids:
+            record = self.load_record(book_id)
+            flat += record["flat_bytes"]
+            text_blobs.update(record["texts"])
+            image_blobs.update(image["blob"] for image in record["images"].values())
+        blobs = list(self._blobs())
+        stored = sum(size for _, size in blobs)
+        stored += sum(os.path.getsize(os.path.join(self.book_dir, book_id + RECORD_SUFFIX)) for book_id in book_ids)
+        if os.path.exists(self.refs_path):
+            stored += os.path.getsize(self.refs_path)
+        return {
+            "books": len(book_ids),
+            "flat_bytes": flat,
+            "stored_bytes": stored,
+            "ratio": flat / stored if stored else 0.0,
+            "blobs": len(blobs),
+            "text_blobs": len(text_blobs),
+            "image_blobs": len(image_blobs),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicated archive of generated books")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Archive folder")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Archive the book in an artifact job")
+    add.add_argument("job_id")
+    add.add_argument("--id", help="Book id in the archive (default: the job id)")
+    restore = sub.add_parser("restore", help="Rebuild an archived book's .txt and images in a folder")
+    restore.add_argument("book_id")
+    restore.add_argument("folder")
+    remove = sub.add_parser("remove", help="Drop a book from the archive")
+    remove.add_argument("book_id")
+    sub.add_parser("gc", help="Delete blobs no book points at")
+    sub.add_parser("recount", help="Rebuild the reference counts from the book records")
+    sub.add_parser("report", help="Compare the archive's size with flat .txt and PNG files")
+    args = parser.parse_args()
+
+    archive = BookArchive(args.archive)
+    try:
+        if args.command == "add":
+            record = archive.add_job(get_artifact_store().job(args.job_id), args.id)
+            print(f"🗄️  Archived {record['id']}: {len(record['texts'])} texts, {len(record['images'])} images "
+                  f"({record['flat_bytes'] / 1024:.0f} KB flat)")
+        elif args.command == "restore":
+            for path in archive.restore(args.book_id, args.folder):
+                print(f"✅ {path}")
+        elif args.command == "remove":
+            archive.remove(args.book_id)
+            print(f"🗑️  Removed {args.book_id} (run gc to free its unused blobs)")
+        elif args.command == "gc":
+            deleted, freed = archive.gc()
+            print(f"🧹 Deleted {deleted} blobs, freed {freed / 1024:.0f} KB")
+        elif args.command == "recount":
+            corrected, missing = archive.recount()
+            print(f"🔢 {corrected} reference counts corrected")
+            for digest in missing:
+                print(f"❌ Missing blob {digest}")
+            return 1 if missing else 0
+        else:
+            report = archive.report()
+            print(f"🗄️  {report['books']} books in {archive.root}")
+            print(f"   Flat (.txt + PNGs): {report['flat_bytes'] / 1024 / 1024:.2f} MB")
+            print(f"   Archive:            {report['stored_bytes'] / 1024 / 1024:.2f} MB in {report['blobs']} blobs "
+                  f"({report['text_blobs']} texts, {report['image_blobs']} images)")
+            print(f"   Compression ratio:  {report['ratio']:.1f}x")
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
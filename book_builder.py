@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Book Builder for AstroBookBot
+
+Assembles the book from a chart in one pass. The book's structure is data:
+
+- FRONT_MATTER lists the sections before Chapter 1 (title, birth summary, chart data)
+- CHAPTERS lists every chapter with its number, title and sections.
+  Chapters 7-22 are one entry per body using the same house / sign / aspects
+  sections, so adding a body chapter is one more line in CHAPTERS.
+
+Each section is a writer function in SECTION_WRITERS that emits typed blocks
+(book_ir.py). `iter_book_ir` assembles several chapters at once on a small thread
+pool, so their content lookups overlap, and yields the book's IR a chapter at a
+time in order; `build_book_ir` returns the whole Book. `iter_book` yields the same
+chapters as text, so they can be written to a file or a download as they are
+assembled (see book_stream.py); `write_book` writes the text to any stream and
+`build_book` returns it as one string.
+
+Configuration:
+    BOOK_CHAPTER_WORKERS  Chapters assembled at once (default 4; 1 assembles them in sequence)
+
+Usage:
+    python book_builder.py "Joe Joseph" 1968-05-21 07:30 50.5603 15.5066 --city Jilemnice --country "Czech Republic" -o book.txt [--ir book.ir.json]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from astro_engine import get_astrology_data, chart_statistics, get_sign_name, normalize_degree, get_ordinal, get_5_degree_note, get_aspect, get_label
+from book_ir import (Book, Chapter, Section, Title, Marker, ChapterOpening, Heading, Paragraph, Bullet, Rule,
+                     Content, Image, Note, Space, client_record, to_text, save_ir)
+
+# ==========================================================
+# BOOK SPECIFICATION
+# ==========================================================
+# Sections of a body chapter, and the bodies never listed as the other side of an aspect
+BODY_SECTIONS = ("house", "sign", "aspects")
+ASPECT_EXCLUDE = ("Part of Fortune",)
+
+# Pie charts of Chapter 2 in rendering order: (chart name = statistics key, title)
+STATISTIC_CHARTS = [
+    ("hemisphere", "YOUR SUPERIOR & INFERIOR HEMISPHERE COUNT"),
+    ("east_west", "YOUR EASTERN & WESTERN HEMISPHERE COUNT"),
+    ("primitive_qualities", "YOUR PRIMITIVE QUALITIES COUNT"),
+    ("temp", "TEMP"),
+    ("temperaments", "YOUR TEMPERAMENTS COUNT"),
+    ("elements", "YOUR ELEMENTS COUNT"),
+    ("modalities", "YOUR MODALITIES COUNT"),
+    ("polarities", "YOUR POLARITIES COUNT"),
+]
+
+# Bump when a section writer's output changes, so book manifests from older builds
+# are not reused for incremental rebuilds (book_manifest.py)
+BOOK_FORMAT = 1
+
+FRONT_MATTER = ("title", "birth_summary", "chart_data")
+
+# Chapters assembled at once by iter_book
+CHAPTER_WORKERS = int(os.getenv("BOOK_CHAPTER_WORKERS", 4))
+
+CHAPTERS = [
+    {"number": 1, "title": "Pillars of Personality", "sections": ("pillars",)},
+    {"number": 2, "title": "Astrological Statistics (Pie Charts)", "sections": ("statistics",)},
+    {"number": 3, "title": "The Moon Phase", "sections": ("moon_phase",)},
+    {"number": 4, "title": "The 12 Houses", "sections": ("houses",)},
+    {"number": 5, "title": "Chart Summary Data", "sections": ("summary_table",)},
+    {"number": 6, "title": "The Ascendant", "sections": ("ascendant",)},
+    {"number": 7, "body": "Sun"},
+    {"number": 8, "body": "Moon"},
+    {"number": 9, "body": "Mercury"},
+    {"number": 10, "body": "Venus"},
+    {"number": 11, "body": "Mars"},
+    {"number": 12, "body": "Jupiter"},
+    {"number": 13, "body": "Saturn"},
+    {"number": 14, "body": "Uranus"},
+    {"number": 15, "body": "Neptune"},
+    {"number": 16, "body": "Pluto"},
+    {"number": 17, "body": "Midheaven"},
+    {"number": 18, "body": "Lilith"},
+    {"number": 19, "body": "Chiron"},
+    {"number": 20, "body": "North Node"},
+    {"number": 21, "body": "South Node"},
+    {"number": 22, "body": "Part of Fortune", "sections": ("house", "sign")},
+]
+
+
+def chapter_spec(chapter):
+    """A CHAPTERS entry with the body-chapter defaults filled in."""
+    spec = dict(chapter)
+    body = spec.get("body")
+    if body:
+        spec.setdefault("title", body)
+        spec.setdefault("sections", BODY_SECTIONS)
+        spec.setdefault("aspect_exclude", ASPECT_EXCLUDE)
+    return spec
+
+
+def chapter_units(spec):
+    """(unit id, section name) for every section of a chapter, heading first."""
+    return [(f"ch{spec['number']}.heading", "heading")] + [(f"ch{spec['number']}.{name}", name) for name in spec["sections"]]
+
+
+def book_units():
+    """Unit ids of the whole book in the order they appear in it."""
+    units = [f"front.{name}" for name in FRONT_MATTER]
+    for chapter in CHAPTERS:
+        units += [unit_id for unit_id, _ in chapter_units(chapter_spec(chapter))]
+    return units
+
+
+def chart_jobs(chart, stats):
+    """The image jobs for a book: Chapter 2's pies, then the summary table."""
+    jobs = [{"name": name, "kind": "pie", "stats": stats[name], "filename": f"{name}.png", "title": title}
+            for name, title in STATISTIC_CHARTS]
+    jobs.append({"name": "chart_summary", "kind": "table", "chart": chart, "filename": "chart_summary.png"})
+    return jobs
+
+
+# ==========================================================
+# SECTION WRITERS
+# ==========================================================
+# Every writer takes (book, chapter, write) and passes `write` the section's blocks
+# (book_ir.py). `book` is the dict built by `iter_book_ir`; `chapter` is the
+# chapter's spec (empty for front matter).
+
+def decimal_to_dms(decimal_degrees):
+    degrees = int(decimal_degrees)
+    decimal_minutes = (decimal_degrees - degrees) * 60
+    minutes = int(decimal_minutes)
+    seconds = int((decimal_minutes - minutes) * 60)
+    return f"{degrees}°{minutes}'{seconds}\""
+
+
+def _title(book, chapter, write):
+    client = book["client"]
+    write(Title(client["name"]))
+    write(Space())
+    # Record which content build the texts came from (live Notion has no build id)
+    if book["content_build"] is not None:
+        write(Marker("CONTENT BUILD", book["content_build"]))
+        write(Space())
+
+
+def _birth_summary(book, chapter, write):
+    client, chart = book["client"], book["chart"]
+    birth_date = client["date"].strftime("%B %d, %Y")
+    birth_time = client["time"].strftime("%I:%M %p")
+    write(Heading(1, f"Birth Chart Analysis for {client['name']}"))
+    write(Paragraph([f"Born: {birth_date} at {birth_time}"]))
+    write(Paragraph([f"Location: {client['city']}, {client['country']}"]))
+    write(Space())
+
+    write(Paragraph(["PLANETARY POSITIONS"]))
+    write(Rule())
+    for body, sign in chart["placements"].items():
+        if body in ["South Node", "Part of Fortune", "Ascendant", "Midheaven"]:
+            continue
+        if body in chart["degrees"]:
+            # Sign-specific degree (0-30), with a marker if the planet is retrograde
+            dms = decimal_to_dms(chart["degrees"][body] % 30)
+            retrograde_marker = " R" if chart["retrograde"].get(body, False) else ""
+            write(Paragraph([f"{body} in {sign} {dms}{retrograde_marker}"]))
+
+    # Ascendant separately at the end
+    if "Ascendant" in chart["placements"] and "Ascendant" in chart["degrees"]:
+        dms = decimal_to_dms(chart["degrees"]["Ascendant"] % 30)
+        write(Space())
+        write(Paragraph([f"Ascendant in {chart['placements']['Ascendant']} {dms}"]))
+        write(Space())
+
+
+def _chart_data(book, chapter, write):
+    chart = book["chart"]
+    write(Heading(1, "Chart Data", ruled=True))
+    write(Space())
+    write(Heading(3, "Planets in Signs"))
+    for b, s in chart["placements"].items(): write(Bullet(["", f"{b}:", f" {s}"]))
+    write(Space())
+    write(Heading(3, "Planets in Houses (Effective)"))
+    for b, h in chart["house_positions_eff"].items():
+        if b not in ["Ascendant", "Midheaven"] and h > 0: write(Bullet(["", f"{b}:", f" {get_ordinal(int(h))} House"]))
+    write(Space())
+
+
+def _heading(book, chapter, write):
+    write(ChapterOpening(chapter["number"], chapter["title"]))
+    write(Space())
+
+
+def _placement(book, key, write, level=2):
+    write(Heading(level, key))
+    write(Content(key, book["get_content"](key)))
+    write(Space())
+
+
+def _pillars(book, chapter, write):
+    for body in ["Ascendant", "Sun", "Moon"]:
+        sign = book["chart"]["placements"][body]
+        key = f"{body} in {sign}"
+        # Sign image only (e.g. assets/signs/aries.png), then the text
+        write(Heading(2, key))
+        write(Image(f"assets/signs/{sign.lower()}.png"))
+        write(Content(key, book["get_content"](key)))
+        write(Space())
+
+
+def _statistic(book, name, heading, write):
+    write(Heading(2, f"Your {heading} Count"))
+    write(Image(book["images"][name], name))
+
+
+def _statistics(book, chapter, write):
+    stats = book["stats"]
+    h_stats, ew_stats, q_stats, pol_stats = stats["hemisphere"], stats["east_west"], stats["qualities"], stats["polarities"]
+    q_status = f"{'Hot' if q_stats['Hot']>=50 else 'Cold'} & {'Wet' if q_stats['Wet']>=50 else 'Dry'}"
+
+    _statistic(book, "hemisphere", "Superior & Inferior Hemisphere", write)
+    write(Paragraph(["Status: ", get_label(h_stats['Superior'], 'Superior', 'Inferior')]))
+    write(Paragraph([f"(Superior: {h_stats['Superior']}% / Inferior: {h_stats['Inferior']}%)"]))
+    write(Space())
+    _statistic(book, "east_west", "Eastern & Western Hemisphere", write)
+    write(Paragraph(["Status: ", get_label(ew_stats['Eastern'], 'Eastern', 'Western')]))
+    write(Paragraph([f"(Eastern: {ew_stats['Eastern']}% / Western: {ew_stats['Western']}%)"]))
+    write(Space())
+    _statistic(book, "primitive_qualities", "Primitive Qualities", write)
+    write(Paragraph(["Status: ", q_status]))
+    write(Paragraph(["Temperature Status: ", get_label(q_stats['Hot'], 'Hot', 'Cold'), f" (Hot {q_stats['Hot']}% / Cold {q_stats['Cold']}%)"]))
+    write(Paragraph(["Moisture Status: ", get_label(q_stats['Wet'], 'Wet', 'Dry'), f" (Wet {q_stats['Wet']}% / Dry {q_stats['Dry']}%)"]))
+    write(Space())
+    for name, heading, primary in (("temperaments", "Temperaments", "Temperament"), ("elements", "Elements", "Element"), ("modalities", "Modalities", "Modality")):
+        values = stats[name]
+        if name != "temperaments": write(Space())
+        _statistic(book, name, heading, write)
+        write(Paragraph([f"Primary {primary}: ", max(values, key=values.get)]))
+        for k, v in values.items(): write(Paragraph([f"{k}: {v}%"]))
+    write(Space())
+    _statistic(book, "polarities", "Polarities", write)
+    write(Paragraph(["Status: ", get_label(pol_stats['Yang'], 'Yang', 'Yin')]))
+    write(Paragraph([f"(Yang: {pol_stats['Yang']}% / Yin: {pol_stats['Yin']}%)"]))
+    write(Space())
+
+
+def _moon_phase(book, chapter, write):
+    m_key = book["chart"]["moon_phase"]
+    write(Heading(2, f"Your Moon Phase: {m_key}"))
+    write(Content(m_key, book["get_content"](m_key)))
+    write(Space())
+
+
+def _houses(book, chapter, write):
+    cusps = book["chart"]["cusps"]
+    start = 1 if len(cusps)==13 else 0
+    for i in range(12):
+        s = get_sign_name(normalize_degree(cusps[start+i]))
+        _placement(book, f"{s} in the {get_ordinal(i+1)} House", write)
+
+
+def _summary_table(book, chapter, write):
+    write(Image(book["images"]["chart_summary"], "chart_summary"))
+    write(Space())
+    five_deg_note = get_5_degree_note(book["chart"])
+    if five_deg_note:
+        write(Note(five_deg_note))
+        write(Space())
+
+
+def _ascendant(book, chapter, write):
+    _placement(book, f"Ascendant in {book['chart']['placements']['Ascendant']}", write)
+
+
+def _body_house(book, chapter, write):
+    body = chapter["body"]
+    h = book["chart"]["house_positions_eff"].get(body, 0.0)
+    if h > 0:
+        _placement(book, f"{body} in the {get_ordinal(int(h))} House", write)
+
+
+def _body_sign(book, chapter, write):
+    body = chapter["body"]
+    _placement(book, f"{body} in {book['chart']['placements'].get(body, '')}", write)
+
+
+def _body_aspects(book, chapter, write):
+    body = chapter["body"]
+    degrees = book["chart"]["degrees"]
+    if body not in degrees:
+        return
+    write(Heading(2, f"{body} Aspects"))
+    found = False
+    for p2, d2 in degrees.items():
+        if p2 == body or p2 in chapter["aspect_exclude"]: continue
+        asp = get_aspect(degrees[body], d2)
+        if asp:
+            _placement(book, f"{body} {asp} {p2}", write, level=3)
+            found = True
+    if not found:
+        write(Paragraph([f"No major aspects to {body} found."]))
+        write(Space())
+
+
+SECTION_WRITERS = {
+    "title": _title,
+    "birth_summary": _birth_summary,
+    "chart_data": _chart_data,
+    "heading": _heading,
+    "pillars": _pillars,
+    "statistics": _statistics,
+    "moon_phase": _moon_phase,
+    "houses": _houses,
+    "summary_table": _summary_table,
+    "ascendant": _ascendant,
+    "house": _body_house,
+    "sign": _body_sign,
+    "aspects": _body_aspects,
+}
+
+
+# ==========================================================
+# BUILDER
+# ==========================================================
+def iter_book_ir(client, chart, stats, images, get_content, content_build=None, progress=None, tracker=None,
+                 workers=CHAPTER_WORKERS):
+    """
+    Generates the book's IR (book_ir.py) one piece at a time: the front matter,
+    then each chapter.
+
+    Chapters only depend on the chart and their own texts, so up to `workers` of
+    them are assembled at once on a thread pool (their content lookups overlap),
+    at most 2 x `workers` ahead of the one being yielded. They are still yielded in
+    book order, each as soon as it and every chapter before it are done.
+
+    Args:
+        client: {"name", "date", "time", "city", "country", ...}
+        chart: Chart data from astro_engine.get_astrology_data
+        stats: astro_engine.chart_statistics(chart)
+        images: {chart name: image path} for the jobs from `chart_jobs`
+        get_content: Callable returning the text for a placement key (called from
+                     worker threads unless `workers` is 1)
+        content_build: Content bundle build id to record, if any
+        progress: Optional callable(chapters done, chapter count), called from the
+                  iterating thread whenever a chapter completes
+        tracker: Optional book_manifest.SectionTracker; every section (front matter
+                 section, chapter heading or chapter section) is then produced
+                 through it, so it can record the section's inputs or reuse its blocks
+        workers: Chapters assembled at once (1 assembles them one by one, inline)
+
+    Yields:
+        list[Section] of the front matter, then one Chapter at a time
+    """
+    book = {"client": client, "chart": chart, "stats": stats, "images": images,
+            "get_content": get_content, "content_build": content_build}
+
+    def section(unit_id, chapter, name):
+        writer = SECTION_WRITERS[name]
+        if tracker is None:
+            blocks = []
+            writer(book, chapter, blocks.append)
+        else:
+            blocks = tracker.section(unit_id, chapter, book, lambda view, out: writer(view, chapter, out))
+        return Section(unit_id, blocks)
+
+    def build_chapter(spec):
+        return Chapter(spec["number"], spec["title"], [section(unit_id, spec, name) for unit_id, name in chapter_units(spec)])
+
+    yield [section(f"front.{name}", {}, name) for name in FRONT_MATTER]
+
+    specs = [chapter_spec(chapter) for chapter in CHAPTERS]
+    report = progress or (lambda done, total: None)
+    if workers <= 1:
+        for done, spec in enumerate(specs, 1):
+            chapter = build_chapter(spec)
+            report(done, len(specs))
+            yield chapter
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chapter")
+    queued = iter(specs)
+    running = deque()  # In book order
+    counted, done = set(), 0
+    try:
+        while True:
+            while len(running) < 2 * workers:
+                spec = next(queued, None)
+                if spec is None:
+                    break
+                running.append(pool.submit(build_chapter, spec))
+            if not running:
+                return
+            head = running[0]
+            # Count chapters as they complete (in any order) while waiting for the next one in order
+            while True:
+                for future in running:
+                    if future.done() and future not in counted:
+                        counted.add(future)
+                        done += 1
+                        report(done, len(specs))
+                if head.done():
+                    break
+                wait([f for f in running if f not in counted], return_when=FIRST_COMPLETED)
+            running.popleft()
+            counted.discard(head)
+            yield head.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_book(*args, **kwargs):
+    """
+    The book's text (book_ir.to_text) one piece at a time, as `iter_book_ir` produces it.
+
+    Yields:
+        str: The front matter, then one chapter at a time
+    """
+    for part in iter_book_ir(*args, **kwargs):
+        yield to_text(part)
+
+
+def build_book_ir(client, chart, stats, images, get_content, content_build=None, **kwargs):
+    """The whole book as a book_ir.Book (same arguments as `iter_book_ir`)."""
+    parts = iter_book_ir(client, chart, stats, images, get_content, content_build, **kwargs)
+    return Book(client_record(client), chart, content_build, front=next(parts), chapters=list(parts))
+
+
+def write_book(out, *args, **kwargs):
+    """Writes the whole book to the text stream `out` (same arguments as `iter_book`)."""
+    for chunk in iter_book(*args, **kwargs):
+        out.write(chunk)
+
+
+def build_book(*args, **kwargs):
+    """The whole book as one string (same arguments as `iter_book`)."""
+    out = io.StringIO()
+    write_book(out, *args, **kwargs)
+    return out.getvalue()
+
+
+def bundle_content(key):
+    """Placement text from the compiled content bundle (no Notion fallback)."""
+    from content_bundle import get_bundle
+    bundle = get_bundle()
+    text = bundle.get(key) if bundle is not None else None
+    return f"[Missing: {key}]" if text is None else text
+
+
+def get_content(key):
+    """
+    Placement text from the content bundle, else from live Notion (NOTION_TOKEN and
+    NOTION_DATABASE_ID; every call goes through the shared rate limiter). Lookup
+    problems come back as a bracketed note in place of the text.
+    """
+    from content_bundle import get_bundle
+    from notion_rate_limiter import get_notion_client
+    if get_bundle() is not None:
+        return bundle_content(key)
+    token = os.getenv("NOTION_TOKEN") or ""
+    if len(token) < 10: return "[Check Token]"
+    notion = get_notion_client(token)
+    try:
+        results = notion.databases.query(
+            database_id=os.getenv("NOTION_DATABASE_ID"), filter={"property": "Placement", "title": {"equals": key}}
+        )
+        if not results["results"]: return f"[Missing: {key}]"
+        page = results["results"][0]
+        if not page["properties"]["Description"]["rich_text"]: return ""
+        return "".join([t["plain_text"] for t in page["properties"]["Description"]["rich_text"]])
+    except Exception as e: return f"[API Error: {e}]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a book's text from birth data and the content bundle")
+    parser.add_argument("name")
+    parser.add_argument("date", help="YYYY-MM-DD")
+    parser.add_argument("time", help="HH:MM (local time)")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("--city", default="")
+    parser.add_argument("--country", default="")
+    parser.add_argument("-o", "--output", help="Book file (default: print to stdout)")
+    parser.add_argument("--ir", help="Also save the book's IR (.ir.json, or .ir.msgpack)")
+    args = parser.parse_args()
+
+    from content_bundle import get_bundle
+    from chart_rendering import render_chart_jobs
+    from artifact_store import get_artifact_store
+
+    start = time.perf_counter()
+    client = {"name": args.name, "date": datetime.strptime(args.date, "%Y-%m-%d").date(),
+              "time": datetime.strptime(args.time, "%H:%M").time(),
+              "latitude": args.latitude, "longitude": args.longitude, "city": args.city, "country": args.country}
+    with contextlib.redirect_stdout(sys.stderr):
+        chart = get_astrology_data(client)
+    stats = chart_statistics(chart)
+    jobs = chart_jobs(chart, stats)
+    artifact_job = get_artifact_store().new_job()
+    for job in jobs: job["job_id"] = artifact_job.job_id
+    images = render_chart_jobs(jobs)
+    artifact_job.close()
+
+    bundle = get_bundle()
+    content_build = bundle.build_id if bundle else None
+    if args.ir:
+        # Built once; the text is rendered from the saved IR
+        book = build_book_ir(client, chart, stats, images, bundle_content, content_build)
+        save_ir(book, args.ir)
+        print(f"🧱 Saved {args.ir} ({os.path.getsize(args.ir) / 1024:.0f} KB)", file=sys.stderr)
+        chapters = (to_text(part) for part in [book.front] + book.chapters)
+    else:
+        chapters = iter_book(client, chart, stats, images, bundle_content, content_build)
+    if args.output:
+        from book_stream import stream_book
+        size = stream_book(chapters, args.output)
+        print(f"✅ Saved {args.output} ({size / 1024:.0f} KB) in {time.perf_counter() - start:.2f}s (images in {artifact_job.dir})")
+    else:
+        for chunk in chapters:
+            sys.stdout.write(chunk)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Book Bundles for AstroBookBot
+
+Packs a book built by book_manifest.generate_book into one ZIP download:
+
+- the book text, and its IR (book_ir.py) for rendering other formats from
+- the 300-dpi images of every chart in the book (rendered first if only previews exist)
+- the statistics pies again as one multi-page vector PDF, for print layouts
+- the inside-pages PDF, if it has been rendered
+- manifest.json: the client, the chart data, the content build and the version
+  (text hash) of every content key the book used, and the name, size and SHA-256
+  of every other file in the bundle
+
+The archive is written member by member straight to its output: each file is
+copied in chunks, so neither the files nor the archive are held in memory, and
+the output need not be seekable (a socket or HTTP response works as well as a
+file). `export_bundle` writes it next to the book in the job folder.
+
+Usage:
+    python book_bundle.py <job id> [-o bundle.zip]
+"""
+
+import os
+import sys
+import json
+import zipfile
+import hashlib
+import argparse
+
+from artifact_store import atomic_path, get_artifact_store
+from astro_engine import chart_statistics
+from book_builder import chart_jobs
+from book_manifest import load_manifest
+from chart_rendering import ensure_print_tier, generate_pie_pdf, local_path
+from inside_pages import inside_pages_filename
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+BUNDLE_FORMAT = 1
+BUNDLE_MANIFEST = "manifest.json"
+IMAGE_FOLDER = "images"
+STATISTICS_PDF = "statistics.pdf"
+CHUNK_SIZE = 64 * 1024
+
+# Already compressed; deflating them again only costs time
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".pdf")
+
+
+def bundle_filename(book_filename):
+    return os.path.splitext(book_filename)[0] + ".zip"
+
+
+# ==========================================================
+# WRITING
+# ==========================================================
+def _add_file(archive, path, name):
+    """Copies the file at `path` into the archive as `name`; returns its size and SHA-256."""
+    compression = zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+    info = zipfile.ZipInfo.from_file(path, name)
+    info.compress_type = compression
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as src, archive.open(info, "w") as dst:
+        while True:
+            data = src.read(CHUNK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+            dst.write(data)
+            size += len(data)
+    return {"file": name, "bytes": size, "sha256": digest.hexdigest()}
+
+
+def write_bundle(job, out):
+    """
+    Writes the ZIP bundle of the book in artifact job `job` to the binary stream `out`.
+
+    Raises:
+        FileNotFoundError: The job has no current book manifest, or its book file is gone
+
+    Returns:
+        dict: The bundle's manifest
+    """
+    manifest = load_manifest(job)
+    if manifest is None:
+        raise FileNotFoundError(f"No current book manifest in {job.dir}")
+    book_path = job.handle(manifest["book"]).path
+    if not os.path.exists(book_path):
+        raise FileNotFoundError(book_path)
+
+    chart = manifest["chart"]["data"]
+    jobs = chart_jobs(chart, chart_statistics(chart))
+    for chart_job in jobs: chart_job["job_id"] = job.job_id
+    images = ensure_print_tier(jobs)
+
+    content = {}
+    for section in manifest["sections"]:
+        content.update(section["inputs"].get("content", {}))
+
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "job": job.job_id,
+        "built": manifest["built"],
+        "client": manifest["client"],
+        "content_build": manifest["content_build"],
+        "content": dict(sorted(content.items())),
+        "chart": chart,
+        "book": None,
+        "ir": None,
+        "images": {},
+        "statistics": None,
+        "inside_pages": None,
+    }
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        bundle["book"] = _add_file(archive, book_path, manifest["book"])
+        bundle["ir"] = _add_file(archive, job.handle(manifest["ir"]).path, manifest["ir"])
+        for chart_job in jobs:
+            path = images[chart_job["name"]]
+            if path is None:  # An empty pie has no image
+                continue
+            name = f"{IMAGE_FOLDER}/{os.path.basename(os.fspath(path))}"
+            bundle["images"][chart_job["name"]] = dict(_add_file(archive, local_path(path), name), title=chart_job.get("title"))
+        statistics = generate_pie_pdf(jobs, STATISTICS_PDF, job_id=job.job_id)
+        if statistics is not None:
+            bundle["statistics"] = _add_file(archive, local_path(statistics), f"{IMAGE_FOLDER}/{STATISTICS_PDF}")
+        pdf_name = inside_pages_filename(manifest["book"])
+        pdf_path = job.handle(pdf_name).path
+        if os.path.exists(pdf_path):
+            bundle["inside_pages"] = _add_file(archive, pdf_path, pdf_name)
+        archive.writestr(BUNDLE_MANIFEST, json.dumps(bundle, ensure_ascii=False, indent=2, default=str))
+    return bundle
+
+
+def export_bundle(job, path=None):
+    """
+    Writes the bundle of the book in `job` to `path` (default: "<book>.zip" in the
+    job folder). The file only appears under its name once it is complete.
+
+    Returns:
+        str: The bundle's path
+    """
+    if path is None:
+        manifest = load_manifest(job)
+        if manifest is None:
+            raise FileNotFoundError(f"No current book manifest in {job.dir}")
+        path = job.handle(bundle_filename(manifest["book"])).path
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            write_bundle(job, f)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a book, its images and its manifest into one ZIP")
+    parser.add_argument("job_id", help="Artifact job of a book built by the app or book_manifest")
+    parser.add_argument("-o", "--output", help="Output ZIP (default: <book>.zip in the job folder)")
+    args = parser.parse_args()
+
+    try:
+        path = export_bundle(get_artifact_store().job(args.job_id), args.output)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+    print(f"📦 {path}: {len(members)} files, {os.path.getsize(path) / 1024:.0f} KB")
+    for member in members:
+        print(f"   {member.filename:<40} {member.file_size:>9} B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Book Intermediate Representation for AstroBookBot
+
+The book as typed data instead of text. book_builder's section writers emit
+blocks; every output format renders from them, so the chart and content stages
+run once and any number of formats can be rendered from a saved IR:
+
+- Book: the client, the chart, the content build, the front matter and the chapters
+- Chapter: its number, title and sections (the first is the chapter opening)
+- Section: one unit of the book (id as in book_builder.book_units) and its blocks
+- Blocks: Title, Marker, ChapterOpening, Heading, Paragraph, Bullet, Rule,
+  Content (a content key and its text), Image (a path, and the chart it shows),
+  Note (a footnote such as astro_engine.get_5_degree_note) and Space
+
+`to_text` renders any part of the IR in the book's text format (the .txt the app
+hands out, byte for byte); inside_pages.py lays out the PDF from it directly.
+`save_ir` / `load_ir` store a Book as compact JSON, or as msgpack for a
+".msgpack" path (needs `pip install msgpack`).
+
+Configuration:
+    BOOK_IR_FORMAT  Format of the IR saved with each book: json (default) or msgpack
+
+Usage:
+    python book_ir.py show book.ir.json
+    python book_ir.py text book.ir.json [-o book.txt]
+    python book_ir.py convert book.ir.json book.ir.msgpack
+"""
+
+import os
+import sys
+import json
+import argparse
+from dataclasses import MISSING, dataclass, field, fields
+from typing import ClassVar, List, Optional
+
+from artifact_store import atomic_path
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+IR_FORMAT = 1
+IR_EXTENSIONS = {"json": ".ir.json", "msgpack": ".ir.msgpack"}
+SAVE_FORMAT = os.getenv("BOOK_IR_FORMAT", "json").lower()
+
+# Line markup of the text format
+SEP = "-" * 30 + "\n"
+RULE = "=" * 50 + "\n"
+
+
+# ==========================================================
+# BLOCKS
+# ==========================================================
+# Inline text is a list of parts alternating plain and bold, starting plain:
+# ["Status: ", "Superior"] is "Status: **Superior**".
+
+@dataclass
+class Title:
+    name: str
+    TAG: ClassVar[str] = "title"
+
+
+@dataclass
+class Marker:
+    """Build information carried in the text, not shown in the book."""
+    label: str
+    value: str
+    TAG: ClassVar[str] = "marker"
+
+
+@dataclass
+class ChapterOpening:
+    number: int
+    title: str
+    TAG: ClassVar[str] = "chapter"
+
+
+@dataclass
+class Heading:
+    level: int
+    text: str
+    ruled: bool = False  # Set off by separator lines, like a chapter opening
+    TAG: ClassVar[str] = "h"
+
+
+@dataclass
+class Paragraph:
+    parts: List[str]
+    TAG: ClassVar[str] = "p"
+
+
+@dataclass
+class Bullet:
+    parts: List[str]
+    TAG: ClassVar[str] = "li"
+
+
+@dataclass
+class Rule:
+    TAG: ClassVar[str] = "rule"
+
+
+@dataclass
+class Content:
+    """A text from the content library, under its placement key."""
+    key: str
+    text: str
+    TAG: ClassVar[str] = "content"
+
+
+@dataclass
+class Image:
+    path: Optional[str]
+    chart: Optional[str] = None  # Chart job name (book_builder.chart_jobs), if it is a chart
+    TAG: ClassVar[str] = "img"
+
+
+@dataclass
+class Note:
+    text: str
+    TAG: ClassVar[str] = "note"
+
+
+@dataclass
+class Space:
+    TAG: ClassVar[str] = "space"
+
+
+BLOCK_TYPES = {cls.TAG: cls for cls in (Title, Marker, ChapterOpening, Heading, Paragraph, Bullet, Rule,
+                                        Content, Image, Note, Space)}
+
+
+def runs(parts):
+    """(style, text) runs of inline parts: "bold" for bold parts, else None; empty parts dropped."""
+    return [("bold" if i % 2 else None, part) for i, part in enumerate(parts) if part]
+
+
+# ==========================================================
+# DOCUMENT
+# ==========================================================
+def client_record(client):
+    """A client dict as Book.client holds it: dates and times as ISO text."""
+    return {k: v.isoformat() if hasattr(v, "isoformat") else v for k, v in client.items()}
+
+
+@dataclass
+class Section:
+    id: str
+    blocks: list
+
+
+@dataclass
+class Chapter:
+    number: int
+    title: str
+    sections: List[Section]
+
+
+@dataclass
+class Book:
+    client: dict
+    chart: dict
+    content_build: Optional[str]
+    front: List[Section] = field(default_factory=list)
+    chapters: List[Chapter] = field(default_factory=list)
+
+    def sections(self):
+        """Every section in book order."""
+        yield from self.front
+        for chapter in self.chapters:
+            yield from chapter.sections
+
+    def blocks(self):
+        for section in self.sections():
+            yield from section.blocks
+
+    def content_keys(self):
+        """{content key: text} of every content text in the book."""
+        return {block.key: block.text for block in self.blocks() if isinstance(block, Content)}
+
+
+# ==========================================================
+# TEXT FORMAT
+# ==========================================================
+def _inline_text(parts):
+    return "".join(f"**{part}**" if i % 2 else part for i, part in enumerate(parts))
+
+
+_TEXT = {
+    Title: lambda b: f"Chart for: {b.name}\n",
+    Marker: lambda b: f"<<{b.label}: {b.value}>>\n",
+    ChapterOpening: lambda b: SEP + f"# Chapter {b.number}: {b.title}\n" + SEP,
+    Heading: lambda b: (SEP if b.ruled else "") + "#" * b.level + f" {b.text}\n" + (SEP if b.ruled else ""),
+    Paragraph: lambda b: _inline_text(b.parts) + "\n",
+    Bullet: lambda b: "* " + _inline_text(b.parts) + "\n",
+    Rule: lambda b: RULE,
+    Content: lambda b: f"{b.text}\n",
+    Image: lambda b: f"<<IMG: {b.path}>>\n",
+    Note: lambda b: f"{b.text}\n",
+    Space: lambda b: "\n",
+}
+
+
+def to_text(node):
+    """A Book, Chapter, Section, block or list of them in the book's text format."""
+    if isinstance(node, Book):
+        return to_text(node.front) + to_text(node.chapters)
+    if isinstance(node, Chapter):
+        return to_text(node.sections)
+    if isinstance(node, Section):
+        return to_text(node.blocks)
+    if isinstance(node, list):
+        return "".join(to_text(item) for item in node)
+    return _TEXT[type(node)](node)
+
+
+# ==========================================================
+# SERIALIZATION
+# ==========================================================
+# Blocks are [tag, field, ...] with trailing default fields left out; sections are
+# [id, [block, ...]] and chapters [number, title, [section, ...]].
+
+def _pack_block(block):
+    values = [block.TAG]
+    trailing = True
+    for f in reversed(fields(block)):
+        value = getattr(block, f.name)
+        if trailing and f.default is not MISSING and value == f.default:
+            continue
+        trailing = False
+        values.insert(1, value)
+    return values
+
+
+def _unpack_block(values):
+    return BLOCK_TYPES[values[0]](*values[1:])
+
+
+def _pack_section(section):
+    return [section.id, [_pack_block(block) for block in section.blocks]]
+
+
+def _unpack_section(values):
+    return Section(values[0], [_unpack_block(block) for block in values[1]])
+
+
+def to_data(book):
+    """The Book as plain lists and dicts (JSON- and msgpack-able)."""
+    return {
+        "format": IR_FORMAT,
+        "client": book.client,
+        "chart": book.chart,
+        "content_build": book.content_build,
+        "front": [_pack_section(s) for s in book.front],
+        "chapters": [[c.number, c.title, [_pack_section(s) for s in c.sections]] for c in book.chapters],
+    }
+
+
+def from_data(data):
+    """
+    The Book from `to_data`'s output.
+
+    Raises:
+        ValueError: The data is from another IR format
+    """
+    if data.get("format") != IR_FORMAT:
+        raise ValueError(f"Unsupported book IR format: {data.get('format')}")
+    return Book(
+        client=data["client"],
+        chart=data["chart"],
+        content_build=data["content_build"],
+        front=[_unpack_section(s) for s in data["front"]],
+        chapters=[Chapter(number, title, [_unpack_section(s) for s in sections]) for number, title, sections in data["chapters"]],
+    )
+
+
+def _is_msgpack(path):
+    return path.endswith(".msgpack")
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed (pip install msgpack), use a .json path")
+
+
+def ir_filename(stem, fmt=SAVE_FORMAT):
+    """File name of an IR in format `fmt` ("json" or "msgpack")."""
+    if fmt not in IR_EXTENSIONS:
+        raise ValueError(f"Unknown book IR format: {fmt}")
+    return stem + IR_EXTENSIONS[fmt]
+
+
+def save_ir(book, path):
+    """Writes the Book to `path` (msgpack for a ".msgpack" path, else compact JSON), atomically."""
+    data = to_data(book)
+    with atomic_path(path) as tmp_path:
+        if _is_msgpack(path):
+            _require_msgpack()
+            with open(tmp_path, "wb") as f:
+                msgpack.pack(data, f, use_bin_type=True)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def load_ir(path):
+    """The Book saved at `path` by `save_ir`."""
+    if _is_msgpack(path):
+        _require_msgpack()
+        with open(path, "rb") as f:
+            return from_data(msgpack.unpack(f, raw=False))
+    with open(path, "r", encoding="utf-8") as f:
+        return from_data(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, render or convert a saved book IR")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Summarize an IR file")
+    show.add_argument("path")
+    text = sub.add_parser("text", help="Render an IR file in the book's text format")
+    text.add_argument("path")
+    text.add_argument("-o", "--output", help="Book file (default: print to stdout)")
+    convert = sub.add_parser("convert", help="Rewrite an IR file as JSON or msgpack (by the output's extension)")
+    convert.add_argument("path")
+    convert.add_argument("output")
+    args = parser.parse_args()
+
+    try:
+        book = load_ir(args.path)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.command == "show":
+        counts = {}
+        for block in book.blocks():
+            counts[block.TAG] = counts.get(block.TAG, 0) + 1
+        print(f"📖 {book.client.get('name')} ({os.path.getsize(args.path) / 1024:.0f} KB, content build {book.content_build})")
+        print(f"   {len(book.front)} front matter sections, {len(book.chapters)} chapters, "
+              f"{sum(1 for _ in book.sections())} sections, {len(book.content_keys())} content texts")
+        print("   Blocks: " + ", ".join(f"{tag} {count}" for tag, count in counts.items()))
+    elif args.command == "text":
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(to_text(book))
+            print(f"✅ Saved {args.output}")
+        else:
+            sys.stdout.write(to_text(book))
+    else:
+        try:
+            save_ir(book, args.output)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {args.output}: {os.path.getsize(args.output) / 1024:.0f} KB (from {os.path.getsize(args.path) / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Incremental Book Builds for AstroBookBot
+
+Every book's artifact folder keeps a manifest (book.manifest.json) of what each
+part of the book was built from:
+
+- the chart: a fingerprint of the birth data (date, time, coordinates) and the chart itself
+- the images: a fingerprint of each chart job (its statistics, or the chart for the table)
+- every section of the text (front matter sections, chapter headings, chapter
+  sections): the client fields, chart, statistics, image paths, content build and
+  content keys (with a hash of each text) it read, and where its text sits in the book file
+
+Next to the book file the folder keeps the book's IR (book.ir.json, see book_ir.py),
+which the inside pages and other formats render from.
+
+Building a book again in the same folder (`generate_book`) only redoes what changed:
+the chart is reused while the birth data is the same, only images whose job changed
+are re-rendered, and sections whose inputs all still match are copied from the
+previous build's IR. Fixing a typo in the client's name rebuilds two sections.
+Each build is also recorded in the store's content index (content_index.py), which
+finds the books using a content text when it is edited.
+
+Content texts are checked by looking each key up again, which is cheap with the
+content bundle. With live Notion, pass the keys known to have changed instead
+(`changed_keys`) and every other text is trusted.
+
+Usage:
+    python book_manifest.py show <job id>
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from artifact_store import atomic_path, get_artifact_store
+from astro_engine import get_astrology_data, chart_statistics
+from book_builder import BOOK_FORMAT, iter_book_ir, chart_jobs, book_units
+from book_ir import Book, client_record, ir_filename, load_ir, save_ir, to_text
+from book_stream import stream_book
+from chart_rendering import chart_paths, ensure_tier, discard_chart_files
+from content_index import record_book
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+MANIFEST_NAME = "book.manifest.json"
+MANIFEST_VERSION = 2
+
+# Client fields the chart is calculated from
+BIRTH_FIELDS = ("date", "time", "latitude", "longitude")
+
+
+def fingerprint(value):
+    """Short stable hash of a JSON-able value (dates and times hash as their ISO text)."""
+    data = json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def load_manifest(job):
+    """The manifest of the book in `job`, or None if there is none (or it is from an older build)."""
+    path = os.path.join(job.dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("builder") != BOOK_FORMAT:
+        return None
+    return manifest
+
+
+def load_book_ir(job, manifest=None):
+    """The IR (book_ir.Book) of the book in `job`, or None if it has no current one."""
+    manifest = manifest or load_manifest(job)
+    if manifest is None:
+        return None
+    try:
+        return load_ir(os.path.join(job.dir, manifest["ir"]))
+    except (OSError, ValueError, RuntimeError):
+        return None
+
+
+def save_manifest(job, manifest):
+    path = os.path.join(job.dir, MANIFEST_NAME)
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, default=str)
+
+
+# ==========================================================
+# SECTION TRACKING
+# ==========================================================
+def _field_value(value):
+    """How a client field or image path is recorded: strings as they are, anything else hashed."""
+    return value if value is None or isinstance(value, str) else fingerprint(value)
+
+
+class _Fields(dict):
+    """A dict that records the fields read from it."""
+
+    def __init__(self, data, used):
+        super().__init__(data)
+        self.used = used
+
+    def _record(self, key, value):
+        self.used[key] = _field_value(value)
+        return value
+
+    def __getitem__(self, key):
+        return self._record(key, super().__getitem__(key))
+
+    def get(self, key, default=None):
+        return self._record(key, super().get(key, default))
+
+
+class _BookView(dict):
+    """The builder's `book` dict, recording what a section writer reads into `inputs`."""
+
+    def __init__(self, book, inputs, tracker):
+        super().__init__(book)
+        self.inputs = inputs
+        self.tracker = tracker
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if key in ("client", "images"):
+            return _Fields(value, self.inputs.setdefault(key, {}))
+        if key == "get_content":
+            used = self.inputs.setdefault("content", {})
+            def get_content(content_key):
+                text = self.tracker.content(content_key)
+                used[content_key] = fingerprint(text)
+                return text
+            return get_content
+        if key in ("chart", "stats"):
+            self.inputs[key] = self.tracker.fingerprint(value)
+        else:
+            self.inputs[key] = value
+        return value
+
+
+class SectionTracker:
+    """
+    Produces the book's sections for book_builder.iter_book_ir: reuses a section's
+    blocks from the previous build when everything it read is unchanged, otherwise
+    runs its writer and records what it read. `sections` is the new manifest's list.
+    Sections may be produced from several threads at once and in any order.
+    """
+
+    def __init__(self, get_content, previous=None, previous_ir=None, changed_keys=None):
+        self.get_content = get_content
+        self.previous = {s["id"]: s for s in (previous or [])}
+        self.previous_blocks = {s.id: s.blocks for s in previous_ir.sections()} if previous_ir else {}
+        self.changed_keys = set(changed_keys) if changed_keys is not None else None
+        self.reused = 0
+        self.built = 0
+        self._entries = {}
+        self._texts = {}
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def content(self, key):
+        """The text for a content key, looked up at most once per build."""
+        if key not in self._texts:
+            self._texts[key] = self.get_content(key)
+        return self._texts[key]
+
+    def fingerprint(self, value):
+        # The chart and statistics are the same objects for every section; hash them once
+        key = id(value)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = (value, fingerprint(value))
+        return self._fingerprints[key][1]
+
+    def _content_changed(self, key, version):
+        if self.changed_keys is not None:
+            return key in self.changed_keys
+        return fingerprint(self.content(key)) != version
+
+    def _is_current(self, inputs, book, spec):
+        if inputs.get("spec") != spec:
+            return False
+        for name, used in inputs.items():
+            if name in ("client", "images"):
+                if any(_field_value(book[name].get(field)) != value for field, value in used.items()):
+                    return False
+            elif name == "content":
+                if any(self._content_changed(key, version) for key, version in used.items()):
+                    return False
+            elif name in ("chart", "stats"):
+                if self.fingerprint(book[name]) != used:
+                    return False
+            elif name != "spec" and book.get(name) != used:
+                return False
+        return True
+
+    def section(self, unit_id, chapter, book, render):
+        """The blocks of one section: reused if still current, else written by `render(view, write)`."""
+        spec = self.fingerprint(chapter)
+        entry = self.previous.get(unit_id)
+        blocks = None
+        if entry is not None and self._is_current(entry["inputs"], book, spec):
+            blocks = self.previous_blocks.get(unit_id)
+        reused = blocks is not None
+        if reused:
+            inputs = entry["inputs"]
+        else:
+            inputs = {"spec": spec}
+            blocks = []
+            render(_BookView(book, inputs, self), blocks.append)
+        length = len(to_text(blocks).encode("utf-8"))
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.built += 1
+            self._entries[unit_id] = {"id": unit_id, "length": length, "inputs": inputs}
+        return blocks
+
+    @property
+    def sections(self):
+        """The sections produced, in book order, with their offsets in the new book file."""
+        sections, offset = [], 0
+        for unit_id in book_units():
+            entry = self._entries.get(unit_id)
+            if entry is not None:
+                sections.append(dict(entry, offset=offset))
+                offset += entry["length"]
+        return sections
+
+
+# ==========================================================
+# BUILD / REBUILD
+# ==========================================================
+def generate_book(client, job, filename, get_content, content_build=None, progress=None,
+                  render_tiers=("preview",), changed_keys=None):
+    """
+    Builds the book for `client` into artifact job `job` as `filename`, reusing
+    whatever the job's previous build (if any) can still provide.
+
+    Args:
+        client: {"name", "date", "time", "latitude", "longitude", "city", "country"}
+        job: ArtifactJob (from new_job, or reopen to rebuild a book)
+        filename: Name of the book file in the job folder
+        get_content: Callable returning the text for a placement key
+        content_build: Content bundle build id to record, if any
+        progress: Optional callable(percent, label)
+        render_tiers: Image tiers rendered now (the text always points at the print files)
+        changed_keys: Content keys known to have changed; None checks every key
+
+    Returns:
+        dict: path, ir_path, bytes, chart_jobs, images ({tier: {name: path}}), and
+              what was reused or rebuilt with per-stage timings
+    """
+    progress = progress or (lambda pct, label: None)
+    timings = {}
+    previous = load_manifest(job)
+
+    # 1. Chart (the timezone lookup and ephemeris are skipped while the birth data is the same)
+    start = time.perf_counter()
+    progress(10, "Calculating Birth Chart")
+    birth = fingerprint({field: client[field] for field in BIRTH_FIELDS})
+    chart_reused = previous is not None and previous["chart"]["birth"] == birth
+    chart = previous["chart"]["data"] if chart_reused else get_astrology_data(client)
+    progress(30, "Calculating Statistics")
+    stats = chart_statistics(chart)
+    jobs = chart_jobs(chart, stats)
+    for chart_job in jobs: chart_job["job_id"] = job.job_id
+    timings["chart"] = time.perf_counter() - start
+
+    # 2. Images: only jobs whose inputs changed are discarded and rendered again. The
+    #    text only needs their paths, so they render in the background while it is built
+    image_keys = {j["name"]: fingerprint({k: v for k, v in j.items() if k != "job_id"}) for j in jobs}
+    old_keys = previous["images"] if previous else {}
+    stale = [j for j in jobs if old_keys.get(j["name"]) != image_keys[j["name"]]]
+
+    def render_images():
+        start = time.perf_counter()
+        discard_chart_files(stale)
+        tiers = {tier: ensure_tier(jobs, tier) for tier in render_tiers}
+        timings["images"] = time.perf_counter() - start
+        return tiers
+
+    images = {"print": chart_paths(jobs, "print")}
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="images") as pool:
+        rendering = pool.submit(render_images)
+
+        # 3. The book's IR section by section (chapters in parallel, see book_builder.iter_book_ir),
+        #    streamed to the book file as text chapter by chapter and then saved
+        start = time.perf_counter()
+        progress(40, "Writing Chapters")
+        tracker = SectionTracker(get_content, previous["sections"] if previous else None,
+                                 load_book_ir(job, previous) if previous else None, changed_keys)
+        path = job.handle(filename).path
+        chapters_done = lambda done, total: progress(40 + 55 * done // total, f"Writing Chapters ({done}/{total})")
+        parts = []
+
+        def chapters():
+            for part in iter_book_ir(client, chart, stats, images["print"], tracker.content, content_build,
+                                     chapters_done, tracker):
+                parts.append(part)
+                yield to_text(part)
+
+        size = stream_book(chapters(), path)
+        ir_name = ir_filename("book")
+        save_ir(Book(client_record(client), chart, content_build, front=parts[0], chapters=parts[1:]), job.handle(ir_name).path)
+        if previous:
+            # The previous build's files, unless this build replaced them under the same names
+            for old_name, name in ((previous["book"], filename), (previous["ir"], ir_name)):
+                old_path = os.path.join(job.dir, old_name)
+                if old_name != name and os.path.exists(old_path):
+                    os.remove(old_path)
+        timings["text"] = time.perf_counter() - start
+
+        progress(96, "Rendering Chart Images")
+        images.update(rendering.result())
+
+    sections = tracker.sections
+    save_manifest(job, {
+        "version": MANIFEST_VERSION,
+        "builder": BOOK_FORMAT,
+        "built": datetime.now().isoformat(timespec="seconds"),
+        "book": filename,
+        "ir": ir_name,
+        "bytes": size,
+        "client": client,
+        "content_build": content_build,
+        "chart": {"birth": birth, "data": chart},
+        "images": image_keys,
+        "sections": sections,
+    })
+
+    # 4. The store's content index, so edits to any of these texts find this book
+    versions = {}
+    for section in sections:
+        versions.update(section["inputs"].get("content", {}))
+    record_book(job, filename, client_record(client), content_build, versions)
+    return {
+        "path": path,
+        "ir_path": job.handle(ir_name).path,
+        "bytes": size,
+        "chart_jobs": jobs,
+        "images": images,
+        "chart_reused": chart_reused,
+        "images_rendered": [j["name"] for j in stale],
+        "sections_reused": tracker.reused,
+        "sections_built": tracker.built,
+        "timings": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect incremental book manifests")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Summarize a book's manifest")
+    show.add_argument("job_id")
+    args = parser.parse_args()
+
+    job = get_artifact_store().job(args.job_id)
+    manifest = load_manifest(job)
+    if manifest is None:
+        print(f"❌ No current manifest in {job.dir}")
+        return 1
+    keys = {key for s in manifest["sections"] for key in s["inputs"].get("content", {})}
+    print(f"📖 {manifest['book']} ({manifest['bytes'] / 1024:.0f} KB, built {manifest['built']})")
+    print(f"   Client: {manifest['client'].get('name')}  Content build: {manifest['content_build']}")
+    print(f"   {len(manifest['sections'])} sections, {len(keys)} content keys, {len(manifest['images'])} images")
+    for section in manifest["sections"]:
+        inputs = section["inputs"]
+        used = [name for name in inputs if name != "spec"]
+        print(f"   {section['id']:<22} {section['length']:>7} B  {', '.join(used) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Streaming Book Output for AstroBookBot
+
+Writes a book to disk as book_builder.iter_book produces it, so the book is
+never held in memory whole and its first chapters can be read (or downloaded)
+while the texts of later chapters are still being fetched:
+
+- `stream_book` writes each chapter to "<book>.part" as it completes (flushed,
+  and optionally copied to other sinks such as a socket's sendall), then renames
+  the file to its final name once the last chapter is in
+- `follow_book` reads a book that is still being written, chunk by chunk, until
+  it is complete
+- a small HTTP endpoint serves GET /books/<job id>/<file name> from the artifact
+  store with chunked transfer encoding, following the file while it grows
+
+Configuration:
+    BOOK_DOWNLOAD_HOST   Address the download endpoint listens on (default 127.0.0.1)
+    BOOK_DOWNLOAD_PORT   Its port (default 0 = any free port)
+    BOOK_DOWNLOAD_URL    Public base URL of the endpoint, if it sits behind a proxy
+    BOOK_DOWNLOAD_SERVER Set to 0 to never start the endpoint from the app (default 1)
+
+Usage:
+    python book_stream.py serve [--port 8766]
+    python book_stream.py follow assets/jobs/<job id>/<book>.txt
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from urllib.parse import quote, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from artifact_store import get_artifact_store
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+DOWNLOAD_HOST = os.getenv("BOOK_DOWNLOAD_HOST", "127.0.0.1")
+DOWNLOAD_PORT = int(os.getenv("BOOK_DOWNLOAD_PORT", 0))
+DOWNLOAD_URL = os.getenv("BOOK_DOWNLOAD_URL", "").rstrip("/")
+DOWNLOAD_SERVER = os.getenv("BOOK_DOWNLOAD_SERVER", "1") != "0"
+
+PART_SUFFIX = ".part"
+CHUNK_SIZE = 64 * 1024
+POLL_SECONDS = 0.05
+WAIT_SECONDS = 60  # Longest a reader waits for the file to appear or grow
+
+
+class BookStreamError(Exception):
+    """Raised when a followed book stops before it was completed."""
+
+
+# ==========================================================
+# WRITING AND FOLLOWING
+# ==========================================================
+def stream_book(chunks, path, sinks=()):
+    """
+    Writes the text chunks (e.g. from book_builder.iter_book) to `path`.
+
+    Each chunk is UTF-8 encoded, written to "<path>.part" and flushed before the
+    next one is produced, and passed to every callable in `sinks`. The file is
+    renamed to `path` after the last chunk, so a file under its final name is
+    always complete; if building fails the partial file is removed.
+
+    Returns:
+        int: Bytes written
+    """
+    part_path = path + PART_SUFFIX
+    written = 0
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                f.write(data)
+                f.flush()
+                for sink in sinks:
+                    sink(data)
+                written += len(data)
+        os.replace(part_path, path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return written
+
+
+def _open_book(path, wait):
+    """Opens the finished or in-progress book file, waiting up to `wait` seconds for it to appear."""
+    deadline = time.monotonic() + wait
+    while True:
+        for candidate in (path, path + PART_SUFFIX):
+            try:
+                return open(candidate, "rb")
+            except FileNotFoundError:
+                continue
+        if time.monotonic() > deadline:
+            raise FileNotFoundError(path)
+        time.sleep(POLL_SECONDS)
+
+
+def follow_book(path, wait=WAIT_SECONDS):
+    """
+    Yields the bytes of the book at `path` as they are written by `stream_book`,
+    finishing once the file has been completed.
+
+    Raises:
+        FileNotFoundError: The book did not appear within `wait` seconds
+        BookStreamError: The writer gave up, or stopped writing for `wait` seconds
+    """
+    with _open_book(path, wait) as f:
+        deadline = time.monotonic() + wait
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if data:
+                deadline = time.monotonic() + wait
+                yield data
+                continue
+            # The writer renames the file only after its last write, so once the
+            # final name exists the open file holds the whole book
+            if os.path.exists(path):
+                data = f.read()
+                if data:
+                    yield data
+                return
+            if not os.path.exists(path + PART_SUFFIX):
+                raise BookStreamError(f"Book was not completed: {path}")
+            if time.monotonic() > deadline:
+                raise BookStreamError(f"Book stopped growing: {path}")
+            time.sleep(POLL_SECONDS)
+
+
+# ==========================================================
+# THE DOWNLOAD ENDPOINT
+# ==========================================================
+class BookDownloadServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store, public_url=""):
+        super().__init__(address, BookDownloadHandler)
+        self.store = store
+        self.public_url = public_url
+
+    @property
+    def base_url(self):
+        if self.public_url:
+            return self.public_url
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, handle):
+        """Download URL for an ArtifactHandle (the book need not exist yet)."""
+        return f"{self.base_url}/books/{quote(handle.job_id)}/{quote(handle.name)}"
+
+
+class BookDownloadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _error(self, status, message):
+        data = message.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [unquote(p) for p in self.path.split("?")[0].split("/") if p]
+        if len(parts) != 3 or parts[0] != "books" or parts[2].startswith(".") or os.sep in parts[2]:
+            return self._error(404, "Not found")
+        try:
+            handle = self.server.store.job(parts[1]).handle(parts[2])
+            chunks = follow_book(handle.path)
+            first = next(chunks, b"")
+        except (ValueError, FileNotFoundError):
+            return self._error(404, "Book not found")
+        except BookStreamError as e:
+            return self._error(500, str(e))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(handle.name)}")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            data = first
+            while data:
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+                data = next(chunks, b"")
+        except BookStreamError:
+            # No terminating chunk: the client sees the download as failed, not as a short book
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_download_server(host=DOWNLOAD_HOST, port=DOWNLOAD_PORT, store=None, public_url=DOWNLOAD_URL):
+    """
+    Starts the download endpoint on a background thread (port 0 picks a free port).
+
+    Returns:
+        BookDownloadServer: Call `.shutdown()` when done
+    """
+    server = BookDownloadServer((host, port), store or get_artifact_store(), public_url)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_download_server():
+    """
+    Returns the process-wide download endpoint, starting it on first use, or None
+    if it is disabled (BOOK_DOWNLOAD_SERVER=0) or its port is taken.
+    """
+    global _server
+    with _server_lock:
+        if _server is None and DOWNLOAD_SERVER:
+            try:
+                _server = start_download_server()
+            except OSError as e:
+                print(f"⚠️ Book download endpoint not started: {e}")
+                return None
+        return _server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve or follow books while they are written")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Serve GET /books/<job id>/<file name> from the artifact store")
+    serve.add_argument("--host", default=DOWNLOAD_HOST)
+    serve.add_argument("--port", type=int, default=DOWNLOAD_PORT or 8766)
+    follow = sub.add_parser("follow", help="Print a book as it is written")
+    follow.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "follow":
+        for data in follow_book(args.path):
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        return 0
+
+    server = BookDownloadServer((args.host, args.port), get_artifact_store(), DOWNLOAD_URL)
+    print(f"📚 Serving books from {server.store.root} at {server.base_url}/books/<job id>/<file name>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
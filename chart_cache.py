@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Pie Chart Cache for AstroBookBot
+
+Pie chart inputs are small dicts of integer percentages, and the same distributions
+come up for client after client. This module stores every rendered chart on disk
+under a content-addressed key built from everything that affects its pixels
+(chart kind, ordered stats, colour map, font, size, dpi, PNG output settings), so a repeated
+distribution is a file copy instead of a matplotlib render.
+
+The cache is bounded (CHART_CACHE_MAX_MB, default 256) and evicts the least recently
+used images first. Book renders append their distributions to a usage log, so
+`python chart_cache.py prewarm` can render the most common ones ahead of time.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+script_folder = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.getenv("CHART_CACHE_DIR", os.path.join(script_folder, "assets", "chart_cache"))
+MAX_BYTES = int(float(os.getenv("CHART_CACHE_MAX_MB", 256)) * 1024 * 1024)
+USAGE_LOG = "usage.log"
+
+# Bump when the drawing code changes in a way the key inputs don't capture
+RENDER_VERSION = 2
+
+
+def chart_cache_key(kind, stats, color_map, font, size, dpi, encoding=None):
+    """
+    Stable key for one rendered chart.
+
+    Args:
+        kind (str): Renderer kind (e.g. "pie")
+        stats (dict): Label -> percentage, in drawing order
+        color_map (dict): Label -> colour
+        font (str|None): Font file used for text
+        size (tuple): Output size in mm
+        dpi (int): Output resolution
+        encoding (dict|None): PNG output settings (png_optimize.OUTPUT_SETTINGS)
+
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps([
+        RENDER_VERSION,
+        kind,
+        [[k, v] for k, v in stats.items()],
+        sorted(color_map.items()),
+        os.path.basename(font) if font else None,
+        list(size),
+        dpi,
+        sorted((encoding or {}).items()),
+    ], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """A bounded, LRU-evicted directory of rendered images named by their key."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def get(self, key, dest_path, ext=".png"):
+        """Copies the cached image to `dest_path`. Returns True on a hit."""
+        src = self._path(key, ext)
+        try:
+            _atomic_copy(src, dest_path)
+        except FileNotFoundError:
+            return False
+        # Touching the entry makes it "recently used" for eviction
+        try:
+            os.utime(src, None)
+        except OSError:
+            pass
+        return True
+
+    def put(self, key, src_path, ext=".png", trim=True):
+        """
+        Stores a freshly rendered image under `key`, then trims the cache to its budget
+        (callers storing a batch pass trim=False and call `evict` once at the end).
+        """
+        dest = self._path(key, ext)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _atomic_copy(src_path, dest)
+        if trim:
+            self.evict()
+
+    def entries(self):
+        """(mtime, size, path) for every cached image."""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name == USAGE_LOG or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self):
+        """Removes least recently used images until the cache fits in max_bytes."""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return 0
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+            return removed
+
+    def record_usage(self, kind, stats):
+        """Appends a distribution to the usage log (one short line, safe to append concurrently)."""
+        line = json.dumps({"kind": kind, "stats": [[k, v] for k, v in stats.items()]}, separators=(",", ":"))
+        with open(os.path.join(self.cache_dir, USAGE_LOG), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def most_common(self, n=200):
+        """The `n` most frequently requested (kind, stats) pairs from the usage log."""
+        path = os.path.join(self.cache_dir, USAGE_LOG)
+        if not os.path.exists(path):
+            return []
+        counts = Counter()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    counts[line.strip()] += 1
+        result = []
+        for line, _ in counts.most_common(n):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            result.append((entry["kind"], dict((k, v) for k, v in entry["stats"])))
+        return result
+
+
+def _atomic_copy(src, dest):
+    """Copy via a temp file + rename so readers never see a half-written image."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)), suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+_cache = None
+
+
+def get_chart_cache():
+    """Returns the process-wide cache (None if CHART_CACHE_DIR is set to an empty string)."""
+    global _cache
+    if not CACHE_DIR:
+        return None
+    if _cache is None:
+        _cache = ChartCache()
+    return _cache
+
+
+# ==========================================================
+# PRE-WARMING
+# ==========================================================
+# The two-wedge charts can only take a handful of values: every split of the
+# weighted point total (see PLANET_POINTS), so they can be rendered exhaustively.
+TWO_WEDGE_CHARTS = [("Superior", "Inferior"), ("Eastern", "Western"), ("Hot", "Cold"), ("Yang", "Yin")]
+POINT_TOTALS = range(18, 25)
+
+
+def two_wedge_distributions():
+    seen = set()
+    for high, low in TWO_WEDGE_CHARTS:
+        for total in POINT_TOTALS:
+            for points in range(total + 1):
+                pct = int(round(points / total * 100))
+                if (high, pct) in seen: continue
+                seen.add((high, pct))
+                yield {high: pct, low: 100 - pct}
+
+
+def prewarm(top=200):
+    """Renders every two-wedge split plus the `top` most used distributions. Returns the count rendered."""
+    from chart_rendering import generate_pie_chart
+
+    distributions = list(two_wedge_distributions())
+    distributions += [stats for kind, stats in get_chart_cache().most_common(top) if kind == "pie"]
+
+    rendered = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for stats in distributions:
+            if generate_pie_chart(stats, "prewarm.png", "", output_dir=tmp_dir):
+                rendered += 1
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the rendered pie chart cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("prewarm", help="Render the common distributions ahead of time")
+    warm.add_argument("--top", type=int, default=200, help="How many of the most used distributions to include")
+    sub.add_parser("info", help="Show cache size")
+    sub.add_parser("evict", help="Trim the cache to its size budget")
+    args = parser.parse_args()
+
+    cache = get_chart_cache()
+    if args.command == "prewarm":
+        before = len(cache.entries())
+        rendered = prewarm(args.top)
+        print(f"🔥 Pre-warmed {rendered} distributions ({len(cache.entries()) - before} newly rendered).")
+    elif args.command == "info":
+        entries = cache.entries()
+        size_mb = sum(size for _, size, _ in entries) / 1024 / 1024
+        print(f"{len(entries)} images, {size_mb:.1f} MB of {cache.max_bytes / 1024 / 1024:.0f} MB in {cache.cache_dir}")
+    elif args.command == "evict":
+        print(f"Removed {cache.evict()} images.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
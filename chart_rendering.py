@@ -0,0 +1,478 @@
+"""
+Chart Rendering for AstroBookBot
+
+This module holds the book's image generators (the donut pie charts, the chart
+summary table drawn by table_renderer.py and the chart wheel drawn by
+chart_wheel.py) outside of the Streamlit app, so they can run in worker
+processes. `render_chart_jobs` fans all image jobs for a book out to a pool of
+Agg-backend workers whose font caches are warmed once per process. Pie charts
+are drawn on pooled figure templates that are built once and updated in place.
+
+With the donut renderer, a book's pies are drawn together in one pass onto a single
+sheet and sliced into their files (CHART_PIE_SHEET). `generate_pie_pdf` puts a
+book's pies (with either renderer's jobs) into one multi-page vector PDF, which
+goes into every book bundle (book_bundle.py).
+
+Images come in two quality tiers: "preview" (screen resolution, CHART_PREVIEW_DPI)
+for the interactive run, and "print" (300 dpi) which is only rendered when a book
+is exported (see `ensure_print_tier`). Print files keep the plain filenames the
+book content refers to; previews are saved next to them as "<name>.preview.png".
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+import threading
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import matplotlib.font_manager as fm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Wedge, Rectangle
+import numpy as np
+
+from chart_cache import chart_cache_key, get_chart_cache
+from donut_renderer import PIE_COLOR_MAP, PIE_SIZE_MM, PIE_DPI, generate_donut_chart, donut_layout, to_sheet, to_pdf_pages
+from table_renderer import render_table_image
+from chart_wheel import render_wheel
+from artifact_store import atomic_path, get_artifact_store
+from png_optimize import OUTPUT_SETTINGS as PNG_SETTINGS, maybe_optimize_png, save_png, get_png_stats, stats as png_stats
+
+# Define paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+assets_dir = os.path.join(current_dir, "assets", "pie_charts")
+os.makedirs(assets_dir, exist_ok=True)
+
+# Define font paths - use system fonts if custom fonts not available
+try:
+    FONT_REGULAR = os.path.join(current_dir, "INDESIGN FILES", "Document fonts", "ArsenicaTrial-Regular.ttf")
+    if not os.path.exists(FONT_REGULAR):
+        FONT_REGULAR = None  # Will use default system font
+except:
+    FONT_REGULAR = None
+
+# "matplotlib" (default) or "donut" for the lightweight renderer in donut_renderer.py
+PIE_RENDERER = os.getenv("CHART_PIE_RENDERER", "matplotlib")
+
+# With the donut renderer, draw all of a book's pies as one sheet (set to 0 for one job per pie)
+PIE_SHEET = os.getenv("CHART_PIE_SHEET", "1") != "0"
+
+# Output resolution per quality tier
+TIER_DPI = {
+    "preview": int(os.getenv("CHART_PREVIEW_DPI", 96)),
+    "print": PIE_DPI,
+}
+
+# ==========================================================
+# 1. FIGURE TEMPLATES
+# ==========================================================
+@lru_cache(maxsize=None)
+def get_legend_font():
+    """Legend FontProperties, loaded from the font file once per process (None = matplotlib default)."""
+    return fm.FontProperties(fname=FONT_REGULAR, size=8) if FONT_REGULAR else None
+
+class PieFigureTemplate:
+    """
+    One pre-built pie figure whose artists are updated in place for every chart.
+    
+    The figure, axes, wedges and percentage labels are created once; a render only
+    moves wedge angles, colours and label positions, shows or hides spare wedges and
+    swaps in a legend (built once per label set). The output matches a fresh
+    `ax.pie()` figure pixel for pixel.
+    """
+    
+    def __init__(self):
+        # Exact dimensions: 160mm x 100mm at 300 DPI
+        width_inches = PIE_SIZE_MM[0] / 25.4
+        height_inches = PIE_SIZE_MM[1] / 25.4
+        self.fig = Figure(figsize=(width_inches, height_inches), dpi=PIE_DPI)
+        FigureCanvasAgg(self.fig)
+        self.fig.patch.set_facecolor('white')
+        
+        # Axes take up the entire figure; this is the state ax.pie() leaves them in
+        self.ax = self.fig.add_axes([0.0, 0.0, 1.0, 1.0])
+        self.ax.set_aspect('equal')
+        self.ax.set(frame_on=False, xticks=[], yticks=[], xlim=(-1.25, 1.25), ylim=(-1.25, 1.25))
+        
+        # Donut geometry: outer radius 0.8, ring 0.4 wide, labels 40% of the way
+        # from the inner radius (0.8 * 0.6) to the outer radius
+        self.radius_fraction = 0.8
+        self.width_fraction = 0.6
+        inner_radius = self.radius_fraction * self.width_fraction
+        self.label_radius = inner_radius + (self.radius_fraction - inner_radius) * 0.4
+        
+        self.wedges = []
+        self.texts = []
+        self.legends = {}
+    
+    def _ensure_artists(self, count):
+        while len(self.wedges) < count:
+            wedge = Wedge((0, 0), self.radius_fraction, 0, 360, clip_on=False, label='')
+            wedge.set(edgecolor=None, linewidth=0, width=1 - self.width_fraction)
+            self.ax.add_patch(wedge)
+            self.wedges.append(wedge)
+            self.texts.append(self.ax.text(0, 0, "", ha='center', va='center', fontsize=8))
+    
+    def _legend(self, labels, colors):
+        key = tuple(labels)
+        if key not in self.legends:
+            # Legend with just the labels (no percentages) in the bottom right corner
+            handles = [Rectangle((0, 0), 0.8, 0.8, fc=c, label=l) for l, c in zip(labels, colors)]
+            self.legends[key] = self.ax.legend(handles=handles,
+                                               bbox_to_anchor=(0.99, 0.01),
+                                               loc='lower right',
+                                               frameon=False,
+                                               prop=get_legend_font(),
+                                               ncol=1,
+                                               labelspacing=0.3,
+                                               handlelength=1.0,
+                                               handletextpad=0.5,
+                                               borderaxespad=0.5)
+        self.ax.legend_ = self.legends[key]
+    
+    def render(self, labels, sizes, colors, save_path, dpi=PIE_DPI):
+        self._ensure_artists(len(sizes))
+        
+        # Same angle arithmetic as ax.pie(startangle=90): fractions of a turn, counter-clockwise
+        values = np.asarray(sizes)
+        fracs = values / values.sum()
+        theta1 = 90 / 360
+        for i, wedge in enumerate(self.wedges):
+            text = self.texts[i]
+            if i >= len(sizes):
+                wedge.set_visible(False)
+                text.set_visible(False)
+                continue
+            theta2 = theta1 + fracs[i]
+            wedge.set_theta1(360. * theta1)
+            wedge.set_theta2(360. * theta2)
+            wedge.set_facecolor(colors[i])
+            wedge.set_visible(True)
+            theta1 = theta2
+            
+            # Percentage label at the center angle of the wedge
+            percent = int(round(sizes[i] / sum(sizes) * 100))
+            angle_rad = np.radians((wedge.theta1 + wedge.theta2) / 2)
+            text.set_position((self.label_radius * np.cos(angle_rad), self.label_radius * np.sin(angle_rad)))
+            text.set_text(f"{percent}%")
+            text.set_visible(True)
+        
+        self._legend(labels, colors)
+        self.fig.savefig(save_path, bbox_inches=None, transparent=False, facecolor='white', dpi=dpi)
+
+class FigureTemplatePool:
+    """
+    Hands out pre-built figure templates, one caller at a time per template.
+    Threads that render concurrently each get their own; templates are kept for reuse.
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._free = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def checkout(self):
+        with self._lock:
+            template = self._free.pop() if self._free else None
+        if template is None:
+            template = self._factory()
+        yield template
+        # Only reached when the render succeeded; a failed template is dropped
+        with self._lock:
+            self._free.append(template)
+
+pie_templates = FigureTemplatePool(PieFigureTemplate)
+
+# ==========================================================
+# 2. IMAGE GENERATORS
+# ==========================================================
+def generate_pie_chart(stats_dict, filename, title, output_dir=None, job_id=None, tier="print"):
+    """Generate a pie chart with optimized appearance and save it to the specified file.
+    
+    This function creates a pie chart with the following features:
+    - Large size that fills most of the image height
+    - No white dividing lines between segments
+    - Properly positioned percentage labels with small font size
+    - Reduced legend font size
+    - Overall image dimensions of 160mm x 100mm x 300dpi
+    
+    Identical inputs are served from the chart cache instead of being re-rendered.
+    With a `job_id` the chart goes into that job's artifact directory and an
+    ArtifactHandle is returned. `tier` ("preview" or "print") sets the resolution.
+    """
+    dpi = TIER_DPI[tier]
+    labels, sizes, cache_key = _pie_inputs(stats_dict, dpi)
+    if not sizes: return None
+    
+    save_path, result_path = _output_paths(tier_filename(filename, tier), output_dir, job_id)
+    
+    # Serve repeated distributions straight from the cache (the dpi is part of the key)
+    cache = get_chart_cache()
+    if cache is not None and cache.get(cache_key, save_path):
+        return result_path
+    
+    # Render to a temporary file and rename it into place
+    with atomic_path(save_path) as tmp_path:
+        if PIE_RENDERER == "donut":
+            generate_donut_chart(stats_dict, os.path.basename(tmp_path), title, output_dir=os.path.dirname(tmp_path), dpi=dpi)
+        else:
+            chart_colors = [PIE_COLOR_MAP.get(l, "#95a5a6") for l in labels]
+            with pie_templates.checkout() as template:
+                template.render(labels, sizes, chart_colors, tmp_path, dpi)
+        maybe_optimize_png(tmp_path)
+    if cache is not None:
+        cache.put(cache_key, save_path)
+    return result_path
+
+def generate_pie_sheet(jobs, tier="print"):
+    """
+    Renders a book's pie jobs together with the donut renderer. Every chart that isn't
+    cached is drawn in one pass onto a single sheet, and each exact-pixel crop is
+    written straight to its file as an optimized PNG (no unoptimized file to re-read).
+    The cache is trimmed once for the whole batch.
+    
+    Returns:
+        dict: { job name: path or handle (None for an empty pie) }
+    """
+    dpi = TIER_DPI[tier]
+    cache = get_chart_cache()
+    results, pending = {}, []
+    for job in jobs:
+        _, sizes, cache_key = _pie_inputs(job["stats"], dpi)
+        if not sizes:
+            results[job["name"]] = None
+            continue
+        save_path, results[job["name"]] = _output_paths(tier_filename(job["filename"], tier), None, job.get("job_id"))
+        if cache is not None and cache.get(cache_key, save_path):
+            continue
+        pending.append((save_path, cache_key, donut_layout(job["stats"])))
+    
+    if pending:
+        sheet, boxes = to_sheet([layout for _, _, layout in pending], dpi)
+        for (save_path, cache_key, _), box in zip(pending, boxes):
+            with atomic_path(save_path) as tmp_path:
+                save_png(sheet.crop(box), tmp_path, dpi=(dpi, dpi))
+            if cache is not None:
+                cache.put(cache_key, save_path, trim=False)
+        if cache is not None:
+            cache.evict()
+    return results
+
+def generate_pie_pdf(jobs, filename="statistics.pdf", job_id=None):
+    """Writes every non-empty pie job as one page of a single vector PDF. Returns its path (None if all are empty)."""
+    layouts = [donut_layout(job["stats"]) for job in jobs if job["kind"] == "pie"]
+    layouts = [layout for layout in layouts if layout is not None]
+    if not layouts: return None
+    save_path, result_path = _output_paths(filename, None, job_id)
+    with atomic_path(save_path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(to_pdf_pages(layouts))
+    return result_path
+
+def _pie_inputs(stats_dict, dpi):
+    """(labels, sizes, cache key) for a pie; zero values are left out."""
+    labels = [k for k, v in stats_dict.items() if v > 0]
+    sizes = [v for k, v in stats_dict.items() if v > 0]
+    kind = "donut" if PIE_RENDERER == "donut" else "pie"
+    cache_key = chart_cache_key(kind, {l: s for l, s in zip(labels, sizes)}, PIE_COLOR_MAP, FONT_REGULAR, PIE_SIZE_MM, dpi,
+                                PNG_SETTINGS)
+    return labels, sizes, cache_key
+
+def generate_table_image(chart_data, filename="chart_summary.png", job_id=None, tier="print"):
+    """
+    Generates a PNG table.
+    - One row per planet (No grouping).
+    - Column 2 (Planets) is CENTER aligned.
+    
+    Drawn directly with Pillow by table_renderer.py (no matplotlib layout pass).
+    """
+    save_path, result_path = _output_paths(tier_filename(filename, tier), None, job_id)
+    with atomic_path(save_path) as tmp_path:
+        render_table_image(chart_data, os.path.basename(tmp_path), output_dir=os.path.dirname(tmp_path), dpi=TIER_DPI[tier])
+        maybe_optimize_png(tmp_path)
+    return result_path
+
+def generate_wheel_image(chart_data, filename="chart_wheel.png", job_id=None, tier="print"):
+    """
+    Draws the natal chart wheel (chart_wheel.py). The format follows the filename:
+    .svg and .pdf are written as vectors, .png is rasterized at the tier's dpi.
+    """
+    save_path, result_path = _output_paths(tier_filename(filename, tier), None, job_id)
+    with atomic_path(save_path) as tmp_path:
+        render_wheel(chart_data, tmp_path, dpi=TIER_DPI[tier])
+        maybe_optimize_png(tmp_path)
+    return result_path
+
+def _output_paths(filename, output_dir, job_id):
+    """(file to write, value to return): a job's artifact handle, or the shared assets folder."""
+    if job_id:
+        handle = get_artifact_store().job(job_id).handle(filename)
+        return handle.path, handle
+    save_path = os.path.join(output_dir or assets_dir, filename)
+    return save_path, save_path if output_dir else f"assets/pie_charts/{filename}"
+
+def tier_filename(filename, tier):
+    """Print files keep their name; other tiers get it as a suffix (hemisphere.preview.png)."""
+    if tier == "print":
+        return filename
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{tier}{ext}"
+
+# ==========================================================
+# 3. PARALLEL RENDERING STAGE
+# ==========================================================
+# Workers per pool (0 or 1 renders inline in the calling process)
+RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", min(8, os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _init_worker():
+    """Runs once per worker: force Agg and warm the font and glyph caches."""
+    matplotlib.use("Agg")
+    fm.findfont(fm.FontProperties())
+    get_legend_font()
+    with pie_templates.checkout():
+        pass
+    fig = plt.figure(figsize=(1, 1), dpi=72)
+    fig.text(0.5, 0.5, "0123456789% ☉☽☿♀♂♃♄♅♆♇☊☋⚸⚷⊗↑")
+    fig.canvas.draw()
+    plt.close(fig)
+
+def _record_pie_usage(stats_dict, tier):
+    # Only print renders count towards pre-warming, so a previewed and exported book isn't counted twice
+    cache = get_chart_cache()
+    if cache is not None and tier == "print":
+        cache.record_usage("pie", stats_dict)
+
+def _render_job(job):
+    """Renders one job. Returns ({name: path}, PNG savings made while rendering it)."""
+    before = get_png_stats()
+    tier = job.get("tier", "print")
+    if job["kind"] == "pie":
+        _record_pie_usage(job["stats"], tier)
+        results = {job["name"]: generate_pie_chart(job["stats"], job["filename"], job.get("title", ""), job_id=job.get("job_id"), tier=tier)}
+    elif job["kind"] == "pie_sheet":
+        for pie in job["jobs"]:
+            _record_pie_usage(pie["stats"], tier)
+        results = generate_pie_sheet(job["jobs"], tier)
+    elif job["kind"] == "table":
+        results = {job["name"]: generate_table_image(job["chart"], job["filename"], job_id=job.get("job_id"), tier=tier)}
+    elif job["kind"] == "wheel":
+        results = {job["name"]: generate_wheel_image(job["chart"], job["filename"], job_id=job.get("job_id"), tier=tier)}
+    else:
+        raise ValueError(f"Unknown chart job kind: {job['kind']}")
+    after = get_png_stats()
+    return results, {key: after[key] - before[key] for key in ("images", "bytes_before", "bytes_after", "over_budget", "unmeasured")}
+
+def _merge_results(rendered):
+    paths = {}
+    for results, _ in rendered:
+        paths.update(results)
+    return paths
+
+def _get_pool():
+    """One long-lived pool per process, so workers keep their warm caches between books."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, initializer=_init_worker)
+        return _pool
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+def render_chart_jobs(jobs, tier="print"):
+    """
+    Renders every image job for a book and waits for all of them.
+
+    Args:
+        jobs (list): Dicts with a unique "name", a "kind" ("pie", "table" or "wheel"), a "filename",
+            the generator inputs ("stats" and "title" for pies, "chart" for the table and wheel)
+            and optionally the "job_id" of an artifact store job to write into
+        tier (str): "preview" or "print"
+
+    Returns:
+        dict: { job name: artifact path or handle (None for an empty pie) }
+    """
+    global _pool
+    jobs = [dict(job, tier=tier) for job in jobs]
+    pies = [job for job in jobs if job["kind"] == "pie"]
+    if PIE_RENDERER == "donut" and PIE_SHEET and len(pies) > 1:
+        # One task draws every pie on a single sheet; it goes first as the longest one
+        sheet = {"name": "pie_sheet", "kind": "pie_sheet", "jobs": pies, "tier": tier}
+        jobs = [sheet] + [job for job in jobs if job["kind"] != "pie"]
+    if RENDER_WORKERS <= 1 or len(jobs) <= 1:
+        return _merge_results(map(_render_job, jobs))
+
+    try:
+        pool = _get_pool()
+        results = list(pool.map(_render_job, jobs))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OS); drop the pool and render inline
+        with _pool_lock:
+            _pool = None
+        return _merge_results(map(_render_job, jobs))
+
+    # Workers count their PNG savings in their own process; add them up here
+    for _, savings in results:
+        png_stats.merge(savings)
+    return _merge_results(results)
+
+# ==========================================================
+# 4. PRINT TIER ON EXPORT
+# ==========================================================
+def chart_paths(jobs, tier="print"):
+    """
+    Where each job's image for `tier` lives (or will live), without rendering anything.
+    Matches what `render_chart_jobs` returns, so the book content can point at the
+    print files while only previews exist.
+    """
+    paths = {}
+    for job in jobs:
+        if job["kind"] == "pie" and not any(v > 0 for v in job["stats"].values()):
+            paths[job["name"]] = None
+            continue
+        paths[job["name"]] = _output_paths(tier_filename(job["filename"], tier), None, job.get("job_id"))[1]
+    return paths
+
+def ensure_tier(jobs, tier="print"):
+    """
+    Renders `tier`'s images for a book's jobs, skipping any that already exist.
+    Pies come from the chart cache when the same distribution was rendered before.
+
+    Returns:
+        dict: { job name: path or handle (None for an empty pie) }
+    """
+    paths = chart_paths(jobs, tier)
+    missing = [job for job in jobs if paths[job["name"]] is not None and not os.path.exists(local_path(paths[job["name"]]))]
+    if missing:
+        render_chart_jobs(missing, tier=tier)
+    return paths
+
+def ensure_print_tier(jobs):
+    """
+    Renders the 300-dpi images for a book's jobs, skipping any that were already
+    exported. Call it right before the book file or a PDF is handed out.
+    """
+    return ensure_tier(jobs, "print")
+
+def discard_chart_files(jobs):
+    """Removes every tier's image for the jobs, so they are rendered afresh when next needed."""
+    for tier in TIER_DPI:
+        for path in chart_paths(jobs, tier).values():
+            if path is not None and os.path.exists(local_path(path)):
+                os.remove(local_path(path))
+
+def local_path(path):
+    """Filesystem path for a returned handle or "assets/pie_charts/..." string."""
+    return os.fspath(path) if os.path.isabs(os.fspath(path)) else os.path.join(current_dir, path)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Natal Chart Wheel Renderer for AstroBookBot
+
+Draws the client's chart wheel from the chart data the book is built from:
+
+- the zodiac ring (sign segments coloured by element, with their glyphs)
+- the house cusps from chart["cusps"], with house numbers (AC and MC lines heavier)
+- every body from chart["degrees"] with its glyph from the summary table's SYMBOLS,
+  spread apart where bodies are close together, with a tick at its true position
+- aspect lines between bodies, from astro_engine.get_aspect like the book's aspect chapters
+
+The wheel is laid out once in mm with the Ascendant on the left, and written by
+donut_renderer.py's writers: SVG and PDF directly (glyphs as outlines), PNG only
+when asked for, rasterized once with Pillow.
+
+Usage:
+    python chart_wheel.py chart.json chart_wheel.svg
+    (chart.json holds the chart data dict: "degrees" and "cusps" are required)
+"""
+
+import os
+import sys
+import json
+import math
+
+from astro_engine import ZODIAC_SIGNS, get_aspect, normalize_degree
+from donut_renderer import FONT_DEFAULT, PIE_COLOR_MAP, PT, arc_path, centered_text, to_svg, to_pdf, to_image
+from table_renderer import SYMBOLS
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+assets_dir = os.path.join(current_dir, "assets", "pie_charts")
+
+WHEEL_SIZE_MM = 160
+WHEEL_DPI = 300
+
+# Radii as fractions of half the wheel size, from the outside in
+R_OUTER = 0.96         # Outer edge of the zodiac ring
+R_ZODIAC = 0.80        # Inner edge of the zodiac ring
+R_BODY = 0.67          # Body glyphs
+R_HOUSE = 0.52         # Inner edge of the body band
+R_HOUSE_NUMBER = 0.46  # House numbers
+R_ASPECT = 0.40        # Circle the aspect lines are drawn in
+
+SIGN_GLYPHS = ["♈", "♉", "♊", "♋", "♌", "♍", "♎", "♏", "♐", "♑", "♒", "♓"]
+SIGN_ELEMENTS = ["Fire", "Earth", "Air", "Water"]  # Repeats around the zodiac from Aries
+
+LINE_COLOR = "#000000"
+TEXT_COLOR = "#000000"
+ASPECT_COLORS = {
+    "Opposition": "#c0392b", "Square": "#c0392b",
+    "Trine": "#2e86c1", "Sextile": "#2e86c1",
+}
+
+# Bodies that are not drawn as aspect lines (the South Node always opposes the North Node)
+NO_ASPECT_LINES = {"Part of Fortune", "South Node"}
+
+SIGN_GLYPH_SIZE = 14 * PT
+BODY_GLYPH_SIZE = 13 * PT
+ANGLE_LABEL_SIZE = 9 * PT
+HOUSE_NUMBER_SIZE = 7 * PT
+
+# The AC / MC labels sit this many degrees past their (heavier) cusp line instead of on it
+ANGLE_LABEL_OFFSET = 5
+ANGLES = ("Ascendant", "Midheaven")
+
+
+def chart_aspects(chart_data):
+    """[(body, body, aspect)] for every aspected pair of bodies, in chart["degrees"] order."""
+    bodies = [(b, d) for b, d in chart_data["degrees"].items() if b != "Part of Fortune"]
+    aspects = []
+    for i, (b1, d1) in enumerate(bodies):
+        for b2, d2 in bodies[i + 1:]:
+            asp = get_aspect(d1, d2)
+            if asp:
+                aspects.append((b1, b2, asp))
+    return aspects
+
+
+def _spread_run(values, min_gap, lo=None, hi=None):
+    """
+    Spreads sorted values along a line so neighbours are at least `min_gap` apart,
+    shifting each crowded group as little as possible around its centre and, if
+    given, keeping every value within [lo, hi].
+
+    Returns:
+        list: Adjusted values, in the input order
+    """
+    # Groups of [first index, count, centre]; clamp into the bounds and merge
+    # neighbours until none overlap
+    groups = [[k, 1, v] for k, v in enumerate(values)]
+    merged = True
+    while merged:
+        merged = False
+        for group in groups:
+            half = (group[1] - 1) * min_gap / 2
+            if lo is not None and group[2] - half < lo:
+                group[2] = lo + half
+            if hi is not None and group[2] + half > hi:
+                group[2] = hi - half
+        for g in range(len(groups) - 1):
+            a, b = groups[g], groups[g + 1]
+            a_end = a[2] + (a[1] - 1) * min_gap / 2
+            b_start = b[2] - (b[1] - 1) * min_gap / 2
+            if b_start - a_end < min_gap:
+                count = a[1] + b[1]
+                centre = (a[2] * a[1] + b[2] * b[1]) / count
+                groups[g:g + 2] = [[a[0], count, centre]]
+                merged = True
+                break
+
+    result = [0.0] * len(values)
+    for first, count, centre in groups:
+        for j in range(count):
+            result[first + j] = centre + (j - (count - 1) / 2) * min_gap
+    return result
+
+
+def spread_angles(angles, min_gap, barriers=()):
+    """
+    Moves angles (degrees) apart so neighbours are at least `min_gap` apart,
+    shifting each crowded group as little as possible around its centre. No angle
+    ends up within `min_gap / 2` of a barrier (e.g. a line drawn through the band);
+    angles stay on their side of it.
+
+    Returns:
+        list: Adjusted angles, in the input order
+    """
+    n = len(angles)
+    if n < 2 and not barriers:
+        return list(angles)
+    result = [0.0] * n
+
+    if not barriers:
+        min_gap = min(min_gap, 360.0 / n)
+        # Start after the widest gap, so no group straddles the starting point
+        order = sorted(range(n), key=lambda i: normalize_degree(angles[i]))
+        values = [normalize_degree(angles[i]) for i in order]
+        gaps = [(values[(k + 1) % n] - values[k]) % 360 for k in range(n)]
+        start = (max(range(n), key=gaps.__getitem__) + 1) % n
+        order = order[start:] + order[:start]
+        values = values[start:] + values[:start]
+        for k in range(1, n):
+            while values[k] < values[k - 1]:
+                values[k] += 360
+        for i, value in zip(order, _spread_run(values, min_gap)):
+            result[i] = normalize_degree(value)
+        return result
+
+    # The barriers cut the circle into arcs; each arc's angles are spread within it
+    walls = sorted(normalize_degree(b) for b in barriers)
+    arcs = {}
+    for i, angle in enumerate(angles):
+        value = normalize_degree(angle)
+        wall = max((w for w in walls if w <= value), default=walls[-1])
+        arcs.setdefault(wall, []).append((normalize_degree(value - wall), i))
+    for k, wall in enumerate(walls):
+        members = sorted(arcs.get(wall, []))
+        if not members:
+            continue
+        span = normalize_degree(walls[(k + 1) % len(walls)] - wall) or 360.0
+        gap = min(min_gap, span / (len(members) + 1))
+        spread = _spread_run([offset for offset, _ in members], gap, gap / 2, span - gap / 2)
+        for (_, i), offset in zip(members, spread):
+            result[i] = normalize_degree(wall + offset)
+    return result
+
+
+# ==========================================================
+# LAYOUT
+# ==========================================================
+def _circle(cx, cy, r):
+    return [("M", (cx + r, cy))] + arc_path(cx, cy, r, 0, 360) + [("Z",)]
+
+
+def _polar(cx, cy, r, angle):
+    rad = math.radians(angle)
+    return (cx + r * math.cos(rad), cy - r * math.sin(rad))
+
+
+def wheel_layout(chart_data, size_mm=WHEEL_SIZE_MM):
+    """
+    Lays out the chart wheel for `chart_data` (needs "degrees" and "cusps").
+
+    Returns:
+        dict: {"size": (w, h) in mm, "ops": [...]} in donut_renderer's op format
+    """
+    degrees = chart_data["degrees"]
+    cusps = list(chart_data["cusps"])
+    if len(cusps) == 13: cusps = cusps[1:]
+    asc = degrees.get("Ascendant", cusps[0])
+
+    cx = cy = size_mm / 2
+    unit = size_mm / 2
+
+    def angle(lon):
+        # Ascendant on the left, zodiac running counter-clockwise
+        return 180.0 + normalize_degree(lon - asc)
+
+    shapes, lines, texts = [], [], []
+    width = 0.25
+
+    # Zodiac ring: one segment per sign, filled with its element colour
+    for i, sign in enumerate(ZODIAC_SIGNS):
+        a0, a1 = angle(i * 30), angle(i * 30) + 30
+        outer, inner = R_OUTER * unit, R_ZODIAC * unit
+        path = [("M", _polar(cx, cy, outer, a0))]
+        path += arc_path(cx, cy, outer, a0, a1)
+        path.append(("L", _polar(cx, cy, inner, a1)))
+        path += arc_path(cx, cy, inner, a1, a0)
+        path.append(("Z",))
+        shapes.append(("path", PIE_COLOR_MAP[SIGN_ELEMENTS[i % 4]], path))
+        lines.append(("stroke", LINE_COLOR, width, [("M", _polar(cx, cy, outer, a0)), ("L", _polar(cx, cy, inner, a0))]))
+        texts.append(centered_text(SIGN_GLYPHS[i], *_polar(cx, cy, (R_OUTER + R_ZODIAC) / 2 * unit, a0 + 15), FONT_DEFAULT, SIGN_GLYPH_SIZE, TEXT_COLOR))
+
+    for r in (R_OUTER, R_ZODIAC, R_HOUSE, R_ASPECT):
+        lines.append(("stroke", LINE_COLOR, width, _circle(cx, cy, r * unit)))
+
+    # House cusps (1 = Ascendant and 10 = Midheaven heavier), numbers mid-house
+    for h in range(12):
+        a = angle(cusps[h])
+        span = normalize_degree(cusps[(h + 1) % 12] - cusps[h])
+        stroke = width * 3 if h in (0, 9) else width
+        lines.append(("stroke", LINE_COLOR, stroke, [("M", _polar(cx, cy, R_ZODIAC * unit, a)), ("L", _polar(cx, cy, R_ASPECT * unit, a))]))
+        texts.append(centered_text(str(h + 1), *_polar(cx, cy, R_HOUSE_NUMBER * unit, a + span / 2), FONT_DEFAULT, HOUSE_NUMBER_SIZE, TEXT_COLOR))
+
+    # Aspect lines between the bodies' true positions
+    for b1, b2, asp in chart_aspects(chart_data):
+        if asp not in ASPECT_COLORS or b1 in NO_ASPECT_LINES or b2 in NO_ASPECT_LINES: continue
+        lines.append(("stroke", ASPECT_COLORS[asp], width * 2,
+                      [("M", _polar(cx, cy, R_ASPECT * unit, angle(degrees[b1]))), ("L", _polar(cx, cy, R_ASPECT * unit, angle(degrees[b2])))]))
+
+    # Bodies: tick at the true longitude, glyph at the spread-out angle
+    bodies = [b for b in degrees if b in SYMBOLS]
+    true_angles = [angle(degrees[b]) + (ANGLE_LABEL_OFFSET if b in ANGLES else 0) for b in bodies]
+    min_gap = math.degrees(BODY_GLYPH_SIZE * 1.15 / (R_BODY * unit))
+    # The heavy AC / MC cusp lines cross the body band: glyphs stay clear of them
+    glyph_angles = spread_angles(true_angles, min_gap, barriers=[angle(cusps[0]), angle(cusps[9])])
+    for body, true_a, glyph_a in zip(bodies, true_angles, glyph_angles):
+        if body in ANGLES:
+            texts.append(centered_text(SYMBOLS[body], *_polar(cx, cy, R_BODY * unit, glyph_a), FONT_DEFAULT, ANGLE_LABEL_SIZE, TEXT_COLOR))
+            continue
+        tick_start = _polar(cx, cy, R_ZODIAC * unit, true_a)
+        tick_end = _polar(cx, cy, (R_ZODIAC - 0.03) * unit, true_a)
+        glyph_edge = _polar(cx, cy, (R_BODY + 0.06) * unit, glyph_a)
+        lines.append(("stroke", LINE_COLOR, width, [("M", tick_start), ("L", tick_end), ("L", glyph_edge)]))
+        texts.append(centered_text(SYMBOLS[body], *_polar(cx, cy, R_BODY * unit, glyph_a), FONT_DEFAULT, BODY_GLYPH_SIZE, TEXT_COLOR))
+
+    # Fills first, then lines, then text on top (the PNG writer draws text last anyway)
+    return {"size": (size_mm, size_mm), "ops": shapes + lines + texts}
+
+
+# ==========================================================
+# ENTRY POINTS
+# ==========================================================
+def render_wheel(chart_data, path, dpi=WHEEL_DPI):
+    """
+    Renders the chart wheel to `path`; the format follows the extension (.svg, .pdf or .png).
+
+    Returns:
+        str: `path`
+    """
+    layout = wheel_layout(chart_data)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".svg":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(to_svg(layout))
+    elif ext == ".pdf":
+        with open(path, "wb") as f:
+            f.write(to_pdf(layout))
+    else:
+        to_image(layout, dpi).save(path, dpi=(dpi, dpi))
+    return path
+
+
+def generate_wheel_chart(chart_data, filename="chart_wheel.svg", output_dir=None, dpi=WHEEL_DPI):
+    """Saves the wheel next to the other book images. Returns the asset path."""
+    save_path = os.path.join(output_dir or assets_dir, filename)
+    render_wheel(chart_data, save_path, dpi)
+    return save_path if output_dir else f"assets/pie_charts/{filename}"
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python chart_wheel.py <chart.json> <output .svg|.pdf|.png>")
+        return 1
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        chart_data = json.load(f)
+    render_wheel(chart_data, sys.argv[2])
+    print(f"✅ Saved {sys.argv[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
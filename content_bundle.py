@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Compiled Content Bundle for AstroBookBot
+
+Compiles every placement text from the Notion library into one read-only file that
+is opened with `mmap`, so all worker processes share a single page-cached copy and
+a book needs no Notion lookups at all.
+
+File layout (little-endian):
+    MAGIC (8 bytes) | format version (u32) | entry count (u32) | meta length (u32)
+    meta JSON (build id, build time, source, counts)
+    index: one (key offset u64, key length u32, text offset u64, text length u32) per entry,
+           sorted by the UTF-8 key bytes so lookups are a binary search
+    key and text bytes (UTF-8)
+
+The build id is a hash of every key and text in the bundle, so a generated book can
+record exactly which content build it used.
+
+Usage:
+    python content_bundle.py build [--output content/placements.bundle]
+    python content_bundle.py info
+    python content_bundle.py get "Sun in Aries"
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+script_folder = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUNDLE_PATH = os.path.join(script_folder, "content", "placements.bundle")
+
+MAGIC = b"ZCBUNDLE"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIII")
+_ENTRY = struct.Struct("<QIQI")
+
+
+class BundleFormatError(Exception):
+    """Raised when a file is not a content bundle this code can read."""
+
+
+# ==========================================================
+# BUILD
+# ==========================================================
+def compute_build_id(texts):
+    """Stable hash of the whole content set (independent of build time)."""
+    digest = hashlib.sha256()
+    for key in sorted(texts):
+        digest.update(key.encode("utf-8") + b"\0" + texts[key].encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def write_bundle(texts, output_path, source="notion"):
+    """
+    Writes `texts` ({placement key: text}) as a bundle file, atomically.
+
+    Returns:
+        dict: The bundle's meta block
+    """
+    entries = sorted((k.encode("utf-8"), v.encode("utf-8")) for k, v in texts.items())
+    meta = {
+        "build_id": compute_build_id(texts),
+        "built_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "source": source,
+        "count": len(entries),
+    }
+    meta_bytes = json.dumps(meta, sort_keys=True).encode("utf-8")
+
+    index_offset = _HEADER.size + len(meta_bytes)
+    offset = index_offset + _ENTRY.size * len(entries)
+    index = bytearray()
+    for key_b, text_b in entries:
+        index += _ENTRY.pack(offset, len(key_b), offset + len(key_b), len(text_b))
+        offset += len(key_b) + len(text_b)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(index)
+        for key_b, text_b in entries:
+            f.write(key_b)
+            f.write(text_b)
+    os.replace(tmp_path, output_path)
+    return meta
+
+
+def fetch_all_texts(client, database_id):
+    """Pages through the whole library once. Returns {placement key: description text}."""
+    texts = {}
+    has_more = True
+    next_cursor = None
+
+    while has_more:
+        response = client.databases.query(database_id=database_id, start_cursor=next_cursor)
+        for page in response["results"]:
+            try:
+                props = page["properties"]
+                title = "".join(t["plain_text"] for t in props["Placement"]["title"])
+                if not title: continue
+                texts[title] = "".join(t["plain_text"] for t in props["Description"]["rich_text"])
+            except (KeyError, TypeError):
+                continue
+        has_more = response["has_more"]
+        next_cursor = response["next_cursor"]
+
+    return texts
+
+
+def get_key_universe():
+    """Every key a book can ask for: the library loops plus aspects."""
+    from populate_library import build_key_list, build_aspect_keys
+    return [key for _, keys in build_key_list() for key in keys] + build_aspect_keys()
+
+
+def build_from_notion(output_path=DEFAULT_BUNDLE_PATH):
+    """Scans the Notion library and compiles it into a bundle. Returns (meta, missing keys)."""
+    from notion_rate_limiter import get_notion_client
+
+    client = get_notion_client(os.getenv("NOTION_TOKEN"))
+    texts = fetch_all_texts(client, os.getenv("NOTION_DATABASE_ID"))
+    meta = write_bundle(texts, output_path)
+    missing = [key for key in get_key_universe() if key not in texts]
+    return meta, missing
+
+
+# ==========================================================
+# READ
+# ==========================================================
+class ContentBundle:
+    """Read-only, memory-mapped view of a bundle file. Safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)  # Which file on `path` this is
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BundleFormatError(f"Empty bundle file: {path}")
+
+        magic, version, count, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise BundleFormatError(f"Not a content bundle: {path}")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise BundleFormatError(f"Unsupported bundle format {version} (expected {FORMAT_VERSION})")
+
+        self.count = count
+        self.meta = json.loads(self._mm[_HEADER.size:_HEADER.size + meta_len].decode("utf-8"))
+        self.build_id = self.meta["build_id"]
+        self._index_offset = _HEADER.size + meta_len
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._mm, self._index_offset + i * _ENTRY.size)
+
+    def _key_at(self, i):
+        key_off, key_len, _, _ = self._entry(i)
+        return self._mm[key_off:key_off + key_len]
+
+    def _find(self, key):
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key_at(lo) == target:
+            return lo
+        return None
+
+    def get(self, key, default=None):
+        """Returns the text for `key`, or `default` if the bundle has no such key."""
+        i = self._find(key)
+        if i is None:
+            return default
+        _, _, text_off, text_len = self._entry(i)
+        return self._mm[text_off:text_off + text_len].decode("utf-8")
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __len__(self):
+        return self.count
+
+    def keys(self):
+        for i in range(self.count):
+            yield self._key_at(i).decode("utf-8")
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+_bundle = None
+_bundle_lock = threading.Lock()
+
+
+def get_bundle():
+    """
+    Returns the process-wide bundle, or None if there is none.
+
+    The path comes from CONTENT_BUNDLE_PATH, falling back to content/placements.bundle.
+    Set CONTENT_BUNDLE_PATH to an empty string to force live Notion lookups.
+    A bundle rebuilt since it was opened (`build` replaces the file) is reopened, so
+    a long-running process serves the new texts and build id. The old mapping is
+    left to close once no reader holds it.
+    """
+    global _bundle
+    path = os.getenv("CONTENT_BUNDLE_PATH", DEFAULT_BUNDLE_PATH)
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _bundle_lock:
+        if _bundle is None or _bundle.path != path or _bundle.stamp != stamp:
+            _bundle = ContentBundle(path)
+        return _bundle
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the compiled content bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Compile the Notion library into a bundle")
+    build.add_argument("--output", default=DEFAULT_BUNDLE_PATH)
+    info = sub.add_parser("info", help="Show a bundle's build id and counts")
+    info.add_argument("--path", default=DEFAULT_BUNDLE_PATH)
+    get = sub.add_parser("get", help="Print one placement text")
+    get.add_argument("key")
+    get.add_argument("--path", default=DEFAULT_BUNDLE_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print("📦 Compiling content bundle from Notion...")
+        meta, missing = build_from_notion(args.output)
+        print(f"✅ Wrote {meta['count']} texts to {args.output}")
+        print(f"   Build ID: {meta['build_id']}")
+        if missing:
+            print(f"⚠️  {len(missing)} book keys have no row in the library (e.g. '{missing[0]}')")
+        return 0
+
+    bundle = ContentBundle(args.path)
+    if args.command == "info":
+        for key, value in bundle.meta.items():
+            print(f"{key}: {value}")
+    elif args.command == "get":
+        text = bundle.get(args.key)
+        if text is None:
+            print(f"[Missing: {args.key}]")
+            return 1
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
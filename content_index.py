@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Content Index for AstroBookBot
+
+Answers "which books use this text?" so an edit in the content library only
+regenerates the books it touches. book_manifest.generate_book appends one line
+per build to the index next to its artifact store (content_index.jsonl in the
+store's root, e.g. a batch's output folder): the book's job, file, client,
+content build and the version (text hash) of every content key it used.
+
+Loading the index folds those lines, the latest build of each job winning and
+jobs the store has cleaned up since left out, into a reverse index
+{content key: {version: {job ids}}}, so both questions are dictionary lookups:
+
+- `books_using(keys)`: the books that contain any of the given keys
+- `stale_books(get_content)`: the books holding a version of some key that is
+  no longer the current text, with the keys that changed for each
+
+batch_generate.py --stale / --keys rebuilds exactly those books in place, passing
+each book the keys that changed so only the sections using them are redone.
+
+Usage:
+    python content_index.py stale [--root assets/jobs]
+    python content_index.py books "Mars in the 8th House" ["Sun in Aries" ...]
+    python content_index.py compact
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+from artifact_store import ARTIFACT_ROOT, atomic_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are kept apart
+    fcntl = None
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+INDEX_NAME = "content_index.jsonl"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def index_path(root):
+    """The index of the books in the artifact store at `root`."""
+    return os.path.join(root, INDEX_NAME)
+
+
+@contextmanager
+def _locked(path):
+    """Holds the index's lock (across processes where fcntl is available)."""
+    with _locks_guard:
+        lock = _locks.setdefault(path, threading.Lock())
+    with lock:
+        with open(path + ".lock", "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ==========================================================
+# WRITING
+# ==========================================================
+def record_book(job, filename, client, content_build, versions):
+    """
+    Appends a build of the book in artifact job `job` to its store's index.
+
+    Args:
+        job: ArtifactJob the book was built into
+        filename: The book file's name in the job folder
+        client: The client as book_ir.client_record holds it (JSON-able)
+        content_build: Content bundle build id, if any
+        versions: {content key: version (text hash)} of every text in the book
+    """
+    entry = {
+        "job": job.job_id,
+        "book": filename,
+        "built": datetime.now().isoformat(timespec="seconds"),
+        "client": client,
+        "content_build": content_build,
+        "keys": versions,
+    }
+    path = index_path(job.store.root)
+    with _locked(path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ==========================================================
+# READING
+# ==========================================================
+class ContentIndex:
+    """The reverse index of one artifact store's books, as loaded from its index file."""
+
+    def __init__(self, root=ARTIFACT_ROOT):
+        self.root = root
+        self.path = index_path(root)
+        self.books = {}     # job id: its latest index entry
+        self.postings = {}  # content key: {version: {job ids}}
+        self.lines = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self.lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut off by a crash
+                self.books[entry["job"]] = entry
+        # Jobs the artifact store has cleaned up since are no longer books to rebuild
+        self.books = {job_id: entry for job_id, entry in self.books.items()
+                      if os.path.isdir(os.path.join(self.root, job_id))}
+        for job_id, entry in self.books.items():
+            for key, version in entry["keys"].items():
+                self.postings.setdefault(key, {}).setdefault(version, set()).add(job_id)
+
+    def books_using(self, keys):
+        """{job id: the given keys its book contains} for every book containing any of `keys`."""
+        found = {}
+        for key in keys:
+            for jobs in self.postings.get(key, {}).values():
+                for job_id in jobs:
+                    found.setdefault(job_id, []).append(key)
+        return found
+
+    def stale_books(self, get_content):
+        """
+        {job id: keys whose text changed} for every book built with a text that is
+        no longer current. Each key in the index is looked up once.
+        """
+        from book_manifest import fingerprint  # Same version hash as the book manifests
+
+        found = {}
+        for key, versions in self.postings.items():
+            current = fingerprint(get_content(key))
+            for version, jobs in versions.items():
+                if version == current:
+                    continue
+                for job_id in jobs:
+                    found.setdefault(job_id, []).append(key)
+        return found
+
+    def compact(self):
+        """
+        Rewrites the index file with only the latest entry of each book still in
+        the store (the entries of cleaned-up jobs are dropped).
+
+        Returns:
+            int: Lines dropped
+        """
+        with _locked(self.path):
+            self.books, self.postings, self.lines = {}, {}, 0
+            self._load()
+            with atomic_path(self.path) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for entry in self.books.values():
+                        f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            dropped = self.lines - len(self.books)
+            self.lines = len(self.books)
+        return dropped
+
+
+def _print_books(index, found):
+    for job_id, keys in sorted(found.items()):
+        entry = index.books[job_id]
+        shown = ", ".join(keys[:3]) + (f" (+{len(keys) - 3} more)" if len(keys) > 3 else "")
+        print(f"   {job_id}  {entry['client'].get('name')}  {entry['book']}: {shown}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the books that use given content texts")
+    parser.add_argument("--root", default=ARTIFACT_ROOT, help="Artifact store (or batch output) folder")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stale", help="Books built with texts that have changed since (checked against the content bundle)")
+    books = sub.add_parser("books", help="Books that contain any of the given content keys")
+    books.add_argument("keys", nargs="+")
+    sub.add_parser("compact", help="Keep only the latest entry of each book, dropping cleaned-up jobs")
+    args = parser.parse_args()
+
+    index = ContentIndex(args.root)
+    if args.command == "compact":
+        print(f"🧹 Dropped {index.compact()} superseded entries ({len(index.books)} books)")
+        return 0
+    if args.command == "books":
+        found = index.books_using(args.keys)
+    else:
+        from content_bundle import get_bundle
+        from book_builder import bundle_content
+        if get_bundle() is None:
+            print("❌ No content bundle to compare with (python content_bundle.py build)")
+            return 1
+        found = index.stale_books(bundle_content)
+    print(f"📚 {len(found)} of {len(index.books)} books need rebuilding")
+    _print_books(index, found)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Lightweight Donut Chart Renderer for AstroBookBot
+
+Draws the book's donut charts without matplotlib. The layout reproduces
+`generate_pie_chart` (160mm x 100mm, radius 0.8, hole 0.6, percentage labels at
+40% of the ring depth, legend in the lower right) and is computed once in mm as
+a short list of drawing operations, which are then written out as:
+
+- SVG  wedges as Bezier arcs, text as glyph outlines (no fonts needed to view it)
+- PDF  the same paths in a single-page PDF
+- PNG  wedges rasterized with Pillow (supersampled for smooth edges), text via FreeType
+
+Only Pillow and fontTools are needed (both already come with matplotlib).
+
+Usage:
+    python donut_renderer.py '{"Fire": 8, "Earth": 17, "Air": 33, "Water": 42}' elements.svg
+"""
+
+import os
+import sys
+import json
+import math
+import zlib
+import importlib.util
+from functools import lru_cache
+
+from fontTools.ttLib import TTFont
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.boundsPen import BoundsPen
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+assets_dir = os.path.join(current_dir, "assets", "pie_charts")
+
+PIE_COLOR_MAP = {
+    "Fire": "#A9A9A9", "Earth": "#66c2a5", "Air": "#8da0cb", "Water": "#e5c494",
+    "Cardinal": "#A9A9A9", "Fixed": "#8da0cb", "Mutable": "#66c2a5",
+    "Yang": "#8da0cb", "Yin": "#A9A9A9",
+    "Choleric": "#A9A9A9", "Melancholic": "#66c2a5", "Sanguine": "#8da0cb", "Phlegmatic": "#e5c494",
+    "Superior": "#8da0cb", "Inferior": "#A9A9A9",
+    "Eastern": "#A9A9A9", "Western": "#8da0cb",
+    "Hot & Dry": "#A9A9A9", "Hot & Wet": "#8da0cb", "Cold & Dry": "#66c2a5", "Cold & Wet": "#e5c494"
+}
+DEFAULT_COLOR = "#95a5a6"
+PIE_SIZE_MM = (160, 100)
+PIE_DPI = 300
+
+# Geometry shared with generate_pie_chart (in matplotlib data units; the axes span -1.25..1.25)
+RADIUS = 0.8
+HOLE = 0.6
+LABEL_DEPTH = 0.4
+DATA_SPAN = 2.5
+
+PT = 25.4 / 72  # One point in mm
+
+# Tile size (px) strokes are rasterized in
+STROKE_TILE = 64
+
+
+def find_font(name):
+    """Locates a bundled TTF: the custom book font, else matplotlib's DejaVu files."""
+    if name == "regular":
+        path = os.path.join(current_dir, "INDESIGN FILES", "Document fonts", "ArsenicaTrial-Regular.ttf")
+        return path if os.path.exists(path) else None
+    spec = importlib.util.find_spec("matplotlib")
+    if spec is not None and spec.origin:
+        path = os.path.join(os.path.dirname(spec.origin), "mpl-data", "fonts", "ttf", f"{name}.ttf")
+        if os.path.exists(path):
+            return path
+    for folder in ("/usr/share/fonts/truetype/dejavu", "/usr/share/fonts/dejavu", "/Library/Fonts"):
+        path = os.path.join(folder, f"{name}.ttf")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+FONT_REGULAR = find_font("regular")
+FONT_DEFAULT = find_font("DejaVuSans")
+
+# ==========================================================
+# FONT METRICS AND GLYPH OUTLINES
+# ==========================================================
+class _OutlinePen(BasePen):
+    """Records a glyph outline as path ops, scaled and placed in mm (y down)."""
+
+    def __init__(self, glyph_set, x, baseline, scale):
+        super().__init__(glyph_set)
+        self.ops = []
+        self._x, self._y, self._s = x, baseline, scale
+
+    def _pt(self, p):
+        return (self._x + p[0] * self._s, self._y - p[1] * self._s)
+
+    def _moveTo(self, p):
+        self.ops.append(("M", self._pt(p)))
+
+    def _lineTo(self, p):
+        self.ops.append(("L", self._pt(p)))
+
+    def _curveToOne(self, p1, p2, p3):
+        self.ops.append(("C", self._pt(p1) + self._pt(p2) + self._pt(p3)))
+
+    def _closePath(self):
+        self.ops.append(("Z",))
+
+
+class _Font:
+    """Advance widths, line metrics and outlines for one TTF file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tt = TTFont(path, lazy=True)
+        self.glyphs = self.tt.getGlyphSet()
+        self.cmap = self.tt.getBestCmap()
+        self.upm = self.tt["head"].unitsPerEm
+        # Like matplotlib, a text line is as tall as "lp": the top of 'l' to the bottom of 'p'
+        self.ascent = self._bounds("l")[3]
+        self.descent = -self._bounds("p")[1]
+
+    def _bounds(self, ch):
+        pen = BoundsPen(self.glyphs)
+        self.glyphs[self.cmap[ord(ch)]].draw(pen)
+        return pen.bounds or (0, 0, 0, 0)
+
+    def _glyph_name(self, ch):
+        return self.cmap.get(ord(ch), ".notdef")
+
+    def width(self, text, size):
+        """Advance width of `text` in mm at `size` mm."""
+        units = sum(self.glyphs[self._glyph_name(ch)].width for ch in text)
+        return units * size / self.upm
+
+    def line_metrics(self, size):
+        """(ascent, descent) in mm at `size` mm."""
+        return self.ascent * size / self.upm, self.descent * size / self.upm
+
+    def outline(self, text, x, baseline, size):
+        """Path ops for `text` with its baseline starting at (x, baseline)."""
+        scale = size / self.upm
+        ops = []
+        for ch in text:
+            glyph = self.glyphs[self._glyph_name(ch)]
+            pen = _OutlinePen(self.glyphs, x, baseline, scale)
+            glyph.draw(pen)
+            ops += pen.ops
+            x += glyph.width * scale
+        return ops
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    return _Font(path)
+
+
+# ==========================================================
+# LAYOUT
+# ==========================================================
+def arc_path(cx, cy, r, a0, a1):
+    """Bezier segments for a circular arc from a0 to a1 degrees (counter-clockwise positive, y down)."""
+    n = max(1, int(math.ceil(abs(a1 - a0) / 90.0 - 1e-9)))
+    step = math.radians(a1 - a0) / n
+    k = 4.0 / 3.0 * math.tan(step / 4.0)
+    ops = []
+    t = math.radians(a0)
+    for _ in range(n):
+        t2 = t + step
+        c0, s0, c1, s1 = math.cos(t), math.sin(t), math.cos(t2), math.sin(t2)
+        ops.append(("C", (
+            cx + r * (c0 - k * s0), cy - r * (s0 + k * c0),
+            cx + r * (c1 + k * s1), cy - r * (s1 - k * c1),
+            cx + r * c1, cy - r * s1,
+        )))
+        t = t2
+    return ops
+
+
+def centered_text(text, x, y, font_path, size, color):
+    """A text op centred on (x, y), like Pillow's "mm" anchor."""
+    font = load_font(font_path)
+    ascent, descent = font.line_metrics(size)
+    return ("text", text, x - font.width(text, size) / 2, y + (ascent - descent) / 2, font_path, size, color)
+
+
+def _wedge(cx, cy, r_out, r_in, a0, a1):
+    """Closed ring-segment path between two angles."""
+    rad0, rad1 = math.radians(a0), math.radians(a1)
+    ops = [("M", (cx + r_out * math.cos(rad0), cy - r_out * math.sin(rad0)))]
+    ops += arc_path(cx, cy, r_out, a0, a1)
+    ops.append(("L", (cx + r_in * math.cos(rad1), cy - r_in * math.sin(rad1))))
+    ops += arc_path(cx, cy, r_in, a1, a0)
+    ops.append(("Z",))
+    return ops
+
+
+def donut_layout(stats_dict, size_mm=PIE_SIZE_MM):
+    """
+    Lays out one donut chart.
+
+    Returns:
+        dict: {"size": (w, h) in mm, "ops": [...]} where each op is a filled
+              ("path", color, path_ops), an outlined ("stroke", color, width_mm, path_ops)
+              or ("text", text, x, baseline, font_path, size_mm, color),
+              or None if every value is zero
+    """
+    labels = [k for k, v in stats_dict.items() if v > 0]
+    sizes = [v for k, v in stats_dict.items() if v > 0]
+    if not sizes: return None
+    colors = [PIE_COLOR_MAP.get(l, DEFAULT_COLOR) for l in labels]
+
+    width, height = size_mm
+    # The square axes box (aspect "equal") is centered on the page
+    box = min(width, height)
+    box_x = (width - box) / 2
+    unit = box / DATA_SPAN
+    cx, cy = width / 2, height / 2
+    r_out = RADIUS * unit
+    # matplotlib's wedge "width" is absolute (1 - HOLE data units), while the labels are
+    # placed against RADIUS * HOLE, exactly as generate_pie_chart does
+    r_in = (RADIUS - (1 - HOLE)) * unit
+    r_label = (RADIUS * HOLE + (RADIUS - RADIUS * HOLE) * LABEL_DEPTH) * unit
+
+    ops = []
+    total = float(sum(sizes))
+    label_font = load_font(FONT_DEFAULT)
+    label_size = 8 * PT
+    label_ascent, label_descent = label_font.line_metrics(label_size)
+    angle = 90.0
+    for value, color in zip(sizes, colors):
+        span = 360.0 * value / total
+        ops.append(("path", color, _wedge(cx, cy, r_out, r_in, angle, angle + span)))
+        mid = math.radians(angle + span / 2)
+        text = f"{int(round(value / total * 100))}%"
+        x = cx + r_label * math.cos(mid) - label_font.width(text, label_size) / 2
+        baseline = cy - r_label * math.sin(mid) + (label_ascent - label_descent) / 2
+        ops.append(("text", text, x, baseline, FONT_DEFAULT, label_size, "#000000"))
+        angle += span
+
+    # Legend: matplotlib's lower-right layout, all spacing in multiples of the font size
+    legend_path = FONT_REGULAR or FONT_DEFAULT
+    legend_font = load_font(legend_path)
+    fs = (8 if FONT_REGULAR else 10) * PT
+    ascent, descent = legend_font.line_metrics(fs)
+    row_h = ascent + descent
+    text_w = max(legend_font.width(l, fs) for l in labels)
+    content_w = 1.0 * fs + 0.5 * fs + text_w
+    content_h = len(labels) * row_h + (len(labels) - 1) * 0.3 * fs
+    right = box_x + 0.99 * box - 0.5 * fs - 0.4 * fs
+    bottom = height - 0.01 * box - 0.5 * fs - 0.4 * fs
+    left, top = right - content_w, bottom - content_h
+    for i, (label, color) in enumerate(zip(labels, colors)):
+        baseline = top + i * (row_h + 0.3 * fs) + ascent
+        hx, hy = left, baseline - 0.7 * fs
+        ops.append(("path", color, [
+            ("M", (hx, hy)), ("L", (hx + fs, hy)), ("L", (hx + fs, baseline)), ("L", (hx, baseline)), ("Z",),
+        ]))
+        ops.append(("text", label, left + 1.5 * fs, baseline, legend_path, fs, "#000000"))
+
+    return {"size": (width, height), "ops": ops}
+
+
+# ==========================================================
+# WRITERS
+# ==========================================================
+def _num(v):
+    return f"{v:.3f}".rstrip("0").rstrip(".")
+
+
+def _rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _vector_paths(layout):
+    """(color, stroke width or None for a fill, path_ops) for every op, with text converted to glyph outlines."""
+    for op in layout["ops"]:
+        if op[0] == "path":
+            yield op[1], None, op[2]
+        elif op[0] == "stroke":
+            yield op[1], op[2], op[3]
+        else:
+            _, text, x, baseline, font_path, size, color = op
+            yield color, None, load_font(font_path).outline(text, x, baseline, size)
+
+
+def to_svg(layout):
+    """Returns the layout as an SVG document string."""
+    width, height = layout["size"]
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(width)}mm" height="{_num(height)}mm" '
+        f'viewBox="0 0 {_num(width)} {_num(height)}">',
+        f'<rect width="{_num(width)}" height="{_num(height)}" fill="#ffffff"/>',
+    ]
+    for color, stroke, path in _vector_paths(layout):
+        if not path: continue
+        d = " ".join(op[0] + " ".join(_num(v) for v in (op[1] if len(op) > 1 else ())) for op in path)
+        if stroke is None:
+            parts.append(f'<path fill="{color}" d="{d}"/>')
+        else:
+            parts.append(f'<path fill="none" stroke="{color}" stroke-width="{_num(stroke)}" d="{d}"/>')
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
+
+
+def pdf_content(layout):
+    """PDF content-stream operators for the layout, drawn in mm with the origin at the top left."""
+    width, height = layout["size"]
+    scale = 72 / 25.4
+    lines = [f"{_num(scale)} 0 0 {_num(-scale)} 0 {_num(height * scale)} cm", "1 1 1 rg", f"0 0 {_num(width)} {_num(height)} re f"]
+    for color, stroke, path in _vector_paths(layout):
+        if not path: continue
+        if stroke is None:
+            lines.append(" ".join(_num(c / 255) for c in _rgb(color)) + " rg")
+        else:
+            lines.append(" ".join(_num(c / 255) for c in _rgb(color)) + f" RG {_num(stroke)} w")
+        for op in path:
+            if op[0] == "M":
+                lines.append(f"{_num(op[1][0])} {_num(op[1][1])} m")
+            elif op[0] == "L":
+                lines.append(f"{_num(op[1][0])} {_num(op[1][1])} l")
+            elif op[0] == "C":
+                lines.append(" ".join(_num(v) for v in op[1]) + " c")
+            else:
+                lines.append("h")
+        lines.append("f" if stroke is None else "S")
+    return "\n".join(lines).encode("ascii")
+
+
+def to_pdf(layout):
+    """Returns the layout as a single-page PDF (bytes)."""
+    return to_pdf_pages([layout])
+
+
+def to_pdf_pages(layouts):
+    """Returns the layouts as one PDF (bytes), one page each."""
+    scale = 72 / 25.4
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(layouts)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(layouts)} >>".encode("ascii"),
+    ]
+    for i, layout in enumerate(layouts):
+        width, height = layout["size"]
+        stream = zlib.compress(pdf_content(layout), 9)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(width * scale)} {_num(height * scale)}] /Contents {4 + 2 * i} 0 R /Resources << >> >>".encode("ascii"))
+        objects.append(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode("ascii") + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(out)
+
+
+def _flatten(path, scale, steps=12, closed=True, origin=(0, 0)):
+    """Turns path ops into polygons (or open polylines, for strokes) of pixel points for rasterizing."""
+    polygons, current, last = [], [], (0, 0)
+    keep = 3 if closed else 2
+    ox, oy = origin
+    for op in path:
+        if op[0] == "M":
+            if len(current) >= keep: polygons.append(current)
+            last = op[1]
+            current = [(last[0] * scale + ox, last[1] * scale + oy)]
+        elif op[0] == "L":
+            last = op[1]
+            current.append((last[0] * scale + ox, last[1] * scale + oy))
+        elif op[0] == "C":
+            x0, y0 = last
+            x1, y1, x2, y2, x3, y3 = op[1]
+            for i in range(1, steps + 1):
+                t = i / steps
+                u = 1 - t
+                current.append((
+                    (u * u * u * x0 + 3 * u * u * t * x1 + 3 * u * t * t * x2 + t * t * t * x3) * scale + ox,
+                    (u * u * u * y0 + 3 * u * u * t * y1 + 3 * u * t * t * y2 + t * t * t * y3) * scale + oy,
+                ))
+            last = (x3, y3)
+        elif op[0] == "Z" and not closed and current:
+            current.append(current[0])
+    if len(current) >= keep: polygons.append(current)
+    return polygons
+
+
+@lru_cache(maxsize=32)
+def _pil_font(path, size_px):
+    from PIL import ImageFont
+    return ImageFont.truetype(path, size_px)
+
+
+def _stroke(image, color, width, polylines, supersample, box):
+    """
+    Strokes `polylines` (pixel points) `width` pixels wide, clipped to `box`. A long thin line's bounding box
+    is mostly empty, so masks are only built for the STROKE_TILE-sized tiles the line
+    passes through, each drawing just the segments that touch it. Tiles don't overlap,
+    so the result is the same as one big mask. The tile grid starts at the box's corner,
+    so a layout comes out the same wherever it sits on the canvas.
+    """
+    from PIL import Image, ImageDraw
+
+    pad = width / 2 + 1
+    left, top = box[0], box[1]
+    tiles = {}
+    for line in polylines:
+        for k, ((xa, ya), (xb, yb)) in enumerate(zip(line, line[1:])):
+            # Round joins: the start of every segment but the first gets a dot
+            segment = ((xa, ya), (xb, yb), k > 0)
+            steps = int(math.hypot(xb - xa, yb - ya) // (STROKE_TILE / 2)) + 1
+            for i in range(steps):
+                sx0, sy0 = xa + (xb - xa) * i / steps, ya + (yb - ya) * i / steps
+                sx1, sy1 = xa + (xb - xa) * (i + 1) / steps, ya + (yb - ya) * (i + 1) / steps
+                for tx in range(int((min(sx0, sx1) - pad - left) // STROKE_TILE), int((max(sx0, sx1) + pad - left) // STROKE_TILE) + 1):
+                    for ty in range(int((min(sy0, sy1) - pad - top) // STROKE_TILE), int((max(sy0, sy1) + pad - top) // STROKE_TILE) + 1):
+                        segments = tiles.setdefault((tx, ty), [])
+                        if not segments or segments[-1] is not segment:
+                            segments.append(segment)
+
+    line_width = max(1, round(width * supersample))
+    radius = line_width / 2
+    for (tx, ty), segments in tiles.items():
+        x0, y0 = max(left, left + tx * STROKE_TILE), max(top, top + ty * STROKE_TILE)
+        x1, y1 = min(box[2], left + (tx + 1) * STROKE_TILE), min(box[3], top + (ty + 1) * STROKE_TILE)
+        if x1 <= x0 or y1 <= y0: continue
+        mask = Image.new("L", ((x1 - x0) * supersample, (y1 - y0) * supersample), 0)
+        mask_draw = ImageDraw.Draw(mask)
+        for (xa, ya), (xb, yb), join in segments:
+            pa = ((xa - x0) * supersample, (ya - y0) * supersample)
+            pb = ((xb - x0) * supersample, (yb - y0) * supersample)
+            mask_draw.line([pa, pb], fill=255, width=line_width)
+            if join and line_width > 2:
+                mask_draw.ellipse([pa[0] - radius, pa[1] - radius, pa[0] + radius, pa[1] + radius], fill=255)
+        image.paste(color, (x0, y0, x1, y1), mask.reduce(supersample))
+
+
+def _pixel_size(layout, px):
+    width, height = layout["size"]
+    return int(width * px), int(height * px)
+
+
+def _draw(image, layout, px, supersample, origin=(0, 0)):
+    """Draws the layout onto `image` with its top left corner at the pixel `origin`."""
+    from PIL import Image, ImageDraw
+
+    ox, oy = origin
+    w, h = _pixel_size(layout, px)
+    box = (ox, oy, min(image.width, ox + w), min(image.height, oy + h))
+    draw = ImageDraw.Draw(image)
+
+    # Each shape is drawn as a supersampled coverage mask over just its own bounding box,
+    # box-filtered down and used to paste its colour, which anti-aliases the edges cheaply
+    for op in layout["ops"]:
+        if op[0] == "stroke":
+            _stroke(image, op[1], op[2] * px, _flatten(op[3], px, closed=False, origin=origin), supersample, box)
+            continue
+        if op[0] != "path": continue
+        polygons = _flatten(op[2], px, origin=origin)
+        if not polygons: continue
+        xs = [x for polygon in polygons for x, _ in polygon]
+        ys = [y for polygon in polygons for _, y in polygon]
+        x0, y0 = max(box[0], int(min(xs))), max(box[1], int(min(ys)))
+        x1, y1 = min(box[2], int(math.ceil(max(xs)))), min(box[3], int(math.ceil(max(ys))))
+        if x1 <= x0 or y1 <= y0: continue
+        mask = Image.new("L", ((x1 - x0) * supersample, (y1 - y0) * supersample), 0)
+        mask_draw = ImageDraw.Draw(mask)
+        for polygon in polygons:
+            mask_draw.polygon([((x - x0) * supersample, (y - y0) * supersample) for x, y in polygon], fill=255)
+        image.paste(op[1], (x0, y0, x1, y1), mask.reduce(supersample))
+
+    for op in layout["ops"]:
+        if op[0] != "text": continue
+        _, text, x, baseline, font_path, size, color = op
+        draw.text((x * px + ox, baseline * px + oy), text, fill=color, font=_pil_font(font_path, size * px), anchor="ls")
+
+
+def to_image(layout, dpi=PIE_DPI, supersample=4):
+    """Rasterizes the layout to a Pillow RGB image."""
+    from PIL import Image
+
+    px = dpi / 25.4
+    image = Image.new("RGB", _pixel_size(layout, px), "white")
+    _draw(image, layout, px, supersample)
+    return image
+
+
+def to_sheet(layouts, dpi=PIE_DPI, supersample=4):
+    """
+    Rasterizes several layouts in one pass onto a single canvas, stacked top to bottom
+    at whole-pixel offsets, so each crop is exactly what `to_image` would draw on its own.
+
+    Returns:
+        tuple: (Pillow RGB image, [(left, top, right, bottom) crop box per layout])
+    """
+    from PIL import Image
+
+    px = dpi / 25.4
+    sizes = [_pixel_size(layout, px) for layout in layouts]
+    sheet = Image.new("RGB", (max(w for w, _ in sizes), sum(h for _, h in sizes)), "white")
+    boxes, top = [], 0
+    for layout, (w, h) in zip(layouts, sizes):
+        _draw(sheet, layout, px, supersample, origin=(0, top))
+        boxes.append((0, top, w, top + h))
+        top += h
+    return sheet, boxes
+
+
+# ==========================================================
+# ENTRY POINTS
+# ==========================================================
+def render_donut(stats_dict, path, dpi=PIE_DPI):
+    """
+    Renders a donut chart to `path`; the format follows the extension (.svg, .pdf or .png).
+
+    Returns:
+        str: `path`, or None if every value is zero
+    """
+    layout = donut_layout(stats_dict)
+    if layout is None: return None
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".svg":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(to_svg(layout))
+    elif ext == ".pdf":
+        with open(path, "wb") as f:
+            f.write(to_pdf(layout))
+    else:
+        to_image(layout, dpi).save(path, dpi=(dpi, dpi))
+    return path
+
+
+def generate_donut_chart(stats_dict, filename, title="", output_dir=None, dpi=PIE_DPI):
+    """Drop-in for `generate_pie_chart`: same arguments and return value, any of the three formats."""
+    save_path = os.path.join(output_dir or assets_dir, filename)
+    if render_donut(stats_dict, save_path, dpi) is None:
+        return None
+    return save_path if output_dir else f"assets/pie_charts/{filename}"
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python donut_renderer.py '<stats json>' <output .svg|.pdf|.png>")
+        return 1
+    stats = json.loads(sys.argv[1])
+    if render_donut(stats, sys.argv[2]) is None:
+        print("❌ Nothing to draw (all values are zero)")
+        return 1
+    print(f"✅ Saved {sys.argv[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
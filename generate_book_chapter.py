@@ -1,6 +1,8 @@
 # --- MODULE 2: THE LIBRARIAN + MODULE 1: THE ASTROLOGER + STATS ---
 
-from notion_client import Client
+from notion_rate_limiter import get_stats as get_notion_stats
+from book_builder import get_content as get_notion_content
+from content_bundle import get_bundle
 import swisseph as se
 import pytz
 import os 
@@ -19,9 +21,6 @@ se.set_ephe_path(ephe_path)
 # ==========================================================
 # 2. CONFIGURATION
 # ==========================================================
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-
 # Weighting System
 PLANET_POINTS = {
     "Sun": 4, "Moon": 4, "Ascendant": 4, "Midheaven": 1,
@@ -386,21 +385,6 @@ def get_summary_table_by_house(chart_data):
         table += f"| {cusp_sign} | {planets_str} | {house_str} |\n"
     return table
 
-def get_notion_content(placement_name):
-    if len(NOTION_TOKEN) < 10: return "[Error: Check Token]"
-    notion = Client(auth=NOTION_TOKEN)
-    try:
-        results = notion.databases.query(
-            database_id=DATABASE_ID, 
-            filter={ "property": "Placement", "title": { "equals": placement_name } }
-        )
-        if not results["results"]: return f"\n[No content found for: {placement_name}]"
-        page = results["results"][0]
-        if not page["properties"]["Description"]["rich_text"]: return f"\n[Text empty]"
-        return "".join([t["plain_text"] for t in page["properties"]["Description"]["rich_text"]])
-    except Exception as e:
-        return f"\n[Notion API Error: {e}]"
-
 # ==========================================================
 # MAIN FLOW
 # ==========================================================
@@ -447,6 +431,10 @@ if __name__ == "__main__":
     sep = "-" * 30 + "\n"
     
     chapter_content = f"Chart for: {client_data['name']}\n\n"
+    content_bundle = get_bundle()
+    if content_bundle is not None:
+        print(f"📦 Using content bundle {content_bundle.build_id}")
+        chapter_content += f"<<CONTENT BUILD: {content_bundle.build_id}>>\n\n"
     
     # --- SECTION: CHART DATA ---
     chapter_content += sep + "# Chart Data\n" + sep + "\n"
@@ -656,4 +644,6 @@ if __name__ == "__main__":
     
     with open(filename, "w") as f:
         f.write(chapter_content)
+
+    print(f"📊 Notion traffic: {get_notion_stats()}")
     print(f"\n[Saved to {filename}]")
\ No newline at end of file
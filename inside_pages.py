@@ -0,0 +1,774 @@
+#!/usr/bin/env python3
+"""
+Inside Pages PDF Renderer for AstroBookBot
+
+Typesets a book's IR (book_ir.py), or a book file in book_builder's text format,
+into the PDF of the book's inside pages in pure Python, so it runs headless on
+Linux without InDesign:
+
+- headings, paragraphs, **bold** runs and bullet lists are set in the fonts from
+  "INDESIGN FILES/Document fonts" (DejaVu where a font is missing), body text
+  justified, every chapter opening on a new page, a folio on every page after the title
+- fonts are embedded as subsets holding only the glyphs the book uses, with a
+  ToUnicode map so the text can still be searched and copied
+- chart images are drawn as vectors when their chart job is known (the pies with
+  donut_renderer, the summary table with table_renderer); any other image file is
+  embedded as it is
+- pages are written to "<pdf>.part" as they are filled; only the fonts, the page
+  tree and the cross-reference table are written at the end, so the PDF is never
+  held in memory whole (nor the book, when it is typeset from its text file)
+
+Configuration:
+    INSIDE_PAGES_BODY_FONT     Body font file in "INDESIGN FILES/Document fonts" (default DejaVu Serif)
+    INSIDE_PAGES_BOLD_FONT     Bold font file (default DejaVu Serif Bold)
+    INSIDE_PAGES_HEADING_FONT  Heading font file (default ArsenicaTrial-Regular.ttf)
+
+Usage:
+    python inside_pages.py <job id>
+    python inside_pages.py --book book.txt -o book_inside.pdf
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import zlib
+import hashlib
+import argparse
+
+from PIL import Image
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+from artifact_store import get_artifact_store
+from astro_engine import chart_statistics
+from book_builder import chart_jobs as book_chart_jobs
+from book_ir import Book, runs
+from book_manifest import load_book_ir, load_manifest
+from book_stream import PART_SUFFIX
+from chart_rendering import chart_paths, local_path
+from chart_wheel import wheel_layout
+from donut_renderer import find_font, donut_layout, pdf_content
+from table_renderer import build_table_rows, table_layout
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DOCUMENT_FONTS_DIR = os.path.join(current_dir, "INDESIGN FILES", "Document fonts")
+
+# Font file in DOCUMENT_FONTS_DIR for each role, and the bundled font used when it is not there
+FONT_ROLES = {
+    "body": (os.getenv("INSIDE_PAGES_BODY_FONT", ""), "DejaVuSerif"),
+    "bold": (os.getenv("INSIDE_PAGES_BOLD_FONT", ""), "DejaVuSerif-Bold"),
+    "heading": (os.getenv("INSIDE_PAGES_HEADING_FONT", "ArsenicaTrial-Regular.ttf"), "DejaVuSerif"),
+}
+# For characters the role's font has no glyph for (e.g. planet symbols)
+FALLBACK_FONT = "DejaVuSans"
+
+# Page geometry in points: 6 x 9 in trim
+PAGE_WIDTH, PAGE_HEIGHT = 432.0, 648.0
+MARGIN_TOP, MARGIN_BOTTOM, MARGIN_SIDE = 54.0, 63.0, 54.0
+FOLIO_BASELINE = 36.0     # From the bottom edge
+CHAPTER_SINK = 108.0      # Extra space above a chapter title
+FIGURE_SPACE = 8.0        # Below a figure
+MIN_FIGURE_SCALE = 0.7    # A figure may shrink this far to fit the rest of a page
+BLANK_LINE_SPACE = 6.0    # For an empty line in the book text
+BULLET_INDENT = 12.0
+
+# font role, size, leading, space before, space after, alignment
+STYLES = {
+    "title":   {"font": "heading", "size": 26, "leading": 34, "before": 0, "after": 12, "align": "center"},
+    "label":   {"font": "body", "size": 10, "leading": 16, "before": 0, "after": 4, "align": "center"},
+    "h1":      {"font": "heading", "size": 22, "leading": 28, "before": 0, "after": 18, "align": "center"},
+    "h2":      {"font": "bold", "size": 13, "leading": 17, "before": 12, "after": 5, "align": "left"},
+    "h3":      {"font": "bold", "size": 11, "leading": 15, "before": 8, "after": 3, "align": "left"},
+    "body":    {"font": "body", "size": 10.5, "leading": 14.5, "before": 0, "after": 3, "align": "justify"},
+    "bullet":  {"font": "body", "size": 10.5, "leading": 14.5, "before": 0, "after": 2, "align": "left"},
+    "folio":   {"font": "body", "size": 9, "leading": 11, "before": 0, "after": 0, "align": "center"},
+}
+HEADINGS = ("h1", "h2", "h3")
+
+MM = 72 / 25.4  # Points per mm
+
+
+def role_font_path(role):
+    """The font file for a role: its Document fonts file if present, else the bundled fallback."""
+    name, fallback = FONT_ROLES[role]
+    if name:
+        path = name if os.path.isabs(name) else os.path.join(DOCUMENT_FONTS_DIR, name)
+        if os.path.exists(path):
+            return path
+    return find_font(fallback)
+
+
+def _num(v):
+    return f"{v:.3f}".rstrip("0").rstrip(".")
+
+
+# ==========================================================
+# BOOK IR / BOOK TEXT -> BLOCKS
+# ==========================================================
+IMAGE_LINE = re.compile(r"^<<IMG: (.*)>>$")
+MARKER_LINE = re.compile(r"^<<[A-Z ]+: .*>>$")
+CHAPTER_LINE = re.compile(r"^# (Chapter \d+): (.*)$")
+
+
+def _inline(text):
+    """Runs of (role, text) for a line, "bold" inside **...**, else None."""
+    return [("bold" if i % 2 else None, part) for i, part in enumerate(text.split("**")) if part]
+
+
+def parse_book(lines):
+    """
+    Turns the lines of a book (book_builder's markup) into layout blocks.
+
+    Yields:
+        tuple: (kind, value) with kind one of "title", "chapter" ((label, title)),
+               "h1", "h2", "h3", "body", "bullet" (runs from `_inline`),
+               "figure" (image path), "rule" or "space"
+    """
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            yield ("space", None)
+        elif set(line) == {"-"}:
+            continue  # Chapter separators; chapters open on a new page instead
+        elif set(line) == {"="}:
+            yield ("rule", None)
+        elif IMAGE_LINE.match(line):
+            yield ("figure", IMAGE_LINE.match(line).group(1))
+        elif MARKER_LINE.match(line):
+            continue  # Build markers, not book text
+        elif line.startswith("Chart for: "):
+            yield ("title", _inline(line))
+        elif CHAPTER_LINE.match(line):
+            yield ("chapter", CHAPTER_LINE.match(line).groups())
+        elif line.startswith("### "):
+            yield ("h3", _inline(line[4:]))
+        elif line.startswith("## "):
+            yield ("h2", _inline(line[3:]))
+        elif line.startswith("# "):
+            yield ("h1", _inline(line[2:]))
+        elif line.startswith("* "):
+            yield ("bullet", _inline(line[2:]))
+        else:
+            yield ("body", _inline(line))
+
+
+def layout_blocks(book):
+    """
+    The layout blocks of `parse_book`, straight from a book's IR (a book_ir.Book).
+    Content texts come from the content library with their own line markup, so
+    they are split into lines like the book file.
+    """
+    for block in book.blocks():
+        tag = block.TAG
+        if tag == "title":
+            yield ("title", _inline(f"Chart for: {block.name}"))
+        elif tag == "chapter":
+            yield ("chapter", (f"Chapter {block.number}", block.title))
+        elif tag == "h":
+            yield (f"h{block.level}", _inline(block.text.rstrip()))
+        elif tag == "p":
+            yield ("body", runs(block.parts))
+        elif tag == "li":
+            yield ("bullet", runs(block.parts))
+        elif tag == "rule":
+            yield ("rule", None)
+        elif tag == "img":
+            yield ("figure", block.path)
+        elif tag in ("content", "note"):
+            yield from parse_book(block.text.split("\n"))
+        elif tag == "space":
+            yield ("space", None)
+        # Markers are build information, not book text
+
+
+# ==========================================================
+# PDF OBJECTS
+# ==========================================================
+class _PdfFile:
+    """Writes numbered PDF objects straight to a file, remembering only their offsets."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.count = 0
+        f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self):
+        self.count += 1
+        return self.count
+
+    def write(self, obj_id, body):
+        if isinstance(body, str):
+            body = body.encode("latin-1")
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+
+    def write_stream(self, obj_id, data, entries=""):
+        data = zlib.compress(data, 6)
+        self.write(obj_id, f"<< /Length {len(data)} /Filter /FlateDecode{entries} >>\nstream\n".encode("latin-1") + data + b"\nendstream")
+
+    def close(self, root_id):
+        xref = self.f.tell()
+        out = [f"xref\n0 {self.count + 1}\n0000000000 65535 f \n"]
+        out += [f"{self.offsets[i]:010d} 00000 n \n" for i in range(1, self.count + 1)]
+        out.append(f"trailer\n<< /Size {self.count + 1} /Root {root_id} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self.f.write("".join(out).encode("ascii"))
+
+
+class _EmbeddedFont:
+    """
+    One TrueType/OpenType font in the PDF: glyph ids and widths for layout, and the
+    glyphs used, which are embedded as a subset (CID-keyed, Identity-H) at the end.
+    """
+
+    def __init__(self, path, resource, pdf):
+        self.path = path
+        self.resource = resource
+        self.ids = [pdf.reserve() for _ in range(5)]  # Type0, CIDFont, descriptor, font file, ToUnicode
+        self.tt = TTFont(path, lazy=True)
+        self.cmap = self.tt.getBestCmap()
+        self.scale = 1000.0 / self.tt["head"].unitsPerEm
+        self.hmtx = self.tt["hmtx"]
+        self._glyphs = {}
+        self.used = {}  # gid -> character, for the subset and the ToUnicode map
+
+    def has(self, ch):
+        return ord(ch) in self.cmap
+
+    def glyph(self, ch):
+        """(glyph id, advance in 1/1000 em) for a character."""
+        if ch not in self._glyphs:
+            name = self.cmap.get(ord(ch), ".notdef")
+            self._glyphs[ch] = (self.tt.getGlyphID(name), round(self.hmtx[name][0] * self.scale))
+        return self._glyphs[ch]
+
+    def width(self, text, size):
+        """Advance width of `text` in points at `size` points (as the PDF viewer will place it)."""
+        return sum(self.glyph(ch)[1] for ch in text) * size / 1000.0
+
+    def encode(self, text):
+        """`text` as a hex string of 2-byte glyph ids."""
+        out = []
+        for ch in text:
+            gid = self.glyph(ch)[0]
+            self.used.setdefault(gid, ch)
+            out.append(f"{gid:04X}")
+        return "".join(out)
+
+    def _subset(self, gids):
+        options = subset.Options()
+        options.retain_gids = True  # Glyph ids stay valid as CIDs
+        options.notdef_outline = True
+        options.layout_features = []
+        options.hinting = False
+        options.drop_tables += ["FFTM"]
+        font = TTFont(self.path)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(gids=gids)
+        subsetter.subset(font)
+        data = io.BytesIO()
+        font.save(data)
+        return data.getvalue()
+
+    def write(self, pdf):
+        type0, cid, descriptor, file_id, to_unicode = self.ids
+        gids = sorted(set(self.used) | {0})
+        cff = "CFF " in self.tt
+        data = self._subset(gids)
+        tag = "".join(chr(65 + b % 26) for b in hashlib.sha1(repr(gids).encode("ascii")).digest()[:6])
+        ps_name = re.sub(r"[^A-Za-z0-9-]", "", self.tt["name"].getDebugName(6) or os.path.splitext(os.path.basename(self.path))[0])
+        name = f"{tag}+{ps_name}"
+
+        head, hhea = self.tt["head"], self.tt["hhea"]
+        os2 = self.tt["OS/2"] if "OS/2" in self.tt else None
+        bbox = " ".join(str(round(v * self.scale)) for v in (head.xMin, head.yMin, head.xMax, head.yMax))
+        cap_height = getattr(os2, "sCapHeight", 0) or hhea.ascent
+        widths = " ".join(f"{gid} [{round(self.hmtx[self.tt.getGlyphName(gid)][0] * self.scale)}]" for gid in gids)
+
+        pdf.write(type0, f"<< /Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H "
+                         f"/DescendantFonts [{cid} 0 R] /ToUnicode {to_unicode} 0 R >>")
+        if cff:
+            pdf.write(cid, f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{name} "
+                           f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                           f"/FontDescriptor {descriptor} 0 R /W [{widths}] >>")
+        else:
+            pdf.write(cid, f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} "
+                           f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                           f"/FontDescriptor {descriptor} 0 R /W [{widths}] /CIDToGIDMap /Identity >>")
+        file_key = "/FontFile3" if cff else "/FontFile2"
+        pdf.write(descriptor, f"<< /Type /FontDescriptor /FontName /{name} /Flags 32 /FontBBox [{bbox}] "
+                              f"/ItalicAngle 0 /Ascent {round(hhea.ascent * self.scale)} /Descent {round(hhea.descent * self.scale)} "
+                              f"/CapHeight {round(cap_height * self.scale)} /StemV 80 {file_key} {file_id} 0 R >>")
+        pdf.write_stream(file_id, data, " /Subtype /OpenType" if cff else f" /Length1 {len(data)}")
+
+        chars = [(gid, self.used[gid]) for gid in gids if gid in self.used]
+        cmap = ["/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+                "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+                "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+                "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange"]
+        for i in range(0, len(chars), 100):
+            block = chars[i:i + 100]
+            cmap.append(f"{len(block)} beginbfchar")
+            cmap += [f"<{gid:04X}> <{ch.encode('utf-16-be').hex().upper()}>" for gid, ch in block]
+            cmap.append("endbfchar")
+        cmap += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+        pdf.write_stream(to_unicode, "\n".join(cmap).encode("ascii"))
+
+
+class _Fonts:
+    """The fonts of one PDF, loaded on first use."""
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.by_path = {}
+        self.fallback_path = find_font(FALLBACK_FONT)
+
+    def _get(self, path):
+        if path not in self.by_path:
+            self.by_path[path] = _EmbeddedFont(path, f"F{len(self.by_path) + 1}", self.pdf)
+        return self.by_path[path]
+
+    def role(self, role):
+        return self._get(role_font_path(role))
+
+    def segments(self, font, text):
+        """Splits `text` into (font, text) pieces, using the fallback font for characters `font` lacks."""
+        pieces = []
+        for ch in text:
+            use = font if font.has(ch) or self.fallback_path is None else self._get(self.fallback_path)
+            if pieces and pieces[-1][0] is use:
+                pieces[-1][1] += ch
+            else:
+                pieces.append([use, ch])
+        return [(f, t) for f, t in pieces]
+
+    def write(self):
+        for font in self.by_path.values():
+            font.write(self.pdf)
+
+    def resources(self):
+        return " ".join(f"/{f.resource} {f.ids[0]} 0 R" for f in self.by_path.values())
+
+
+class _Figures:
+    """
+    Image XObjects by book image path: a vector form for a known chart job, else the
+    image file. Each is written once, the first time a page uses it.
+    """
+
+    def __init__(self, pdf, jobs):
+        self.pdf = pdf
+        self.cache = {}
+        self.resources = []
+        self.vector = self.raster = self.missing = 0
+        self.jobs = {}
+        for job in jobs:
+            path = chart_paths([job], "print")[job["name"]]
+            if path is not None:
+                self.jobs[os.path.abspath(local_path(path))] = job
+
+    def get(self, path):
+        """(resource name, width pt, height pt, is_form), or None if there is nothing to draw."""
+        key = os.path.abspath(local_path(path)) if path and path != "None" else None
+        if key not in self.cache:
+            figure = None
+            if key in self.jobs:
+                figure = self._vector(self.jobs[key])
+            elif key and os.path.exists(key):
+                figure = self._raster(key)
+            if figure is None:
+                self.missing += 1
+            self.cache[key] = figure
+        return self.cache[key]
+
+    def _add(self, obj_id):
+        name = f"X{len(self.resources) + 1}"
+        self.resources.append((name, obj_id))
+        return name
+
+    def _vector(self, job):
+        if job["kind"] == "pie":
+            layout = donut_layout(job["stats"])
+        elif job["kind"] == "table":
+            layout = table_layout(build_table_rows(job["chart"]))
+        elif job["kind"] == "wheel":
+            layout = wheel_layout(job["chart"])
+        else:
+            layout = None
+        if layout is None:
+            return None
+        width, height = layout["size"][0] * MM, layout["size"][1] * MM
+        obj_id = self.pdf.reserve()
+        self.pdf.write_stream(obj_id, pdf_content(layout), f" /Type /XObject /Subtype /Form /BBox [0 0 {_num(width)} {_num(height)}]")
+        self.vector += 1
+        return (self._add(obj_id), width, height, True)
+
+    def _raster(self, path):
+        with Image.open(path) as image:
+            dpi = image.info.get("dpi", (300, 300))[0] or 300
+            if image.mode == "P" and "transparency" not in image.info:
+                palette = image.getpalette() or []
+                colors = len(palette) // 3
+                space = f"[/Indexed /DeviceRGB {colors - 1} <{bytes(palette[:colors * 3]).hex()}>]"
+            else:
+                if image.mode in ("RGBA", "LA", "P"):
+                    rgba = image.convert("RGBA")
+                    image = Image.new("RGB", rgba.size, "white")
+                    image.paste(rgba, mask=rgba.getchannel("A"))
+                else:
+                    image = image.convert("RGB")
+                space = "/DeviceRGB"
+            w, h = image.size
+            obj_id = self.pdf.reserve()
+            self.pdf.write_stream(obj_id, image.tobytes(), f" /Type /XObject /Subtype /Image /Width {w} /Height {h} "
+                                                           f"/ColorSpace {space} /BitsPerComponent 8")
+        self.raster += 1
+        return (self._add(obj_id), w * 72.0 / dpi, h * 72.0 / dpi, False)
+
+
+# ==========================================================
+# TYPESETTING
+# ==========================================================
+class _Word:
+    __slots__ = ("segments", "width", "space")
+
+    def __init__(self, segments, size):
+        self.segments = segments
+        self.width = sum(font.width(text, size) for font, text in segments)
+        # The space after a word is set in the font of its last piece
+        self.space = segments[-1][0].width(" ", size)
+
+
+class _Typesetter:
+    """Fills pages from layout blocks, writing each page to the PDF as soon as it is full."""
+
+    def __init__(self, pdf, fonts, figures, pages_id, resources_id, progress=None):
+        self.pdf = pdf
+        self.fonts = fonts
+        self.figures = figures
+        self.pages_id = pages_id
+        self.resources_id = resources_id
+        self.progress = progress
+        self.page_ids = []
+        self.content = None
+        self.empty = True
+        self.y = MARGIN_TOP
+        self.left = MARGIN_SIDE
+        self.width = PAGE_WIDTH - 2 * MARGIN_SIDE
+        self.bottom = PAGE_HEIGHT - MARGIN_BOTTOM
+
+    # --- pages ---
+    def new_page(self):
+        self.finish_page()
+        self.content = []
+        self.empty = True
+        self.y = MARGIN_TOP
+
+    def finish_page(self):
+        if self.content is None:
+            return
+        number = len(self.page_ids) + 1
+        if number > 1:
+            style = STYLES["folio"]
+            self._draw_line(self._words([(None, str(number))], style), style, PAGE_HEIGHT - FOLIO_BASELINE, last=True)
+        content_id, page_id = self.pdf.reserve(), self.pdf.reserve()
+        self.pdf.write_stream(content_id, "\n".join(self.content).encode("latin-1"))
+        self.pdf.write(page_id, f"<< /Type /Page /Parent {self.pages_id} 0 R /MediaBox [0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}] "
+                                f"/Resources {self.resources_id} 0 R /Contents {content_id} 0 R >>")
+        self.pdf.f.flush()
+        self.page_ids.append(page_id)
+        self.content = None
+        if self.progress:
+            self.progress(len(self.page_ids))
+
+    def _page(self):
+        if self.content is None:
+            self.new_page()
+
+    def _fits(self, height):
+        return self.y + height <= self.bottom
+
+    # --- text ---
+    def _words(self, runs, style):
+        """Splits runs into words (each a list of (font, text) pieces) at spaces."""
+        base = self.fonts.role(style["font"])
+        words, current = [], []
+        for role, text in runs:
+            font = self.fonts.role("bold") if role == "bold" else base
+            for i, part in enumerate(text.split(" ")):
+                if i and current:
+                    words.append(_Word(current, style["size"]))
+                    current = []
+                if part:
+                    current += self.fonts.segments(font, part)
+        if current:
+            words.append(_Word(current, style["size"]))
+        return words
+
+    def _wrap(self, words, width):
+        lines, line, used = [], [], 0.0
+        for word in words:
+            extra = line[-1].space + word.width if line else word.width
+            if line and used + extra > width:
+                lines.append((line, used))
+                line, used = [word], word.width
+            else:
+                line.append(word)
+                used += extra
+        if line:
+            lines.append((line, used))
+        return lines
+
+    def _draw_line(self, line, style, baseline, last, indent=0.0, natural=None):
+        size = style["size"]
+        if natural is None:
+            natural = sum(w.width for w in line) + sum(w.space for w in line[:-1])
+        width = self.width - indent
+        x, gap = self.left + indent, 0.0
+        if style["align"] == "center":
+            x += (width - natural) / 2
+        elif style["align"] == "justify" and not last and len(line) > 1:
+            gap = (width - natural) / (len(line) - 1)
+        ops, items, current = [f"BT {_num(x)} {_num(PAGE_HEIGHT - baseline)} Td"], [], None
+        for i, word in enumerate(line):
+            for font, text in word.segments:
+                if font is not current:
+                    if items:
+                        ops.append("[" + " ".join(items) + "] TJ")
+                        items = []
+                    ops.append(f"/{font.resource} {_num(size)} Tf")
+                    current = font
+                items.append(f"<{font.encode(text)}>")
+            if i < len(line) - 1:
+                items.append(f"<{current.encode(' ')}>")
+                if gap:
+                    items.append(_num(-gap * 1000 / size))
+        ops.append("[" + " ".join(items) + "] TJ ET")
+        self.content.append("\n".join(ops))
+        self.empty = False
+
+    def text(self, runs, style_name, indent=0.0, marker=None):
+        style = STYLES[style_name]
+        self._page()
+        if not self.empty:
+            self.y += style["before"]
+        lines = self._wrap(self._words(runs, style), self.width - indent)
+        for i, (line, natural) in enumerate(lines):
+            if not self._fits(style["leading"]):
+                self.new_page()
+            baseline = self.y + style["leading"] * 0.75
+            if marker and i == 0:
+                self._draw_line(self._words([(None, marker)], style), dict(style, align="left"), baseline, last=True)
+            self._draw_line(line, style, baseline, last=i == len(lines) - 1, indent=indent, natural=natural)
+            self.y += style["leading"]
+        self.y += style["after"]
+
+    def _text_height(self, runs, style_name):
+        style = STYLES[style_name]
+        return style["before"] + len(self._wrap(self._words(runs, style), self.width)) * style["leading"]
+
+    # --- other blocks ---
+    def _figure_size(self, figure):
+        _, width, height, _ = figure
+        scale = min(1.0, self.width / width, (self.bottom - MARGIN_TOP) / height)
+        return width * scale, height * scale
+
+    def figure(self, path):
+        figure = self.figures.get(path)
+        if figure is None:
+            return
+        self._page()
+        width, height = self._figure_size(figure)
+        if not self._fits(height):
+            shrink = (self.bottom - self.y) / height
+            if shrink >= MIN_FIGURE_SCALE:
+                width, height = width * shrink, height * shrink
+            else:
+                self.new_page()
+        name, natural_w, natural_h, is_form = figure
+        x, y = self.left + (self.width - width) / 2, PAGE_HEIGHT - self.y - height
+        if is_form:
+            s = width / natural_w
+            self.content.append(f"q {_num(s)} 0 0 {_num(s)} {_num(x)} {_num(y)} cm /{name} Do Q")
+        else:
+            self.content.append(f"q {_num(width)} 0 0 {_num(height)} {_num(x)} {_num(y)} cm /{name} Do Q")
+        self.empty = False
+        self.y += height + FIGURE_SPACE
+
+    def rule(self):
+        self._page()
+        y = PAGE_HEIGHT - self.y - 2
+        self.content.append(f"q 0.5 w {_num(self.left)} {_num(y)} m {_num(self.left + self.width)} {_num(y)} l S Q")
+        self.y += 6
+
+    def space(self):
+        if self.content is not None and not self.empty:
+            self.y += BLANK_LINE_SPACE
+
+    def _opening(self, sink):
+        """Starts a new page (unless this one is still empty) with `sink` points of space above."""
+        if self.content is None or not self.empty:
+            self.new_page()
+        self.y = MARGIN_TOP + sink
+
+    def _needs(self, block):
+        """Space the start of `block` needs on the page of the heading before it."""
+        if block is None:
+            return 0.0
+        kind, value = block
+        if kind == "figure":
+            figure = self.figures.get(value)
+            return self._figure_size(figure)[1] * MIN_FIGURE_SCALE if figure else 0.0
+        if kind in ("body", "bullet"):
+            return STYLES[kind]["before"] + 2 * STYLES[kind]["leading"]
+        return 0.0
+
+    def place(self, block, following):
+        kind, value = block
+        if kind == "title":
+            self._opening((PAGE_HEIGHT - MARGIN_TOP - MARGIN_BOTTOM) * 0.35)
+            self.text(value, "title")
+        elif kind == "chapter":
+            label, title = value
+            self._opening(CHAPTER_SINK)
+            self.text([(None, label.upper())], "label")
+            self.text(_inline(title), "h1")
+        elif kind == "h1":
+            self._opening(CHAPTER_SINK)
+            self.text(value, "h1")
+        elif kind in HEADINGS:
+            self._page()
+            # Keep the heading on the page of what follows it
+            if not self.empty and not self._fits(self._text_height(value, kind) + self._needs(following)):
+                self.new_page()
+            self.text(value, kind)
+        elif kind == "body":
+            self.text(value, "body")
+        elif kind == "bullet":
+            self.text(value, "bullet", indent=BULLET_INDENT, marker="•")
+        elif kind == "figure":
+            self.figure(value)
+        elif kind == "rule":
+            self.rule()
+        elif kind == "space":
+            self.space()
+
+    def run(self, blocks):
+        previous = None
+        for block in blocks:
+            if previous is not None:
+                self.place(previous, block)
+            previous = block
+        if previous is not None:
+            self.place(previous, None)
+        self.finish_page()
+
+
+# ==========================================================
+# ENTRY POINTS
+# ==========================================================
+def render_inside_pages(book, path, chart_jobs=(), progress=None):
+    """
+    Typesets a book into the inside-pages PDF at `path`.
+
+    Args:
+        book: The book's IR (book_ir.Book), or its text lines (an open book file
+              works; it is read once, in order)
+        path: Output PDF path; written as "<path>.part" and renamed when complete
+        chart_jobs: The book's chart jobs; images that belong to one are drawn as vectors
+        progress: Optional callable(pages written)
+
+    Returns:
+        dict: path, pages, bytes, vector_figures, raster_figures, missing_images, seconds
+    """
+    start = time.perf_counter()
+    part_path = path + PART_SUFFIX
+    try:
+        with open(part_path, "wb") as f:
+            pdf = _PdfFile(f)
+            catalog_id, pages_id, resources_id = pdf.reserve(), pdf.reserve(), pdf.reserve()
+            fonts = _Fonts(pdf)
+            figures = _Figures(pdf, chart_jobs)
+            setter = _Typesetter(pdf, fonts, figures, pages_id, resources_id, progress)
+            setter.run(layout_blocks(book) if isinstance(book, Book) else parse_book(book))
+            if not setter.page_ids:
+                setter.new_page()
+                setter.finish_page()
+
+            fonts.write()
+            xobjects = " ".join(f"/{name} {obj_id} 0 R" for name, obj_id in figures.resources)
+            pdf.write(resources_id, f"<< /Font << {fonts.resources()} >> /XObject << {xobjects} >> >>")
+            kids = " ".join(f"{page_id} 0 R" for page_id in setter.page_ids)
+            pdf.write(pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(setter.page_ids)} >>")
+            pdf.write(catalog_id, f"<< /Type /Catalog /Pages {pages_id} 0 R >>")
+            pdf.close(catalog_id)
+            size = f.tell()
+        os.replace(part_path, path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return {
+        "path": path,
+        "pages": len(setter.page_ids),
+        "bytes": size,
+        "vector_figures": figures.vector,
+        "raster_figures": figures.raster,
+        "missing_images": figures.missing,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def inside_pages_filename(book_filename):
+    return os.path.splitext(book_filename)[0] + "_Inside_Pages.pdf"
+
+
+def generate_inside_pages(job, progress=None):
+    """
+    Renders the inside pages of the book in artifact job `job` (built by
+    book_manifest.generate_book) next to the book file, from the book's saved IR,
+    drawing its charts from the chart recorded there.
+
+    Returns:
+        dict: As `render_inside_pages`
+    """
+    manifest = load_manifest(job)
+    book = load_book_ir(job, manifest)
+    if book is None:
+        raise FileNotFoundError(f"No current book IR in {job.dir}")
+    jobs = book_chart_jobs(book.chart, chart_statistics(book.chart))
+    for chart_job in jobs: chart_job["job_id"] = job.job_id
+    return render_inside_pages(book, job.handle(inside_pages_filename(manifest["book"])).path, jobs, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a book's inside pages as a PDF")
+    parser.add_argument("job_id", nargs="?", help="Artifact job of a book built by the app or book_manifest")
+    parser.add_argument("--book", help="A book text file instead (images are embedded as files)")
+    parser.add_argument("-o", "--output", help="Output PDF (with --book)")
+    args = parser.parse_args()
+
+    if args.book:
+        output = args.output or inside_pages_filename(args.book)
+        with open(args.book, "r", encoding="utf-8") as f:
+            report = render_inside_pages(f, output)
+    elif args.job_id:
+        try:
+            report = generate_inside_pages(get_artifact_store().job(args.job_id))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"❌ {e}")
+            return 1
+    else:
+        parser.error("give a job id or --book")
+
+    print(f"📓 {report['path']}: {report['pages']} pages, {report['bytes'] / 1024:.0f} KB in {report['seconds']:.2f}s")
+    print(f"   Figures: {report['vector_figures']} vector, {report['raster_figures']} raster, {report['missing_images']} missing")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Notion Rate Limiter for AstroBookBot
+
+This module keeps all Notion traffic in the project under the API's request-rate
+limit (roughly 3 requests per second on average). It provides:
+
+- A thread-safe token bucket shared by every call in the process
+- An optional file-locked bucket shared by every process on the machine
+- Exponential backoff on 429 responses that honors `Retry-After`
+- A client wrapper so `notion.databases.query(...)` etc. go through all of the above
+- Counters for requests, throttles, retries and time spent waiting
+
+Configuration (environment, read once per process):
+    NOTION_RATE_LIMIT       Requests per second (default 3)
+    NOTION_RATE_BURST       Bucket capacity (default 3)
+    NOTION_RATE_LIMIT_FILE  If set, share the bucket across processes through this file
+    NOTION_BASE_URL         Send requests somewhere other than api.notion.com
+                            (e.g. the local stand-in in notion_stub_server.py)
+"""
+
+import os
+import json
+import threading
+import time
+
+try:
+    from notion_client.api_endpoints import Endpoint
+except ImportError:  # notion_client is only needed once a client is made
+    Endpoint = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process locking is unavailable
+    fcntl = None
+
+# ==========================================================
+# DEFAULTS
+# ==========================================================
+DEFAULT_RATE = 3.0   # Tokens added per second (Notion's documented average)
+DEFAULT_BURST = 3    # Maximum tokens that can be saved up
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0      # Seconds before the first retry, doubled on each attempt
+MAX_BACKOFF = 30.0         # Never sleep longer than this between attempts
+
+
+class TokenBucket:
+    """
+    A classic token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Every request takes one token, and callers block until one is available,
+    so any number of worker threads can share one bucket.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """
+        Block until `tokens` are available and take them.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                sleep_for = (tokens - self._tokens) / self.rate
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+
+class FileLockedTokenBucket(TokenBucket):
+    """
+    A token bucket whose state lives in a small JSON file guarded by `flock`.
+
+    Every process that points at the same file draws from the same budget, so
+    several Streamlit workers or batch processes together stay under the limit.
+    Wall-clock time is used because monotonic clocks are not comparable across processes.
+    """
+
+    def __init__(self, path, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        if fcntl is None:
+            raise RuntimeError("Cross-process rate limiting needs fcntl (not available on this platform)")
+        super().__init__(rate, capacity)
+        self.path = path
+        # Create the state file once; "a+" never truncates another process's state
+        with open(self.path, "a+"):
+            pass
+
+    def acquire(self, tokens=1):
+        waited = 0.0
+        while True:
+            with self._lock, open(self.path, "r+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    raw = f.read()
+                    state = json.loads(raw) if raw.strip() else {}
+                    now = time.time()
+                    stored = state.get("tokens", self.capacity)
+                    last = state.get("last", now)
+                    available = min(self.capacity, stored + max(0.0, now - last) * self.rate)
+                    if available >= tokens:
+                        available -= tokens
+                        sleep_for = 0.0
+                    else:
+                        sleep_for = (tokens - available) / self.rate
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"tokens": available, "last": now}))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            if sleep_for == 0.0:
+                return waited
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+
+# ==========================================================
+# COUNTERS
+# ==========================================================
+class RateLimiterStats:
+    """Thread-safe counters for Notion traffic in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.throttles = 0
+            self.retries = 0
+            self.wait_time = 0.0
+
+    def record(self, requests=0, throttles=0, retries=0, wait_time=0.0):
+        with self._lock:
+            self.requests += requests
+            self.throttles += throttles
+            self.retries += retries
+            self.wait_time += wait_time
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttles": self.throttles,
+                "retries": self.retries,
+                "wait_time": round(self.wait_time, 3),
+            }
+
+
+stats = RateLimiterStats()
+
+# ==========================================================
+# PROCESS-WIDE LIMITER
+# ==========================================================
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure_limiter(rate=None, capacity=None, lock_file=None):
+    """
+    (Re)build the process-wide bucket. Arguments left as None fall back to the environment.
+
+    Returns:
+        TokenBucket: The new shared bucket
+    """
+    global _limiter
+    rate = rate or float(os.getenv("NOTION_RATE_LIMIT", DEFAULT_RATE))
+    capacity = capacity or float(os.getenv("NOTION_RATE_BURST", DEFAULT_BURST))
+    lock_file = lock_file or os.getenv("NOTION_RATE_LIMIT_FILE")
+
+    with _limiter_lock:
+        if lock_file:
+            _limiter = FileLockedTokenBucket(lock_file, rate=rate, capacity=capacity)
+        else:
+            _limiter = TokenBucket(rate=rate, capacity=capacity)
+        return _limiter
+
+
+def get_limiter():
+    """Returns the process-wide bucket, creating it from the environment on first use."""
+    if _limiter is None:
+        return configure_limiter()
+    return _limiter
+
+
+def get_stats():
+    """Returns a snapshot of the traffic counters for this process."""
+    return stats.snapshot()
+
+
+# ==========================================================
+# RETRY ON 429
+# ==========================================================
+def is_rate_limited(error):
+    """True if `error` is Notion's 429 'rate_limited' response."""
+    return getattr(error, "status", None) == 429
+
+
+def get_retry_after(error):
+    """Returns the `Retry-After` delay in seconds from a 429 error, or None."""
+    headers = getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retry(func, *args, bucket=None, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF, **kwargs):
+    """
+    Call `func(*args, **kwargs)`, retrying on 429s.
+
+    If a bucket is given, a token is taken before every attempt (including retries).
+    The delay before a retry is the server's `Retry-After` when present, otherwise
+    exponential backoff, capped at MAX_BACKOFF. Any other error is raised immediately.
+    """
+    attempt = 0
+    while True:
+        waited = bucket.acquire() if bucket is not None else 0.0
+        stats.record(requests=1, wait_time=waited or 0.0)
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not is_rate_limited(e):
+                raise
+            stats.record(throttles=1)
+            if attempt >= max_retries:
+                raise
+            delay = get_retry_after(e)
+            if delay is None:
+                delay = backoff * (2 ** attempt)
+            delay = min(delay, MAX_BACKOFF)
+            stats.record(retries=1, wait_time=delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+def throttled_call(func, *args, **kwargs):
+    """`call_with_retry` using the process-wide bucket."""
+    return call_with_retry(func, *args, bucket=get_limiter(), **kwargs)
+
+
+# ==========================================================
+# CLIENT WRAPPER
+# ==========================================================
+# Client methods that make no API request
+LOCAL_METHODS = {"close"}
+
+
+def _throttled_attr(name, attr):
+    """`attr` with its API calls throttled: endpoints are proxied, methods wrapped, anything else as is."""
+    if name.startswith("_"):
+        return attr
+    if Endpoint is not None and isinstance(attr, Endpoint):
+        return _ThrottledEndpoint(attr)
+    if callable(attr) and name not in LOCAL_METHODS:
+        return lambda *args, **kwargs: throttled_call(attr, *args, **kwargs)
+    return attr
+
+
+class _ThrottledEndpoint:
+    """Proxies a notion_client endpoint so every method call (and calling it, as `search`) is throttled."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def __call__(self, *args, **kwargs):
+        return throttled_call(self._target, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return _throttled_attr(name, getattr(self._target, name))
+
+
+class ThrottledClient:
+    """
+    Wraps a `notion_client.Client` so its endpoints (`databases`, `pages`, `blocks`,
+    `search`, ...) and raw `request` calls go through the shared limiter. Other
+    attributes (`options`, `logger`, `close`) are passed through untouched.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, *args, **kwargs):
+        return throttled_call(self.client.request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return _throttled_attr(name, getattr(self.client, name))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_notion_client(auth):
+    """
+    Returns a throttled Notion client for `auth`. It is built once per process and
+    token, so HTTP connections are reused across calls.
+    """
+    from notion_client import Client
+
+    base_url = os.getenv("NOTION_BASE_URL")
+    options = {"auth": auth}
+    if base_url:
+        options["base_url"] = base_url.rstrip("/")
+
+    with _clients_lock:
+        key = (auth, base_url)
+        if key not in _clients:
+            _clients[key] = ThrottledClient(Client(**options))
+        return _clients[key]
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Local Notion API stand-in for AstroBookBot
+
+Serves the small subset of the Notion API the project uses, backed by a JSON fixture,
+so the book, populate and sort paths can run (and be benchmarked) offline:
+
+- POST  /v1/databases/{id}/query   title `equals` filters, `or` of those, pagination
+- POST  /v1/pages                  create a row
+- PATCH /v1/pages/{id}             update a row's properties
+
+Point the project at it with NOTION_BASE_URL, e.g.:
+    python notion_stub_server.py --seed --fixture notion_fixture.json --port 8765
+    NOTION_BASE_URL=http://127.0.0.1:8765 NOTION_TOKEN=offline-token python generate_book_chapter.py
+
+Fixture format (simple rows, not raw Notion pages):
+    {"rows": [{"Placement": "Sun in Aries", "Description": "...", "SortID": 13}, ...]}
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+# ==========================================================
+# THE STORE
+# ==========================================================
+def _rich_text(text):
+    return [{
+        "type": "text",
+        "text": {"content": text, "link": None},
+        "plain_text": text,
+        "href": None,
+    }]
+
+
+def _plain(rich_text):
+    return "".join(t.get("plain_text") or t.get("text", {}).get("content", "") for t in rich_text or [])
+
+
+class NotionStore:
+    """In-memory database of Notion pages, loaded from (and optionally saved to) a fixture file."""
+
+    def __init__(self, rows=None, database_id="offline-database"):
+        self.database_id = database_id
+        self.pages = []
+        self.by_id = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        for row in rows or []:
+            self._add(row)
+
+    @classmethod
+    def from_fixture(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("rows", []), **kwargs)
+
+    def _add(self, row, page_id=None):
+        page_id = page_id or row.get("id") or str(uuid.uuid4())
+        properties = {
+            "Placement": {"id": "title", "type": "title", "title": _rich_text(row.get("Placement", ""))},
+            "Description": {"id": "desc", "type": "rich_text", "rich_text": _rich_text(row["Description"]) if row.get("Description") else []},
+            "SortID": {"id": "sort", "type": "number", "number": row.get("SortID")},
+        }
+        page = {
+            "object": "page",
+            "id": page_id,
+            "parent": {"type": "database_id", "database_id": self.database_id},
+            "archived": False,
+            "properties": properties,
+        }
+        self.pages.append(page)
+        self.by_id[page_id] = page
+        return page
+
+    def to_rows(self):
+        with self.lock:
+            return [{
+                "id": p["id"],
+                "Placement": _plain(p["properties"]["Placement"]["title"]),
+                "Description": _plain(p["properties"]["Description"]["rich_text"]),
+                "SortID": p["properties"]["SortID"]["number"],
+            } for p in self.pages]
+
+    def save(self, path):
+        # One save at a time: concurrent requests would share the temp file, and a
+        # later snapshot must not be overwritten by an earlier one
+        with self.save_lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"rows": self.to_rows()}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, path)
+
+    # --- Filters ---
+    def _matches(self, page, flt):
+        if not flt:
+            return True
+        if "or" in flt:
+            return any(self._matches(page, f) for f in flt["or"])
+        if "and" in flt:
+            return all(self._matches(page, f) for f in flt["and"])
+        prop = page["properties"].get(flt.get("property"))
+        if prop is None:
+            return False
+        if "title" in flt or "rich_text" in flt:
+            condition = flt.get("title") or flt.get("rich_text")
+            value = _plain(prop.get(prop["type"]))
+            if "equals" in condition:
+                return value == condition["equals"]
+            if "contains" in condition:
+                return condition["contains"] in value
+            if "is_empty" in condition:
+                return not value
+            if "is_not_empty" in condition:
+                return bool(value)
+        if "number" in flt:
+            condition = flt["number"]
+            if "equals" in condition:
+                return prop.get("number") == condition["equals"]
+            if "is_empty" in condition:
+                return prop.get("number") is None
+        raise ValueError(f"Unsupported filter: {json.dumps(flt)}")
+
+    # --- Endpoints ---
+    def query(self, body):
+        page_size = min(int(body.get("page_size") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+        start = int(body.get("start_cursor") or 0)
+        with self.lock:
+            matched = [p for p in self.pages if self._matches(p, body.get("filter"))]
+        chunk = matched[start:start + page_size]
+        has_more = start + page_size < len(matched)
+        return {
+            "object": "list",
+            "results": chunk,
+            "next_cursor": str(start + page_size) if has_more else None,
+            "has_more": has_more,
+            "type": "page_or_database",
+        }
+
+    def create(self, body):
+        props = body.get("properties", {})
+        row = {
+            "Placement": _plain(props.get("Placement", {}).get("title")),
+            "Description": _plain(props.get("Description", {}).get("rich_text")),
+            "SortID": props.get("SortID", {}).get("number"),
+        }
+        with self.lock:
+            return self._add(row)
+
+    def update(self, page_id, body):
+        with self.lock:
+            page = self.by_id.get(page_id)
+            if page is None:
+                return None
+            for name, value in body.get("properties", {}).items():
+                current = page["properties"].setdefault(name, {"id": name, "type": next(iter(value))})
+                for kind, payload in value.items():
+                    current["type"] = kind
+                    current[kind] = _rich_text(_plain(payload)) if kind in ("title", "rich_text") else payload
+            return page
+
+
+# ==========================================================
+# THE HTTP SERVER
+# ==========================================================
+class NotionStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store, latency_ms=0, error_rate=0.0, retry_after=1, fixture_path=None, persist=False):
+        super().__init__(address, NotionStubHandler)
+        self.store = store
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.fixture_path = fixture_path
+        self.persist = persist
+        self.counters = {"requests": 0, "throttled": 0}
+        self.counters_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class NotionStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, code, message, headers=None):
+        self._send(status, {"object": "error", "status": status, "code": code, "message": message}, headers)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _handle(self, method):
+        server = self.server
+        with server.counters_lock:
+            server.counters["requests"] += 1
+
+        # Always drain the body first so keep-alive connections stay in sync
+        try:
+            body = self._read_body()
+        except ValueError:
+            return self._error(400, "invalid_json", "The request body could not be decoded as JSON.")
+
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000.0)
+
+        if server.error_rate and random.random() < server.error_rate:
+            with server.counters_lock:
+                server.counters["throttled"] += 1
+            return self._error(429, "rate_limited", "You have been rate limited (stub).", {"Retry-After": str(server.retry_after)})
+
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        store = server.store
+        try:
+            if method == "POST" and len(parts) == 4 and parts[:2] == ["v1", "databases"] and parts[3] == "query":
+                return self._send(200, store.query(body))
+            if method == "POST" and parts == ["v1", "pages"]:
+                page = store.create(body)
+                self._persist()
+                return self._send(200, page)
+            if method == "PATCH" and len(parts) == 3 and parts[:2] == ["v1", "pages"]:
+                page = store.update(parts[2], body)
+                if page is None:
+                    return self._error(404, "object_not_found", f"Could not find page with ID: {parts[2]}.")
+                self._persist()
+                return self._send(200, page)
+        except ValueError as e:
+            return self._error(400, "validation_error", str(e))
+
+        return self._error(400, "invalid_request_url", f"Invalid request URL: {method} {self.path}")
+
+    def _persist(self):
+        if self.server.persist and self.server.fixture_path:
+            self.server.store.save(self.server.fixture_path)
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_GET(self):
+        self._handle("GET")
+
+
+def start_stub_server(store, host="127.0.0.1", port=0, **kwargs):
+    """
+    Starts the stand-in on a background thread (port 0 picks a free port).
+
+    Returns:
+        NotionStubServer: Call `.shutdown()` when done; `.base_url` is the NOTION_BASE_URL to use
+    """
+    server = NotionStubServer((host, port), store, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ==========================================================
+# FIXTURE SEEDING
+# ==========================================================
+def build_seed_rows():
+    """One placeholder row for every key the book can ask for (library keys plus aspects)."""
+    from populate_library import build_key_list, build_aspect_keys
+
+    keys = [key for _, section in build_key_list() for key in section]
+    keys += build_aspect_keys()
+    return [
+        {"Placement": key, "Description": f"Offline text for {key}.", "SortID": None}
+        for key in keys
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Notion API stand-in")
+    parser.add_argument("--fixture", default="notion_fixture.json", help="JSON fixture with the library rows")
+    parser.add_argument("--seed", action="store_true", help="Write a placeholder fixture covering every key, then serve it")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial delay added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--persist", action="store_true", help="Write creates/updates back to the fixture file")
+    args = parser.parse_args()
+
+    if args.seed:
+        NotionStore(build_seed_rows()).save(args.fixture)
+        print(f"🌱 Seeded fixture: {args.fixture}")
+
+    if not os.path.exists(args.fixture):
+        print(f"❌ Fixture not found: {args.fixture} (use --seed to create one)")
+        return 1
+
+    store = NotionStore.from_fixture(args.fixture)
+    server = NotionStubServer(
+        (args.host, args.port), store,
+        latency_ms=args.latency_ms, error_rate=args.error_rate, retry_after=args.retry_after,
+        fixture_path=args.fixture, persist=args.persist,
+    )
+    print(f"🧪 Notion stand-in serving {len(store.pages)} rows at {server.base_url}")
+    print(f"👉 export NOTION_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {server.counters['requests']} requests ({server.counters['throttled']} throttled).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+PNG Post-Processing for AstroBookBot
+
+The book graphics are a handful of flat colours plus anti-aliased text, so they
+compress far better as palette (indexed) PNGs than as the RGBA files matplotlib
+writes. `optimize_png` rewrites a PNG in place:
+
+- quantizes it to an indexed palette (images that already are indexed keep theirs)
+- drops metadata chunks (Software, text, ICC, EXIF); only the dpi is kept for print sizing
+- saves with maximum zlib compression
+- if the result is over the byte budget, retries with fewer colours
+
+Configuration:
+    PNG_OPTIMIZE   Set to 0 to write images untouched (default 1)
+    PNG_COLORS     Palette size to start from (default 64)
+    PNG_MAX_KB     Per-image byte budget in KB (default 256, 0 = no budget)
+
+Usage:
+    python png_optimize.py assets/pie_charts/*.png
+"""
+
+import io
+import os
+import sys
+import threading
+
+from PIL import Image
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+ENABLED = os.getenv("PNG_OPTIMIZE", "1") != "0"
+DEFAULT_COLORS = int(os.getenv("PNG_COLORS", 64))
+DEFAULT_MAX_BYTES = int(float(os.getenv("PNG_MAX_KB", 256)) * 1024)
+MIN_COLORS = 8
+
+# Everything above that changes the bytes written (part of the chart cache key)
+OUTPUT_SETTINGS = {"optimize": ENABLED, "colors": DEFAULT_COLORS, "max_bytes": DEFAULT_MAX_BYTES}
+
+# Palette entries within this distance of one of the image's most common colours are
+# snapped to it, so white stays pure white and the wedge fills keep their exact colours
+SNAP_COLORS = 16
+SNAP_TOLERANCE = 8
+
+
+class PngStats:
+    """Thread-safe totals of what optimization saved in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.images = 0
+            self.bytes_before = 0
+            self.bytes_after = 0
+            self.over_budget = 0
+            self.unmeasured = 0
+
+    def record(self, result):
+        with self._lock:
+            self.images += 1
+            if result["before"] is None:
+                # Written optimized straight from memory: there is no unoptimized size to compare
+                self.unmeasured += 1
+            else:
+                self.bytes_before += result["before"]
+                self.bytes_after += result["after"]
+            self.over_budget += 0 if result["within_budget"] else 1
+
+    def merge(self, snapshot):
+        """Adds totals reported by another process (e.g. a render worker)."""
+        with self._lock:
+            self.images += snapshot["images"]
+            self.bytes_before += snapshot["bytes_before"]
+            self.bytes_after += snapshot["bytes_after"]
+            self.over_budget += snapshot["over_budget"]
+            self.unmeasured += snapshot["unmeasured"]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "images": self.images,
+                "bytes_before": self.bytes_before,
+                "bytes_after": self.bytes_after,
+                "bytes_saved": self.bytes_before - self.bytes_after,
+                "over_budget": self.over_budget,
+                "unmeasured": self.unmeasured,
+            }
+
+
+stats = PngStats()
+
+
+def get_png_stats():
+    return stats.snapshot()
+
+
+# ==========================================================
+# OPTIMIZATION
+# ==========================================================
+def _flatten(image):
+    """RGB on white for anything with transparency (the book pages are white)."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _snap_palette(indexed, rgb):
+    """Moves averaged palette entries back onto the image's dominant exact colours."""
+    sample = rgb.resize((max(1, rgb.width // 4), max(1, rgb.height // 4)), Image.Resampling.NEAREST)
+    common = [color for _, color in sorted(sample.getcolors(1 << 24), reverse=True)[:SNAP_COLORS]]
+    palette = indexed.getpalette()
+    for i in range(0, len(palette), 3):
+        entry = palette[i:i + 3]
+        # Most frequent first, so a near-white entry becomes the background, not a rare AA shade
+        for color in common:
+            if max(abs(a - b) for a, b in zip(color, entry)) <= SNAP_TOLERANCE:
+                palette[i:i + 3] = color
+                break
+    indexed.putpalette(palette)
+    return indexed
+
+
+def _encode(image, dpi):
+    buffer = io.BytesIO()
+    options = {"compress_level": 9}
+    if dpi:
+        options["dpi"] = dpi
+    image.save(buffer, "PNG", **options)
+    return buffer.getvalue()
+
+
+def _optimized_bytes(image, dpi, max_bytes, colors):
+    """(PNG bytes, colours used) for `image` as an indexed PNG within `max_bytes` if possible."""
+    if image.mode == "P" and "transparency" not in image.info:
+        # Already indexed (e.g. the summary table's fixed palette): just recompress
+        return _encode(image, dpi), len(image.getcolors(256) or [])
+    rgb = _flatten(image)
+    used = colors
+    while True:
+        indexed = _snap_palette(rgb.quantize(colors=used, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE), rgb)
+        data = _encode(indexed, dpi)
+        if not max_bytes or len(data) <= max_bytes or used <= MIN_COLORS:
+            return data, used
+        used = max(MIN_COLORS, used // 2)
+
+
+def optimize_png(path, max_bytes=DEFAULT_MAX_BYTES, colors=DEFAULT_COLORS):
+    """
+    Rewrites the PNG at `path` as a metadata-free, maximally compressed indexed PNG.
+
+    The file is only replaced if the result is smaller. The palette is halved (down
+    to MIN_COLORS) while the image is over `max_bytes`.
+
+    Returns:
+        dict: before / after sizes in bytes, colors used, and whether it fits the budget
+    """
+    before = os.path.getsize(path)
+    with Image.open(path) as image:
+        image.load()
+    dpi = image.info.get("dpi")
+    dpi = tuple(round(d) for d in dpi) if dpi else None
+    data, used = _optimized_bytes(image, dpi, max_bytes, colors)
+
+    if len(data) < before:
+        tmp_path = path + ".opt"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    after = min(before, len(data))
+
+    result = {
+        "before": before,
+        "after": after,
+        "colors": used,
+        "within_budget": not max_bytes or after <= max_bytes,
+    }
+    stats.record(result)
+    return result
+
+
+def save_png(image, path, dpi=None):
+    """
+    Saves an in-memory image straight to `path` as an optimized PNG (or a plain one
+    if PNG_OPTIMIZE=0), without writing and re-reading an unoptimized file first.
+
+    Returns:
+        dict: Same as `optimize_png`, but "before" is None (there is no unoptimized
+              file, so the image is left out of the savings totals), or None if
+              optimization is off
+    """
+    if not ENABLED:
+        if dpi:
+            image.save(path, "PNG", dpi=dpi)
+        else:
+            image.save(path, "PNG")
+        return None
+    data, used = _optimized_bytes(image, dpi, DEFAULT_MAX_BYTES, DEFAULT_COLORS)
+    with open(path, "wb") as f:
+        f.write(data)
+    result = {
+        "before": None,
+        "after": len(data),
+        "colors": used,
+        "within_budget": not DEFAULT_MAX_BYTES or len(data) <= DEFAULT_MAX_BYTES,
+    }
+    stats.record(result)
+    return result
+
+
+def maybe_optimize_png(path):
+    """`optimize_png` with the configured defaults, or nothing if PNG_OPTIMIZE=0."""
+    if not ENABLED or not path.lower().endswith(".png"):
+        return None
+    return optimize_png(path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python png_optimize.py <file.png> [...]")
+        return 1
+    for path in sys.argv[1:]:
+        result = optimize_png(path)
+        flag = "" if result["within_budget"] else "  ⚠️ over budget"
+        print(f"{path}: {result['before'] / 1024:.0f} KB -> {result['after'] / 1024:.0f} KB ({result['colors']} colours){flag}")
+    total = get_png_stats()
+    print(f"🗜️  Saved {total['bytes_saved'] / 1024:.0f} KB across {total['images']} images.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
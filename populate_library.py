@@ -1,7 +1,9 @@
-import time
 import os
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_rate_limiter import get_notion_client, configure_limiter, get_stats
 
 load_dotenv()
 
@@ -11,6 +13,10 @@ load_dotenv()
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
+# Bulk mode: created keys are appended here, so a rerun can report what the last run managed
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".populate_checkpoint")
+DEFAULT_WORKERS = 4
+
 # ==========================================================
 # DATA LISTS
 # ==========================================================
@@ -29,6 +35,41 @@ MOON_PHASES = [
     "New Moon", "Waxing Moon", "Full Moon", "Waning Moon"
 ]
 
+ASPECTS = ["Conjunction", "Opposition", "Square", "Trine", "Sextile"]
+
+def get_ordinal(n):
+    if 11 <= (n % 100) <= 13: suffix = 'th'
+    else: suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+def build_key_list():
+    """Returns every Placement key in population order, grouped by section."""
+    sections = []
+
+    # 1. Planets in Signs
+    sections.append(("Planets in Signs", [f"{planet} in {sign}" for planet in PLANETS for sign in SIGNS]))
+
+    # 2. Planets in Houses (Asc/MC are the house system itself)
+    sections.append(("Planets in Houses", [
+        f"{planet} in the {get_ordinal(i)} House"
+        for planet in PLANETS if planet not in ["Ascendant", "Midheaven"]
+        for i in range(1, 13)
+    ]))
+
+    # 3. House Cusps (Signs on Houses)
+    sections.append(("House Cusps (Signs on Houses)", [
+        f"{sign} in the {get_ordinal(i)} House" for i in range(1, 13) for sign in SIGNS
+    ]))
+
+    # 4. Moon Phases
+    sections.append(("Moon Phases", list(MOON_PHASES)))
+
+    return sections
+
+def build_aspect_keys():
+    """Returns every aspect key the book can ask for (e.g. 'Sun Trine Moon')."""
+    return [f"{a} {aspect} {b}" for a in PLANETS for aspect in ASPECTS for b in PLANETS if a != b]
+
 # ==========================================================
 # THE ARCHITECT SCRIPT
 # ==========================================================
@@ -55,51 +96,137 @@ def create_row(client, title_text):
             }
         )
         print(f"✅ Created: '{title_text}'")
-        
-        # Rate limit pause
-        time.sleep(0.3) 
 
     except Exception as e:
         print(f"❌ Error creating '{title_text}': {e}")
 
+# ==========================================================
+# BULK MODE (Scan once, create missing rows concurrently)
+# ==========================================================
+def fetch_existing_titles(client):
+    """Pages through the whole database once and returns the set of Placement titles."""
+    titles = set()
+    has_more = True
+    next_cursor = None
+
+    while has_more:
+        response = client.databases.query(database_id=DATABASE_ID, start_cursor=next_cursor)
+        for page in response["results"]:
+            try:
+                title = page["properties"]["Placement"]["title"]
+                if title:
+                    titles.add("".join(t["plain_text"] for t in title))
+            except (KeyError, TypeError):
+                continue
+        has_more = response["has_more"]
+        next_cursor = response["next_cursor"]
+
+    return titles
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """Returns the keys recorded as created by a previous bulk run."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+def bulk_populate(client, workers=DEFAULT_WORKERS, checkpoint_path=CHECKPOINT_FILE):
+    """
+    Creates every missing row in one pass.
+
+    The database is scanned once into memory, the missing keys are computed
+    locally, and the creates are spread over a bounded worker pool. The client's
+    shared rate limiter keeps the pool under Notion's limit. A rerun resumes on its
+    own, as the scan finds the rows already created. Each successful create is
+    also appended to the checkpoint file, which is only used to report on the
+    previous run; what exists is always decided by the scan, so a checkpointed row
+    that was deleted since is created again.
+
+    Returns:
+        dict: Counts of created, skipped and failed keys
+    """
+    all_keys = [key for _, keys in build_key_list() for key in keys]
+
+    done = load_checkpoint(checkpoint_path)
+
+    print("Scanning existing rows...")
+    existing = fetch_existing_titles(client)
+    print(f"Found {len(existing)} existing rows.")
+    if done:
+        gone = len(done - existing)
+        print(f"↩️  Resuming: {len(done)} keys were created by a previous run"
+              + (f", {gone} of them no longer in the database." if gone else "."))
+
+    missing = [key for key in all_keys if key not in existing]
+    skipped = len(all_keys) - len(missing)
+    print(f"{len(missing)} rows to create, {skipped} already present.")
+
+    checkpoint_lock = threading.Lock()
+    created, failed = 0, 0
+
+    def create(key):
+        client.pages.create(
+            parent={"database_id": DATABASE_ID},
+            properties={
+                "Placement": {
+                    "title": [{"text": {"content": key}}]
+                }
+            }
+        )
+        with checkpoint_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(key + "\n")
+        return key
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(create, key): key for key in missing}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                future.result()
+                created += 1
+                print(f"✅ [{created}/{len(missing)}] Created: '{key}'")
+            except Exception as e:
+                failed += 1
+                print(f"❌ Error creating '{key}': {e}")
+
+    # A clean run leaves nothing to resume
+    if failed == 0 and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return {"created": created, "skipped": skipped, "failed": failed}
+
 def main():
+    parser = argparse.ArgumentParser(description="Create the Placement rows in the Notion library")
+    parser.add_argument("--bulk", action="store_true", help="Scan once and create missing rows concurrently (resumable)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent create requests in bulk mode")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (default: NOTION_RATE_LIMIT or 3)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Checkpoint file reporting on interrupted bulk runs")
+    args = parser.parse_args()
+
     print("🏗️  Starting The Architect...")
     print("Connecting to Notion...")
     
-    # Initialize Client
-    notion = Client(auth=NOTION_TOKEN)
-    
-    print("\n--- 1. Generating Planets in Signs ---")
-    for planet in PLANETS:
-        for sign in SIGNS:
-            key = f"{planet} in {sign}"
-            create_row(notion, key)
+    # Initialize Client (all calls go through the shared rate limiter)
+    if args.rate:
+        configure_limiter(rate=args.rate)
+    notion = get_notion_client(NOTION_TOKEN)
 
-    print("\n--- 2. Generating Planets in Houses ---")
-    def get_ordinal(n):
-        if 11 <= (n % 100) <= 13: suffix = 'th'
-        else: suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
-        return f"{n}{suffix}"
-
-    for planet in PLANETS:
-        if planet in ["Ascendant", "Midheaven"]: continue
-        for i in range(1, 13):
-            house_str = get_ordinal(i)
-            key = f"{planet} in the {house_str} House"
-            create_row(notion, key)
+    if args.bulk:
+        result = bulk_populate(notion, workers=args.workers, checkpoint_path=args.checkpoint)
+        print(f"\n✨ Bulk Population Complete! Created {result['created']}, skipped {result['skipped']}, failed {result['failed']}.")
+        if result["failed"]:
+            print("👉 Run the same command again to retry the failed rows.")
+        print(f"📊 Notion traffic: {get_stats()}")
+        return
 
-    print("\n--- 3. Generating House Cusps (Signs on Houses) ---")
-    for i in range(1, 13):
-        house_str = get_ordinal(i)
-        for sign in SIGNS:
-            key = f"{sign} in the {house_str} House"
+    for number, (title, keys) in enumerate(build_key_list(), start=1):
+        print(f"\n--- {number}. Generating {title} ---")
+        for key in keys:
             create_row(notion, key)
 
-    print("\n--- 4. Generating Moon Phases ---")
-    for phase in MOON_PHASES:
-        create_row(notion, phase)
-
     print("\n✨ Database Population Complete!")
+    print(f"📊 Notion traffic: {get_stats()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
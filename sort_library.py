@@ -1,7 +1,8 @@
-import time
 import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_rate_limiter import get_notion_client, configure_limiter, get_stats
 
 load_dotenv()
 
@@ -10,6 +11,7 @@ load_dotenv()
 # ==========================================================
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
+DEFAULT_WORKERS = 4
 
 # ==========================================================
 # DEFINING THE BOOK SEQUENCE
@@ -69,11 +71,71 @@ for planet in PLANETS_ORDER:
 # ==========================================================
 # THE SORTER SCRIPT
 # ==========================================================
+def compute_sort_diff(page_map):
+    """
+    Compares the current SortIDs with MASTER_ORDER.
+
+    Args:
+        page_map (dict): { "Sun in Aries": ("page_id_123", current_sort_id) }
+
+    Returns:
+        list: (key, page_id, current_sort_id, new_sort_id) for every row that needs a write
+    """
+    changes = []
+    for index, key in enumerate(MASTER_ORDER):
+        if key not in page_map: continue
+        page_id, current = page_map[key]
+        if current != index + 1:
+            changes.append((key, page_id, current, index + 1))
+    return changes
+
+def print_dry_run(changes):
+    print(f"\n🔎 Dry run: {len(changes)} rows would be updated.")
+    for key, _, current, new in changes:
+        old_str = "none" if current is None else current
+        print(f"   {key}: {old_str} -> {new}")
+
+def apply_sort_diff(notion, changes, workers=DEFAULT_WORKERS):
+    """
+    Writes the changed SortIDs through a worker pool. The client's shared rate
+    limiter paces the writes and retries 429s. Returns the success count.
+    """
+    count = 0
+
+    def update(page_id, sort_id):
+        return notion.pages.update(
+            page_id=page_id,
+            properties={
+                "SortID": {"number": sort_id}
+            }
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(update, page_id, new): (key, new) for key, page_id, _, new in changes}
+        for future in as_completed(futures):
+            key, new = futures[future]
+            try:
+                future.result()
+                print(f"✅ [{new}] Sorted: {key}")
+                count += 1
+            except Exception as e:
+                print(f"❌ Error updating {key}: {e}")
+
+    return count
+
 def main():
+    parser = argparse.ArgumentParser(description="Set SortID on every library row to match the book order")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the SortIDs that would change")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent update requests")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (default: NOTION_RATE_LIMIT or 3)")
+    args = parser.parse_args()
+
     print("📚 Organizing Library to match Book Order...")
-    notion = Client(auth=NOTION_TOKEN)
+    if args.rate:
+        configure_limiter(rate=args.rate)
+    notion = get_notion_client(NOTION_TOKEN)
     
-    # 1. Fetch all rows (We need their Page IDs to update them)
+    # 1. Fetch all rows (We need their Page IDs and current SortIDs)
     print("Fetching all existing rows from Notion (this may take a moment)...")
     all_pages = []
     has_more = True
@@ -90,7 +152,7 @@ def main():
         
     print(f"Fetched {len(all_pages)} rows.")
     
-    # 2. Create a Lookup Dictionary { "Sun in Aries": "page_id_123" }
+    # 2. Create a Lookup Dictionary { "Sun in Aries": ("page_id_123", 4) }
     page_map = {}
     for page in all_pages:
         try:
@@ -98,34 +160,26 @@ def main():
             props = page["properties"]["Placement"]
             if props["title"]:
                 title_text = props["title"][0]["text"]["content"]
-                page_map[title_text] = page["id"]
+                sort_prop = page["properties"].get("SortID") or {}
+                page_map[title_text] = (page["id"], sort_prop.get("number"))
         except Exception as e:
             continue
 
-    # 3. Update SortID based on MASTER_ORDER
+    # 3. Only rows whose SortID differs from MASTER_ORDER need a write
+    changes = compute_sort_diff(page_map)
+    in_order = sum(1 for key in MASTER_ORDER if key in page_map) - len(changes)
+    print(f"{in_order} rows already in order, {len(changes)} to update.")
+
+    if args.dry_run:
+        print_dry_run(changes)
+        return
+
     print("Updating SortIDs...")
-    count = 0
-    
-    for index, key in enumerate(MASTER_ORDER):
-        if key in page_map:
-            page_id = page_map[key]
-            
-            # Update the row
-            try:
-                notion.pages.update(
-                    page_id=page_id,
-                    properties={
-                        "SortID": {"number": index + 1}
-                    }
-                )
-                print(f"✅ [{index+1}] Sorted: {key}")
-                count += 1
-                time.sleep(0.3) # Rate limiting
-            except Exception as e:
-                print(f"❌ Error updating {key}: {e}")
+    count = apply_sort_diff(notion, changes, workers=args.workers)
                 
     print(f"\n✨ Done! Sorted {count} rows.")
     print("👉 Go to Notion, click the 'SortID' column header, and choose 'Sort Ascending'.")
+    print(f"📊 Notion traffic: {get_stats()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
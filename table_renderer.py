@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Chart Summary Table Renderer for AstroBookBot
+
+Draws chart_summary.png directly with Pillow instead of matplotlib's `ax.table`:
+the layout is fixed (three columns, one row per body, known row height), so the
+cells, fills, borders and text are painted straight onto the canvas with cached
+fonts. There is no layout solver and no tight-bbox pass, and the flat colours
+compress to a much smaller PNG. `table_layout` gives the same table as vector
+drawing operations (in donut_renderer's layout format) for PDF output.
+
+The rows themselves (signs in Ascendant order, bodies sorted by house, `*` on
+bodies whose house was moved) come from `build_table_rows`.
+"""
+
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from astro_engine import ZODIAC_SIGNS, get_sign_name, normalize_degree
+from donut_renderer import PT, centered_text, find_font
+
+# ==========================================================
+# CONFIGURATION
+# ==========================================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+assets_dir = os.path.join(current_dir, "assets", "pie_charts")
+
+SYMBOLS = {
+    "Sun": "☉", "Moon": "☽", "Mercury": "☿", "Venus": "♀", "Mars": "♂",
+    "Jupiter": "♃", "Saturn": "♄", "Uranus": "♅", "Neptune": "♆", "Pluto": "♇",
+    "North Node": "☊", "South Node": "☋", "Lilith": "⚸", "Chiron": "⚷",
+    "Part of Fortune": "⊗", "Ascendant": "AC", "Midheaven": "MC"
+}
+
+HEADERS = ["S I G N S", "P L A N E T S", "H O U S E"]
+
+# Layout in points (1/72 inch), matching the old matplotlib table at 300 dpi
+TABLE_DPI = 300
+COL_WIDTHS = [111.6, 245.5, 89.3]  # 0.25 / 0.55 / 0.2 of the table width
+ROW_HEIGHT = 30.0
+HEADER_HEIGHT = 30.0
+MARGIN = 7.2
+LINE_WIDTH = 1.0
+
+SIGN_FILL = "#BDD7EE"
+PLANET_FILL = "#FFFFFF"
+TEXT_COLOR = "#000000"
+LINE_COLOR = "#000000"
+
+# Font size per column (points), and for the bold header row
+COLUMN_FONT_SIZES = [11, 11, 14]
+HEADER_FONT_SIZE = 14
+
+FONT_TABLE = find_font("DejaVuSans")
+FONT_TABLE_BOLD = find_font("DejaVuSans-Bold")
+
+
+# ==========================================================
+# ROWS
+# ==========================================================
+def build_table_rows(chart_data):
+    """
+    One row per planet (no grouping): [sign, planet label, house].
+
+    Signs run in zodiac order starting from the Ascendant's sign. Bodies in a sign
+    are sorted by house, angles use their symbol, moved bodies get a `*`, and a sign
+    with no bodies gets an EMPTY row with the house whose cusp falls in it.
+    """
+    table_data = []
+
+    # Data Sources
+    placements = chart_data["placements"]
+    h_eff = chart_data["house_positions_eff"]
+    h_geom = chart_data["house_positions_geom"]
+    cusps = chart_data["cusps"]
+
+    # 1. Determine Sort Order (Ascendant Start)
+    asc_sign = placements["Ascendant"]
+    try: start_index = ZODIAC_SIGNS.index(asc_sign)
+    except: start_index = 0
+
+    # 2. Iterate through 12 Signs
+    for i in range(12):
+        current_sign_idx = (start_index + i) % 12
+        current_sign = ZODIAC_SIGNS[current_sign_idx]
+
+        # Gather all bodies in this sign
+        bodies_here = []
+
+        # Check Angles first
+        if placements["Ascendant"] == current_sign:
+            bodies_here.append(("Ascendant", "1"))
+        if placements["Midheaven"] == current_sign:
+            mc_h = int(h_eff.get("Midheaven", 10))
+            bodies_here.append(("Midheaven", str(mc_h)))
+
+        # Check Planets
+        for body, p_sign in placements.items():
+            if body in ["Ascendant", "Midheaven"]: continue
+            if p_sign == current_sign:
+                h_num = int(h_eff.get(body, 0))
+                bodies_here.append((body, str(h_num)))
+
+        # 3. Build Rows
+        if not bodies_here:
+            # Empty Sign Case
+            house_num = "-"
+            start_cusp_idx = 1 if len(cusps) == 13 else 0
+            for h in range(12):
+                deg = cusps[start_cusp_idx + h]
+                if get_sign_name(normalize_degree(deg)) == current_sign:
+                    house_num = str(h + 1)
+                    break
+            table_data.append([current_sign, "EMPTY", house_num])
+
+        else:
+            # Sort bodies by House Number
+            bodies_here.sort(key=lambda x: int(x[1]))
+
+            for body, h_str in bodies_here:
+                # Format Planet Name
+                if body in ["Ascendant", "Midheaven"]:
+                    sym = "↑" if body == "Ascendant" else "MC"
+                    p_str = f"{sym} {body.upper()}"
+                else:
+                    # Asterisk Check
+                    is_moved = int(h_geom.get(body, 0)) != int(h_eff.get(body, 0))
+                    marker = "*" if is_moved else ""
+                    sym = SYMBOLS.get(body, "")
+                    p_str = f"{sym} {body.upper()}{marker}"
+
+                # Create the row: [Aquarius, Planet Name, 1]
+                table_data.append([current_sign, p_str, h_str])
+
+    return table_data
+
+
+# ==========================================================
+# DRAWING
+# ==========================================================
+@lru_cache(maxsize=None)
+def _font(path, size_px):
+    """Fonts are loaded once per process and size."""
+    if path is None:
+        return ImageFont.load_default(size_px)
+    return ImageFont.truetype(path, size_px)
+
+
+def render_table(rows, dpi=TABLE_DPI):
+    """
+    Draws the summary table for `rows` ([sign, planet, house] lists).
+
+    Returns:
+        PIL.Image.Image: RGB image
+    """
+    px = dpi / 72.0
+    col_widths = [round(w * px) for w in COL_WIDTHS]
+    row_h = round(ROW_HEIGHT * px)
+    header_h = round(HEADER_HEIGHT * px)
+    margin = round(MARGIN * px)
+    line = max(1, round(LINE_WIDTH * px))
+
+    width = sum(col_widths) + 2 * margin
+    height = header_h + row_h * len(rows) + 2 * margin
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+
+    col_x = [margin]
+    for w in col_widths:
+        col_x.append(col_x[-1] + w)
+    top = margin + header_h
+
+    # Header: bold, white cells without borders
+    header_font = _font(FONT_TABLE_BOLD or FONT_TABLE, round(HEADER_FONT_SIZE * px))
+    for col, text in enumerate(HEADERS):
+        draw.text(((col_x[col] + col_x[col + 1]) / 2, margin + header_h / 2), text,
+                  fill=TEXT_COLOR, font=header_font, anchor="mm")
+
+    # Column fills in one rectangle each, then the text of every cell
+    fills = [SIGN_FILL, PLANET_FILL, SIGN_FILL]
+    bottom = top + row_h * len(rows)
+    for col, fill in enumerate(fills):
+        draw.rectangle([col_x[col], top, col_x[col + 1], bottom], fill=fill)
+    fonts = [_font(FONT_TABLE, round(size * px)) for size in COLUMN_FONT_SIZES]
+    for i, row in enumerate(rows):
+        y = top + row_h * i + row_h / 2
+        for col, text in enumerate(row):
+            draw.text(((col_x[col] + col_x[col + 1]) / 2, y), str(text),
+                      fill=TEXT_COLOR, font=fonts[col], anchor="mm")
+
+    # Grid lines, centered on the cell edges
+    half = line / 2
+    for i in range(len(rows) + 1):
+        y = top + row_h * i
+        draw.rectangle([col_x[0] - half, y - half, col_x[-1] + half - 1, y + half - 1], fill=LINE_COLOR)
+    for x in col_x:
+        draw.rectangle([x - half, top - half, x + half - 1, bottom + half - 1], fill=LINE_COLOR)
+
+    return image
+
+
+def _rect(x0, y0, x1, y1):
+    return [("M", (x0, y0)), ("L", (x1, y0)), ("L", (x1, y1)), ("L", (x0, y1)), ("Z",)]
+
+
+def table_layout(rows):
+    """
+    The summary table for `rows` as a vector layout: the geometry of `render_table`
+    in mm, for donut_renderer's to_svg / pdf_content.
+
+    Returns:
+        dict: {"size": (w, h) in mm, "ops": [...]}
+    """
+    col_x = [MARGIN * PT]
+    for w in COL_WIDTHS:
+        col_x.append(col_x[-1] + w * PT)
+    row_h, margin, half = ROW_HEIGHT * PT, MARGIN * PT, LINE_WIDTH * PT / 2
+    top = margin + HEADER_HEIGHT * PT
+    bottom = top + row_h * len(rows)
+    width, height = col_x[-1] + margin, bottom + margin
+
+    ops = [("path", fill, _rect(col_x[col], top, col_x[col + 1], bottom))
+           for col, fill in enumerate([SIGN_FILL, PLANET_FILL, SIGN_FILL])]
+    for i in range(len(rows) + 1):
+        y = top + row_h * i
+        ops.append(("path", LINE_COLOR, _rect(col_x[0] - half, y - half, col_x[-1] + half, y + half)))
+    for x in col_x:
+        ops.append(("path", LINE_COLOR, _rect(x - half, top - half, x + half, bottom + half)))
+
+    header_font = FONT_TABLE_BOLD or FONT_TABLE
+    for col, text in enumerate(HEADERS):
+        ops.append(centered_text(text, (col_x[col] + col_x[col + 1]) / 2, margin + HEADER_HEIGHT * PT / 2, header_font, HEADER_FONT_SIZE * PT, TEXT_COLOR))
+    for i, row in enumerate(rows):
+        y = top + row_h * i + row_h / 2
+        for col, text in enumerate(row):
+            ops.append(centered_text(str(text), (col_x[col] + col_x[col + 1]) / 2, y, FONT_TABLE, COLUMN_FONT_SIZES[col] * PT, TEXT_COLOR))
+    return {"size": (width, height), "ops": ops}
+
+
+def _ramp(start, end, steps):
+    return [tuple(round(a + (b - a) * i / (steps - 1)) for a, b in zip(start, end)) for i in range(steps)]
+
+
+@lru_cache(maxsize=1)
+def _table_palette():
+    """
+    The table only ever mixes black text and lines into white or blue cells, so two
+    16-step ramps hold every colour it needs.
+    """
+    black, white = (0, 0, 0), (255, 255, 255)
+    blue = tuple(int(SIGN_FILL[i:i + 2], 16) for i in (1, 3, 5))
+    colors = _ramp(black, white, 16) + _ramp(black, blue, 16)[1:]
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([v for c in colors for v in c])
+    return palette
+
+
+def to_palette(image):
+    """Maps the RGB table onto its fixed palette (no dithering) for a much smaller PNG."""
+    return image.quantize(palette=_table_palette(), dither=Image.Dither.NONE)
+
+
+def render_table_image(chart_data, filename="chart_summary.png", output_dir=None, dpi=TABLE_DPI):
+    """Builds the rows for `chart_data` and saves the table. Returns the asset path."""
+    save_path = os.path.join(output_dir or assets_dir, filename)
+    to_palette(render_table(build_table_rows(chart_data), dpi)).save(save_path, dpi=(dpi, dpi))
+    return save_path if output_dir else f"assets/pie_charts/{filename}"